@@ -0,0 +1,721 @@
+"""
+benchmark.py
+This file contains the end-to-end benchmark suite, timing download, parse,
+build, write and query stages over synthetic nflverse release files and
+comparing throughput and peak memory against a stored baseline
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from features import read_feature_plays
+from instrument import current_rss
+from planner import IngestJob
+from projections import load_projection_history
+import script
+import constants as c
+
+
+class BenchmarkRegressionError(RuntimeError):
+    """Raised when a benchmark stage is slower or larger than its baseline."""
+
+
+@dataclass
+class StageResult:
+    """Throughput and peak memory of one (scale, table, stage)."""
+
+    seasons: int
+    table: str
+    stage: str
+    rows: int = 0
+    seconds: float = 0.0
+    peak_rss_bytes: int = 0
+
+    @property
+    def key(self) -> str:
+        return c.BENCHMARK_KEY_STRUCTURE.format(table=self.table, stage=self.stage)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+class RssSampler:
+    """Track the peak resident set size of the process over a block.
+
+    RSS is sampled from /proc/self/statm on a background thread. Where /proc
+    is unavailable the process-wide ru_maxrss is reported instead.
+
+    Parameters
+    ----------
+    interval : float
+        Seconds between samples (default: c.BENCHMARK_RSS_INTERVAL_SECONDS).
+    """
+
+    def __init__(self, interval: float = c.BENCHMARK_RSS_INTERVAL_SECONDS) -> None:
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = current_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+
+def pbp_source_columns() -> List[str]:
+    """Helper function to list the columns of a synthetic pbp file.
+
+    These are the columns of every table built from pbp, plus the participant
+    id columns of the dtype registry and their registered team columns.
+    """
+    columns = [
+        column
+        for table in script.derived_table_names("pbp")
+        if table in c.NFLV_TABLE_DICT and table not in ("pbp_player", "pbp_weeks")
+        for column in c.NFLV_TABLE_DICT[table]
+    ]
+    id_columns = [
+        column
+        for column in c.NFLV_DTYPE_DICT
+        if re.fullmatch(c.PBP_PARTICIPANT_ID_PATTERN, column) is not None
+    ]
+    team_columns = [
+        script.participant_team_column(column)
+        for column in id_columns
+        if script.column_dtype(script.participant_team_column(column)) is not None
+    ]
+    return list(dict.fromkeys(columns + id_columns + team_columns))
+
+
+def synthetic_column(
+    column: str, rows: int, rng: np.random.Generator, players: np.ndarray
+) -> np.ndarray:
+    """Helper function to draw values for a column from its registered dtype.
+
+    Parameters
+    ----------
+    column : str
+        Column name.
+    rows : int
+        Number of values.
+    rng : np.random.Generator
+        Random generator.
+    players : np.ndarray
+        Player id pool for id columns.
+
+    Returns
+    -------
+    values : np.ndarray
+        Values of the column.
+    """
+    dtype = script.column_dtype(column)
+    if column.endswith(c.PBP_PARTICIPANT_TEAM_SUFFIX) and dtype in (
+        c.CATEGORY_DTYPE,
+        c.STRING_DTYPE,
+    ):
+        return rng.choice(c.BENCHMARK_TEAMS, rows)
+    if column.endswith("_id") and dtype == c.STRING_DTYPE:
+        return rng.choice(players, rows)
+    if dtype in (c.CATEGORY_DTYPE, c.STRING_DTYPE):
+        return rng.choice(c.BENCHMARK_TEXT_VALUES, rows)
+    if dtype == c.BOOLEAN_DTYPE:
+        return rng.random(rows) < 0.5
+    if dtype in (c.INT8_DTYPE, c.INT16_DTYPE, c.INT32_DTYPE):
+        return rng.integers(0, 100, rows)
+    return rng.normal(0.0, 10.0, rows).round(3)
+
+
+def synthetic_frame(
+    columns: List[str],
+    overrides: Dict[str, np.ndarray],
+    rng: np.random.Generator,
+    players: np.ndarray,
+) -> pd.DataFrame:
+    """Helper function to fill a frame with synthetic data and key overrides."""
+    rows = len(next(iter(overrides.values())))
+    return pd.DataFrame(
+        {
+            column: (
+                overrides[column]
+                if column in overrides
+                else synthetic_column(column, rows, rng, players)
+            )
+            for column in columns
+        }
+    )
+
+
+def synthetic_pbp(
+    season: int,
+    rng: np.random.Generator,
+    games: int = c.BENCHMARK_GAMES_PER_WEEK,
+    plays: int = c.BENCHMARK_PLAYS_PER_GAME,
+    players: int = c.BENCHMARK_PLAYERS,
+) -> pd.DataFrame:
+    """Function to generate one season of synthetic play-by-play.
+
+    Every play is a pass (passer and receiver) or a run (rusher); the other
+    participant columns are sparsely filled.
+
+    Parameters
+    ----------
+    season : int
+        Season of the plays.
+    rng : np.random.Generator
+        Random generator.
+    games : int
+        Games per week (default: c.BENCHMARK_GAMES_PER_WEEK).
+    plays : int
+        Plays per game (default: c.BENCHMARK_PLAYS_PER_GAME).
+    players : int
+        Size of the player id pool (default: c.BENCHMARK_PLAYERS).
+
+    Returns
+    -------
+    pbp : pd.DataFrame
+        Plays with the columns of pbp_source_columns.
+    """
+    player_ids = np.array([f"00-{player:07d}" for player in range(players)])
+    weeks = np.repeat(np.arange(1, c.BENCHMARK_WEEKS + 1), games * plays)
+    game = np.tile(np.repeat(np.arange(games), plays), c.BENCHMARK_WEEKS)
+    rows = len(weeks)
+    home = np.array(c.BENCHMARK_TEAMS)[(2 * game) % len(c.BENCHMARK_TEAMS)]
+    away = np.array(c.BENCHMARK_TEAMS)[(2 * game + 1) % len(c.BENCHMARK_TEAMS)]
+    game_ids = np.char.add(
+        np.char.add(f"{season}_", np.char.zfill(weeks.astype(str), 2)),
+        np.char.add(np.char.add("_", away), np.char.add("_", home)),
+    )
+    is_pass = rng.random(rows) < 0.6
+    overrides = {
+        "game_id": game_ids,
+        "play_id": np.tile(np.arange(1, plays + 1), games * c.BENCHMARK_WEEKS),
+        "season": np.full(rows, season),
+        "week": weeks,
+        "season_type": np.where(weeks <= 17, "REG", "POST"),
+        "home_team": home,
+        "away_team": away,
+        "posteam": np.where(rng.random(rows) < 0.5, home, away),
+        "fixed_drive": np.tile(np.arange(plays) // 6 + 1, games * c.BENCHMARK_WEEKS),
+        "yardline_100": rng.integers(1, 100, rows),
+        "complete_pass": (is_pass & (rng.random(rows) < 0.65)).astype(int),
+        "passer_player_id": np.where(is_pass, rng.choice(player_ids, rows), None),
+        "receiver_player_id": np.where(is_pass, rng.choice(player_ids, rows), None),
+        "rusher_player_id": np.where(is_pass, None, rng.choice(player_ids, rows)),
+    }
+    overrides["defteam"] = np.where(overrides["posteam"] == home, away, home)
+    pbp = synthetic_frame(pbp_source_columns(), overrides, rng, player_ids)
+    for column in participant_columns(pbp.columns, exclude=overrides):
+        pbp[column] = pbp[column].where(rng.random(rows) < 0.02)
+    return pbp
+
+
+def participant_columns(columns: List[str], exclude: Dict) -> List[str]:
+    """Helper function to list participant id columns not set explicitly."""
+    return [
+        column
+        for column in columns
+        if column not in exclude
+        and re.fullmatch(c.PBP_PARTICIPANT_ID_PATTERN, column) is not None
+    ]
+
+
+def synthetic_player_stats(
+    season: int, rng: np.random.Generator, players: int = c.BENCHMARK_PLAYERS
+) -> pd.DataFrame:
+    """Function to generate one season of synthetic player-weeks.
+
+    Parameters
+    ----------
+    season : int
+        Season of the stats.
+    rng : np.random.Generator
+        Random generator.
+    players : int
+        Number of players, each with a row every week
+        (default: c.BENCHMARK_PLAYERS).
+
+    Returns
+    -------
+    player_stats : pd.DataFrame
+        Player-weeks with c.PLAYER_STATS_TBL_COLUMNS columns.
+    """
+    player_ids = np.array([f"00-{player:07d}" for player in range(players)])
+    rows = players * c.BENCHMARK_WEEKS
+    overrides = {
+        "player_id": np.tile(player_ids, c.BENCHMARK_WEEKS),
+        "season": np.full(rows, season),
+        "week": np.repeat(np.arange(1, c.BENCHMARK_WEEKS + 1), players),
+        "season_type": np.full(rows, "REG"),
+        "position": np.tile(
+            np.array(c.BENCHMARK_POSITIONS)[np.arange(players) % 4], c.BENCHMARK_WEEKS
+        ),
+        "recent_team": np.tile(
+            np.array(c.BENCHMARK_TEAMS)[np.arange(players) % 32], c.BENCHMARK_WEEKS
+        ),
+    }
+    return synthetic_frame(c.PLAYER_STATS_TBL_COLUMNS, overrides, rng, player_ids)
+
+
+def synthetic_weekly_rosters(
+    season: int, rng: np.random.Generator, roster_size: int = c.BENCHMARK_ROSTER_SIZE
+) -> pd.DataFrame:
+    """Function to generate one season of synthetic weekly rosters.
+
+    Parameters
+    ----------
+    season : int
+        Season of the rosters.
+    rng : np.random.Generator
+        Random generator.
+    roster_size : int
+        Players per team and week (default: c.BENCHMARK_ROSTER_SIZE).
+
+    Returns
+    -------
+    weekly_rosters : pd.DataFrame
+        Rostered players with c.WEEKLY_ROSTERS_TBL_COLUMNS columns.
+    """
+    teams = len(c.BENCHMARK_TEAMS)
+    player_ids = np.array([f"00-{player:07d}" for player in range(teams * roster_size)])
+    rows = len(player_ids) * c.BENCHMARK_WEEKS
+    overrides = {
+        "season": np.full(rows, season),
+        "week": np.repeat(np.arange(1, c.BENCHMARK_WEEKS + 1), len(player_ids)),
+        "team": np.tile(
+            np.repeat(np.array(c.BENCHMARK_TEAMS), roster_size), c.BENCHMARK_WEEKS
+        ),
+        "gsis_id": np.tile(player_ids, c.BENCHMARK_WEEKS),
+    }
+    return synthetic_frame(c.WEEKLY_ROSTERS_TBL_COLUMNS, overrides, rng, player_ids)
+
+
+SYNTHETIC_TABLE_DICT: Dict[str, Callable[..., pd.DataFrame]] = {
+    "pbp": synthetic_pbp,
+    "player_stats": synthetic_player_stats,
+    "weekly_rosters": synthetic_weekly_rosters,
+}
+
+
+def write_release_files(
+    release_dir: str, seasons: List[int], seed: int = c.BENCHMARK_SEED
+) -> Iterator[IngestJob]:
+    """Function to write synthetic release files laid out like nflverse.
+
+    Parameters
+    ----------
+    release_dir : str
+        Directory to write the files under.
+    seasons : List[int]
+        Seasons to generate.
+    seed : int
+        Seed of the generator (default: c.BENCHMARK_SEED).
+
+    Returns
+    -------
+    jobs : Iterator[IngestJob]
+        Planned jobs pointing at the written files, in table and season order.
+    """
+    rng = np.random.default_rng(seed)
+    for job in script.plan_ingest_jobs(
+        base_url=release_dir + os.sep, tables=list(SYNTHETIC_TABLE_DICT)
+    ):
+        if job.season not in seasons:
+            continue
+        frame = SYNTHETIC_TABLE_DICT[job.table](job.season, rng)
+        os.makedirs(os.path.dirname(job.url), exist_ok=True)
+        frame.to_csv(job.url, index=False, compression=job.compression)
+        yield job
+
+
+def run_benchmark(
+    seasons: int,
+    work_dir: Optional[str] = None,
+    first_season: int = c.BENCHMARK_FIRST_SEASON,
+) -> List[StageResult]:
+    """Function to time the ingestion pipeline end to end on synthetic data.
+
+    Every release file passes through fetch_table_data (the download
+    stand-in), parse_table_data, build_tables and write_table, after which the
+    indexes are built and the projection and feature queries read the result.
+    The same files are then loaded once more through build_db into a second
+    database, timing the scheduled build as a whole.
+
+    Parameters
+    ----------
+    seasons : int
+        Number of seasons to generate and load.
+    work_dir : Optional[str]
+        Directory for release files and the database (default: a temporary
+        directory).
+    first_season : int
+        First generated season (default: c.BENCHMARK_FIRST_SEASON).
+
+    Returns
+    -------
+    results : List[StageResult]
+        One result per (table, stage); seconds and rows add up over seasons
+        and peak_rss_bytes is the largest seen.
+    """
+    if work_dir is None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            return run_benchmark(seasons, work_dir=temp_dir, first_season=first_season)
+    season_list = list(range(first_season, first_season + seasons))
+    db_path = os.path.join(work_dir, c.DB_PATH)
+    jobs = list(write_release_files(os.path.join(work_dir, "release"), season_list))
+    results: Dict[str, StageResult] = {}
+
+    def timed(table: str, stage: str, function: Callable, rows: Callable) -> object:
+        result = results.setdefault(
+            c.BENCHMARK_KEY_STRUCTURE.format(table=table, stage=stage),
+            StageResult(seasons=seasons, table=table, stage=stage),
+        )
+        with RssSampler() as sampler:
+            started = time.perf_counter()
+            value = function()
+            result.seconds += time.perf_counter() - started
+        result.rows += rows(value)
+        result.peak_rss_bytes = max(result.peak_rss_bytes, sampler.peak)
+        return value
+
+    for job in jobs:
+        raw = timed(
+            job.table,
+            "download",
+            lambda job=job: script.fetch_table_data(job.url),
+            lambda _: 0,
+        )
+        data = timed(
+            job.table,
+            "parse",
+            lambda raw=raw, job=job: script.parse_table_data(
+                raw, compression=job.compression, table=job.table
+            ),
+            len,
+        )
+        # The compressed download has no row count of its own; credit it
+        # with the rows it parsed to.
+        results[
+            c.BENCHMARK_KEY_STRUCTURE.format(table=job.table, stage="download")
+        ].rows += len(data)
+        raw.close()
+        tables = timed(
+            job.table,
+            "build",
+            lambda data=data, job=job: script.build_tables(
+                data, script.derived_table_names(job.table) or [job.table]
+            ),
+            lambda tables: sum(len(table) for table in tables.values()),
+        )
+        del data
+        timed(
+            job.table,
+            "write",
+            lambda tables=tables, job=job: sum(
+                script.write_table(
+                    table=table, season=job.season, data=table_data, db_path=db_path
+                )
+                for table, table_data in tables.items()
+            ),
+            int,
+        )
+        del tables
+    timed(
+        "all",
+        "index",
+        lambda: script.create_key_indexes(db_path=db_path),
+        lambda _: 0,
+    )
+    latest = season_list[-1]
+    timed(
+        "player_stats",
+        "query",
+        lambda: load_projection_history(latest + 1, seasons, db_path=db_path),
+        len,
+    )
+    timed(
+        "pbp",
+        "query",
+        lambda: read_feature_plays(
+            [(latest, week) for week in range(1, c.BENCHMARK_WEEKS + 1)],
+            db_path=db_path,
+        ),
+        len,
+    )
+    timed(
+        "all",
+        "build_db",
+        lambda: script.build_db(
+            base_url=os.path.join(work_dir, "release") + os.sep,
+            tables=list(SYNTHETIC_TABLE_DICT),
+            seasons=season_list,
+            db_path=os.path.join(work_dir, c.BENCHMARK_BUILD_DB_PATH),
+        ),
+        lambda timings: sum(timing.rows for timing in timings if timing.ok),
+    )
+    return list(results.values())
+
+
+def calibrate(
+    rows: int = c.BENCHMARK_CALIBRATION_ROWS,
+    repeats: int = c.BENCHMARK_CALIBRATION_REPEATS,
+) -> float:
+    """Function to time a fixed pandas and SQLite workload on this machine.
+
+    The workload parses a generated csv and inserts it into an in-memory
+    database without touching the code under test, so its time only
+    reflects the machine and library versions. Baselines store throughput
+    relative to it, which lets a baseline recorded on one machine be checked
+    on another.
+
+    Parameters
+    ----------
+    rows : int
+        Rows of the generated csv (default: c.BENCHMARK_CALIBRATION_ROWS).
+    repeats : int
+        Runs of the workload (default: c.BENCHMARK_CALIBRATION_REPEATS).
+
+    Returns
+    -------
+    seconds : float
+        Time of the fastest run.
+    """
+    rng = np.random.default_rng(c.BENCHMARK_SEED)
+    raw = (
+        pd.DataFrame(
+            {
+                "id": np.arange(rows),
+                "value": rng.normal(size=rows),
+                "team": rng.choice(c.BENCHMARK_TEAMS, rows),
+            }
+        )
+        .to_csv(index=False)
+        .encode("utf-8")
+    )
+    fastest = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        frame = pd.read_csv(io.BytesIO(raw))
+        with contextlib.closing(sqlite3.connect(":memory:")) as connection:
+            connection.execute("CREATE TABLE calibration (id, value, team)")
+            connection.executemany(
+                "INSERT INTO calibration VALUES (?, ?, ?)",
+                frame.itertuples(index=False, name=None),
+            )
+        fastest = min(fastest, time.perf_counter() - started)
+    return fastest
+
+
+def machine_info(calibration: float) -> Dict[str, object]:
+    """Helper function to describe the machine a baseline was recorded on."""
+    return {
+        "calibration_seconds": round(calibration, 4),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+    }
+
+
+def load_baseline(path: Optional[str] = None) -> Dict[str, Dict[str, Dict]]:
+    """Function to read stored benchmark results.
+
+    Parameters
+    ----------
+    path : Optional[str]
+        Location of the baseline (default: c.BENCHMARK_BASELINE_PATH).
+
+    Returns
+    -------
+    baseline : Dict[str, Dict[str, Dict]]
+        {seasons: {table/stage: {rows_per_calibration, relative_seconds,
+        peak_rss_bytes}}}, plus the machine_info of the recording under
+        c.BENCHMARK_MACHINE_KEY.
+    """
+    try:
+        with open(path or c.BENCHMARK_BASELINE_PATH, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(
+    results: List[StageResult],
+    path: Optional[str] = None,
+    calibration: Optional[float] = None,
+) -> None:
+    """Function to store benchmark results as the baseline of their scales.
+
+    Throughput is stored as rows per calibration run and time in calibration
+    runs, so the baseline does not depend on the machine it was recorded on;
+    peak RSS is stored as is. Scales that were not run keep their stored
+    baseline, so all scales should be recorded on one machine.
+
+    Parameters
+    ----------
+    results : List[StageResult]
+        Results of run_benchmark.
+    path : Optional[str]
+        Location of the baseline (default: c.BENCHMARK_BASELINE_PATH).
+    calibration : Optional[float]
+        Seconds of the calibrate run on this machine (default: run it).
+
+    Returns
+    -------
+    None.
+    """
+    calibration = calibration or calibrate()
+    baseline = load_baseline(path)
+    baseline[c.BENCHMARK_MACHINE_KEY] = machine_info(calibration)
+    for result in results:
+        baseline.setdefault(str(result.seasons), {})[result.key] = {
+            "rows_per_calibration": round(result.rows_per_second * calibration, 1),
+            "relative_seconds": round(result.seconds / calibration, 4),
+            "peak_rss_bytes": result.peak_rss_bytes,
+        }
+    with open(path or c.BENCHMARK_BASELINE_PATH, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, indent=1, sort_keys=True)
+        file.write("\n")
+
+
+def compare_to_baseline(
+    results: List[StageResult],
+    baseline: Dict[str, Dict[str, Dict]],
+    tolerance: float = c.BENCHMARK_TOLERANCE,
+    calibration: Optional[float] = None,
+) -> List[str]:
+    """Function to list the stages that regressed against the baseline.
+
+    The stored relative throughput is scaled by this machine's calibration
+    run, and only compared for stages the baseline expects to take at least
+    c.BENCHMARK_MIN_SECONDS here, as shorter stages are noise.
+
+    Parameters
+    ----------
+    results : List[StageResult]
+        Results of run_benchmark.
+    baseline : Dict[str, Dict[str, Dict]]
+        Stored results, e.g. from load_baseline.
+    tolerance : float
+        Allowed relative drop in rows/sec and growth in peak RSS
+        (default: c.BENCHMARK_TOLERANCE).
+    calibration : Optional[float]
+        Seconds of the calibrate run on this machine (default: run it).
+
+    Returns
+    -------
+    regressions : List[str]
+        One message per regressed metric.
+    """
+    calibration = calibration or calibrate()
+    regressions = []
+    for result in results:
+        stored = baseline.get(str(result.seasons), {}).get(result.key)
+        if stored is None:
+            continue
+        rows_per_second = stored["rows_per_calibration"] / calibration
+        if stored["relative_seconds"] * calibration >= c.BENCHMARK_MIN_SECONDS and (
+            result.rows_per_second < rows_per_second * (1 - tolerance)
+        ):
+            regressions.append(
+                c.BENCHMARK_REGRESSION_MESSAGE.format(
+                    seasons=result.seasons,
+                    key=result.key,
+                    metric="rows/sec",
+                    value=result.rows_per_second,
+                    baseline=rows_per_second,
+                )
+            )
+        if result.peak_rss_bytes > stored["peak_rss_bytes"] * (1 + tolerance):
+            regressions.append(
+                c.BENCHMARK_REGRESSION_MESSAGE.format(
+                    seasons=result.seasons,
+                    key=result.key,
+                    metric="peak RSS bytes",
+                    value=result.peak_rss_bytes,
+                    baseline=stored["peak_rss_bytes"],
+                )
+            )
+    return regressions
+
+
+def run_benchmarks(
+    scales: Optional[List[int]] = None,
+    baseline_path: Optional[str] = None,
+    tolerance: float = c.BENCHMARK_TOLERANCE,
+    update_baseline: bool = False,
+) -> List[StageResult]:
+    """Function to run the benchmark at several scales against the baseline.
+
+    Parameters
+    ----------
+    scales : Optional[List[int]]
+        Numbers of seasons to benchmark (default: c.BENCHMARK_SCALES).
+    baseline_path : Optional[str]
+        Location of the baseline (default: c.BENCHMARK_BASELINE_PATH).
+    tolerance : float
+        Allowed relative regression (default: c.BENCHMARK_TOLERANCE).
+    update_baseline : bool
+        Store the results as the new baseline instead of comparing
+        (default: False).
+
+    Returns
+    -------
+    results : List[StageResult]
+        Results of every scale.
+
+    Raises
+    ------
+    BenchmarkRegressionError
+        When any stage regressed beyond the tolerance.
+    """
+    calibration = calibrate()
+    results = [
+        result
+        for seasons in scales or c.BENCHMARK_SCALES
+        for result in run_benchmark(seasons)
+    ]
+    if update_baseline:
+        save_baseline(results, baseline_path, calibration)
+        return results
+    regressions = compare_to_baseline(
+        results, load_baseline(baseline_path), tolerance, calibration
+    )
+    if regressions:
+        raise BenchmarkRegressionError("\n".join(regressions))
+    return results
+
+
+def results_frame(results: List[StageResult]) -> pd.DataFrame:
+    """Helper function to tabulate benchmark results."""
+    return pd.DataFrame(
+        [
+            {**asdict(result), "rows_per_second": result.rows_per_second}
+            for result in results
+        ]
+    )
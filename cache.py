@@ -0,0 +1,254 @@
+"""
+cache.py
+This file contains a local, content-addressed cache for nflverse release
+files so repeated builds read from disk instead of the network
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from typing import BinaryIO, Dict, Optional
+from fetch import AsyncFetcher
+import constants as c
+
+
+class CacheMissError(FileNotFoundError):
+    """Raised in offline mode when a url has not been cached yet."""
+
+
+class DownloadCache:
+    """On-disk cache of downloaded files keyed by url and content hash.
+
+    File contents are stored once under ``objects/<sha256>`` and an index maps
+    each url to its content hash, ETag/Last-Modified validators, size and last
+    access time. Entries younger than ``max_age`` are served without touching
+    the network; older entries are revalidated with a conditional request.
+    When the cache grows beyond ``max_bytes`` the least recently used entries
+    are evicted. Misses and revalidations go through an AsyncFetcher when
+    one is given, downloads are streamed into the cache, and objects are
+    served as open files rather than read into memory. Every object is
+    checked against its content hash before it is served, and a damaged
+    object is dropped and downloaded again. Access times of cache hits are
+    kept in memory and written to the index with the next stored download or
+    on ``close``.
+
+    Parameters
+    ----------
+    cache_dir : Optional[str]
+        Directory holding the cache (default: c.CACHE_DIR).
+    max_bytes : int
+        Size bound for cached contents (default: c.CACHE_MAX_BYTES).
+    max_age : float
+        Seconds a cached entry is trusted before revalidation
+        (default: c.CACHE_MAX_AGE_SECONDS).
+    offline : bool
+        Serve only from the cache and never touch the network (default: False).
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = c.CACHE_MAX_BYTES,
+        max_age: float = c.CACHE_MAX_AGE_SECONDS,
+        offline: bool = False,
+    ) -> None:
+        self.cache_dir = os.path.expanduser(cache_dir or c.CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.offline = offline
+        self._objects_dir = os.path.join(self.cache_dir, c.CACHE_OBJECTS_DIR)
+        self._index_path = os.path.join(self.cache_dir, c.CACHE_INDEX_FILE)
+        self._lock = threading.Lock()
+        self._dirty = False
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def __enter__(self) -> "DownloadCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def fetch(self, url: str, fetcher: Optional[AsyncFetcher] = None) -> BinaryIO:
+        """Return the contents of ``url``, downloading only when needed.
+
+        Parameters
+        ----------
+        url : str
+            Url of the file to fetch.
+        fetcher : Optional[AsyncFetcher]
+            Pooled asyncio downloader for cache misses and revalidations,
+            retrying and resuming interrupted downloads (default: plain
+            request).
+
+        Returns
+        -------
+        file : BinaryIO
+            Cached object, opened for reading.
+        """
+        with self._lock:
+            entry = self._index.get(url)
+        if entry is not None and (
+            self.offline or time.time() - entry["fetched"] < self.max_age
+        ):
+            cached = self._read_object(entry)
+            if cached is not None:
+                return cached
+            entry = None
+        if self.offline:
+            raise CacheMissError(c.CACHE_MISS_MESSAGE.format(url=url))
+        return self._download(url, entry, fetcher)
+
+    def close(self) -> None:
+        """Write access times of cache hits not yet saved to the index."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def total_bytes(self) -> int:
+        """Return the size of all distinct cached objects."""
+        with self._lock:
+            return self._total_bytes()
+
+    def _download(
+        self, url: str, entry: Optional[Dict], fetcher: Optional[AsyncFetcher]
+    ) -> BinaryIO:
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        if fetcher is not None:
+            download = fetcher.request(url, headers)
+            if download.file is None:
+                return self._not_modified(url, entry, fetcher)
+            with download.file:
+                return self._store(
+                    url, download.file, download.etag, download.last_modified
+                )
+        try:
+            with urllib.request.urlopen(
+                urllib.request.Request(url, headers=headers)
+            ) as response:
+                return self._store(
+                    url,
+                    response,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                )
+        except urllib.error.HTTPError as error:
+            if error.code != 304 or entry is None:
+                raise
+        return self._not_modified(url, entry, fetcher)
+
+    def _not_modified(
+        self, url: str, entry: Dict, fetcher: Optional[AsyncFetcher]
+    ) -> BinaryIO:
+        cached = self._read_object(entry)
+        if cached is None:
+            with self._lock:
+                self._index.pop(url, None)
+            return self._download(url, None, fetcher)
+        with self._lock:
+            entry["fetched"] = entry["accessed"] = time.time()
+            self._dirty = True
+        return cached
+
+    def _store(
+        self,
+        url: str,
+        stream: BinaryIO,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ) -> BinaryIO:
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(
+            dir=self._objects_dir, delete=False
+        ) as temp_file:
+            for chunk in iter(lambda: stream.read(c.CACHE_CHUNK_BYTES), b""):
+                digest.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+        object_path = os.path.join(self._objects_dir, digest.hexdigest())
+        os.replace(temp_file.name, object_path)
+        # opened before eviction runs, so the object stays readable even if
+        # it is evicted right away
+        cached = open(object_path, "rb")  # pylint: disable=consider-using-with
+        now = time.time()
+        with self._lock:
+            self._index[url] = {
+                "sha256": digest.hexdigest(),
+                "size": size,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched": now,
+                "accessed": now,
+            }
+            self._evict()
+            self._save_index()
+        return cached
+
+    def _read_object(self, entry: Dict) -> Optional[BinaryIO]:
+        object_path = os.path.join(self._objects_dir, entry["sha256"])
+        try:
+            cached = open(object_path, "rb")  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            return None
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: cached.read(c.CACHE_CHUNK_BYTES), b""):
+            digest.update(chunk)
+        if digest.hexdigest() != entry["sha256"]:
+            cached.close()
+            logging.warning(c.CACHE_CORRUPT_MESSAGE, object_path)
+            try:
+                os.remove(object_path)
+            except FileNotFoundError:
+                pass
+            return None
+        cached.seek(0)
+        with self._lock:
+            entry["accessed"] = time.time()
+            self._dirty = True
+        return cached
+
+    def _total_bytes(self) -> int:
+        sizes = {entry["sha256"]: entry["size"] for entry in self._index.values()}
+        return sum(sizes.values())
+
+    def _evict(self) -> None:
+        by_access = sorted(self._index.items(), key=lambda item: item[1]["accessed"])
+        while self._total_bytes() > self.max_bytes and len(by_access) > 1:
+            url, entry = by_access.pop(0)
+            del self._index[url]
+            if all(
+                other["sha256"] != entry["sha256"] for other in self._index.values()
+            ):
+                try:
+                    os.remove(os.path.join(self._objects_dir, entry["sha256"]))
+                except FileNotFoundError:
+                    pass
+            logging.info(c.CACHE_EVICT_MESSAGE, url)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as index_file:
+                return json.load(index_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self) -> None:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, delete=False, encoding="utf-8"
+        ) as temp_file:
+            json.dump(self._index, temp_file)
+        os.replace(temp_file.name, self._index_path)
+        self._dirty = False
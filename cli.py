@@ -0,0 +1,298 @@
+"""
+cli.py
+This file contains the command line interface. Only click and the
+standard-library modules are imported up front; pandas, NumPy and the
+database modules are imported by the subcommands that need them, so
+planning and status commands start quickly
+"""
+
+import time
+
+STARTED = time.perf_counter()
+
+import importlib
+import logging
+
+from types import ModuleType
+from typing import Dict, Optional, Tuple
+import click
+import constants as c
+
+IMPORT_SECONDS: Dict[str, float] = {}
+
+
+def lazy_import(module: str) -> ModuleType:
+    """Helper function to import a module on first use, timing the import.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module to import.
+
+    Returns
+    -------
+    module : ModuleType
+        The imported module.
+    """
+    started = time.perf_counter()
+    imported = importlib.import_module(module)
+    IMPORT_SECONDS.setdefault(module, time.perf_counter() - started)
+    return imported
+
+
+def report_startup(command_started: float) -> None:
+    """Helper function to print startup and lazy import times to stderr."""
+    click.echo(
+        c.STARTUP_PROFILE_MESSAGE.format(
+            milliseconds=(command_started - STARTED) * 1000
+        ),
+        err=True,
+    )
+    for module, seconds in IMPORT_SECONDS.items():
+        click.echo(
+            c.IMPORT_PROFILE_MESSAGE.format(module=module, milliseconds=seconds * 1000),
+            err=True,
+        )
+
+
+@click.group()
+@click.option(
+    "--profile-startup",
+    is_flag=True,
+    help="Report interpreter-to-command and lazy import times on stderr.",
+)
+@click.option("--verbose", is_flag=True, help="Log progress at INFO level.")
+@click.pass_context
+def cli(ctx: click.Context, profile_startup: bool, verbose: bool) -> None:
+    """Build the nflverse database and fantasy projections."""
+    if verbose:
+        logging.basicConfig(level=logging.INFO)
+    if profile_startup:
+        command_started = time.perf_counter()
+        ctx.call_on_close(lambda: report_startup(command_started))
+
+
+@cli.command()
+@click.option("--table", "tables", multiple=True, help="Table to plan (repeatable).")
+@click.option("--base-url", default=None, help="Root of the release server.")
+def plan(tables: Tuple[str, ...], base_url: Optional[str]) -> None:
+    """Print the ingestion jobs a build would run, without downloading."""
+    planner = lazy_import("planner")
+    for job in planner.plan_ingest_jobs(base_url=base_url, tables=list(tables) or None):
+        click.echo(f"{job.table}\t{job.season or ''}\t{job.url}")
+
+
+@cli.command()
+@click.option("--manifest-path", default=None, help="Load manifest to read.")
+def status(manifest_path: Optional[str]) -> None:
+    """Print what the load manifest records as loaded."""
+    incremental = lazy_import("incremental")
+    for entry in incremental.LoadManifest(manifest_path).entries():
+        loaded_at = time.strftime(
+            "%Y-%m-%d %H:%M:%S", time.localtime(entry["loaded_at"])
+        )
+        click.echo(
+            f"{entry['table']}\t{entry['season'] or ''}\t{entry['rows']}\t"
+            f"{loaded_at}\t{entry['checksum'][:12]}"
+        )
+
+
+@cli.command()
+@click.option("--table", "tables", multiple=True, help="Table to build (repeatable).")
+@click.option("--base-url", default=None, help="Root of the release server.")
+@click.option("--db-path", default=None, help="Location of the SQLite database.")
+@click.option("--incremental", is_flag=True, help="Only load files the manifest lacks.")
+@click.option("--manifest-path", default=None, help="Load manifest to use.")
+@click.option("--cache-dir", default=None, help="Download cache directory.")
+@click.option("--offline", is_flag=True, help="Serve downloads only from the cache.")
+@click.option("--chunksize", type=int, default=None, help="Stream files in chunks.")
+@click.option(
+    "--workers", type=int, default=c.SCHEDULER_MAX_WORKERS, help="Worker threads."
+)
+@click.option("--events", default=None, help="Append stage JSON events to a file.")
+@click.option("--prometheus", default=None, help="Write Prometheus metrics to a file.")
+def build(
+    tables: Tuple[str, ...],
+    base_url: Optional[str],
+    db_path: Optional[str],
+    incremental: bool,
+    manifest_path: Optional[str],
+    cache_dir: Optional[str],
+    offline: bool,
+    chunksize: Optional[int],
+    workers: int,
+    events: Optional[str],
+    prometheus: Optional[str],
+) -> None:
+    """Download nflverse files and load them into the database."""
+    script = lazy_import("script")
+    cache = None
+    if cache_dir is not None or offline:
+        cache = lazy_import("cache").DownloadCache(cache_dir, offline=offline)
+    manifest = None
+    if incremental:
+        manifest = lazy_import("incremental").LoadManifest(manifest_path)
+    metrics = None
+    if events is not None or prometheus is not None:
+        metrics = lazy_import("instrument").BuildMetrics(events, prometheus)
+    try:
+        timings = script.build_db(
+            base_url=base_url,
+            tables=list(tables) or None,
+            max_workers=workers,
+            cache=cache,
+            manifest=manifest,
+            chunksize=chunksize,
+            metrics=metrics,
+            db_path=db_path,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+        if metrics is not None:
+            metrics.close()
+    for timing in timings:
+        if not timing.ok:
+            click.echo(f"{timing.table}\t{timing.season or ''}\t{timing.error}")
+
+
+@cli.command("pipeline")
+@click.option(
+    "--target", "targets", multiple=True, help="Node or table to build (repeatable)."
+)
+@click.option("--base-url", default=None, help="Root of the release server.")
+@click.option("--db-path", default=None, help="Location of the SQLite database.")
+@click.option("--incremental", is_flag=True, help="Only load files the manifest lacks.")
+@click.option("--manifest-path", default=None, help="Load manifest to use.")
+@click.option("--cache-dir", default=None, help="Download cache directory.")
+@click.option("--state-path", default=None, help="Node fingerprint file to use.")
+@click.option("--serve-dir", default=None, help="Directory of the serving files.")
+@click.option("--force", is_flag=True, help="Run nodes with unchanged inputs too.")
+def run_pipeline(
+    targets: Tuple[str, ...],
+    base_url: Optional[str],
+    db_path: Optional[str],
+    incremental: bool,
+    manifest_path: Optional[str],
+    cache_dir: Optional[str],
+    state_path: Optional[str],
+    serve_dir: Optional[str],
+    force: bool,
+) -> None:
+    """Build targets and what they depend on, skipping unchanged nodes."""
+    pipeline = lazy_import("pipeline")
+    cache = None
+    if cache_dir is not None:
+        cache = lazy_import("cache").DownloadCache(cache_dir)
+    manifest = None
+    if incremental:
+        manifest = lazy_import("incremental").LoadManifest(manifest_path)
+    try:
+        results = pipeline.run_pipeline(
+            targets=list(targets) or None,
+            base_url=base_url,
+            cache=cache,
+            manifest=manifest,
+            state_path=state_path,
+            serve_dir=serve_dir,
+            force=force,
+            db_path=db_path,
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error)) from error
+    finally:
+        if cache is not None:
+            cache.close()
+    for result in results:
+        status = "skipped" if result.skipped else result.error or "ok"
+        click.echo(f"{result.node}\t{result.seconds:.2f}\t{status}")
+
+
+@cli.command("refresh-features")
+@click.option("--db-path", default=None, help="Location of the SQLite database.")
+def refresh_features(db_path: Optional[str]) -> None:
+    """Rebuild the feature tables for weeks whose pbp changed."""
+    features = lazy_import("features")
+    for season, week in features.refresh_features(db_path=db_path):
+        click.echo(f"{season}\t{week}")
+
+
+@cli.command("export-serving")
+@click.option("--table", "tables", multiple=True, help="Table to export (repeatable).")
+@click.option("--serve-dir", default=None, help="Directory of the serving files.")
+@click.option("--db-path", default=None, help="Location of the SQLite database.")
+def export_serving(
+    tables: Tuple[str, ...], serve_dir: Optional[str], db_path: Optional[str]
+) -> None:
+    """Export finished tables to memory-mapped files for the projection API."""
+    serving = lazy_import("serving")
+    rows = serving.export_serving_tables(
+        tables=list(tables) or None, serve_dir=serve_dir, db_path=db_path
+    )
+    for table, table_rows in rows.items():
+        click.echo(f"{table}\t{table_rows}")
+
+
+@cli.command("refresh-identity")
+@click.option("--db-path", default=None, help="Location of the SQLite database.")
+def refresh_identity(db_path: Optional[str]) -> None:
+    """Rebuild the player id crosswalk from the player and roster tables."""
+    player_identity = lazy_import("identity").refresh_player_identity(db_path=db_path)
+    click.echo(f"player_identity\t{len(player_identity)}")
+
+
+@cli.command()
+@click.option("--season", type=int, default=c.CURRENT_YEAR + 1, show_default=True)
+@click.option("--db-path", default=None, help="Location of the SQLite database.")
+@click.option("--output", type=click.Path(), default=None, help="CSV to write.")
+def project(season: int, db_path: Optional[str], output: Optional[str]) -> None:
+    """Project the fantasy season of every player."""
+    projections = lazy_import("projections")
+    player_projections = projections.project_players(
+        projections.load_projection_history(season, db_path=db_path), season=season
+    )
+    if output is None:
+        click.echo(player_projections.to_csv(index=False), nl=False)
+    else:
+        player_projections.to_csv(output, index=False)
+
+
+@cli.command("benchmark")
+@click.option(
+    "--seasons",
+    "scales",
+    type=int,
+    multiple=True,
+    help="Number of synthetic seasons to load (repeatable).",
+)
+@click.option("--baseline", default=None, help="Baseline file to compare against.")
+@click.option(
+    "--tolerance",
+    type=float,
+    default=c.BENCHMARK_TOLERANCE,
+    show_default=True,
+    help="Allowed relative regression.",
+)
+@click.option("--update-baseline", is_flag=True, help="Store results as baseline.")
+def run_benchmarks(
+    scales: Tuple[int, ...],
+    baseline: Optional[str],
+    tolerance: float,
+    update_baseline: bool,
+) -> None:
+    """Time the pipeline end to end on synthetic data against the baseline."""
+    benchmark = lazy_import("benchmark")
+    try:
+        results = benchmark.run_benchmarks(
+            scales=list(scales) or None,
+            baseline_path=baseline,
+            tolerance=tolerance,
+            update_baseline=update_baseline,
+        )
+    except benchmark.BenchmarkRegressionError as error:
+        raise click.ClickException(str(error)) from error
+    click.echo(benchmark.results_frame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    cli()
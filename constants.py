@@ -11,7 +11,9 @@ import datetime as dt
 
 TODAY = dt.datetime.today()
 TODAY_STR = TODAY.strftime("%Y-%m-%d")
-CURRENT_YEAR = TODAY.year if TODAY.month < 8 else TODAY.year - 1
+# Season in progress, or last played: seasons start in September and run
+# into the next calendar year.
+CURRENT_YEAR = TODAY.year if TODAY.month >= 8 else TODAY.year - 1
 
 ##########################
 # nflverse url addendums #
@@ -69,6 +71,301 @@ MISSING_SEASON_MESSAGE = (
     """Season %i data not available for table %s. Skipping season..."""
 )
 
+MISSING_STAT_TYPE_MESSAGE = (
+    """Table {table} needs one of the stat types {stat_types}."""
+)
+
+STARTUP_PROFILE_MESSAGE = (
+    """Startup took {milliseconds:.1f} ms before the command ran."""
+)
+
+IMPORT_PROFILE_MESSAGE = """Imported {module} lazily in {milliseconds:.1f} ms."""
+
+JOB_TIMING_MESSAGE = """Job %s (season %s) finished in %.2fs: download %.2fs, parse %.2fs, write %.2fs, %i rows."""
+
+JOB_FAILED_MESSAGE = """Job %s (season %s) failed during %s: %s"""
+
+JOB_SKIPPED_MESSAGE = """Job %s (season %s) unchanged since last load. Skipping..."""
+
+CACHE_MISS_MESSAGE = (
+    """{url} is not in the download cache and offline mode is enabled."""
+)
+
+SERVING_EXPORT_MESSAGE = """Exported %i rows of %s for %i players to %s."""
+
+MISSING_SERVING_TABLE_MESSAGE = (
+    """Table {table} has not been exported to {serve_dir}."""
+)
+
+PLAYER_IDENTITY_MESSAGE = """Player crosswalk holds %i players, %i of them new."""
+
+PLAYER_IDENTITY_CONFLICT_MESSAGE = (
+    """Dropped %i %s values shared by several players from the crosswalk."""
+)
+
+MISSING_IDENTITY_SOURCE_MESSAGE = (
+    """Crosswalk source %s is not loaded. Building the crosswalk without it..."""
+)
+
+NO_IDENTITY_SOURCES_MESSAGE = """None of the crosswalk sources ({tables}) is loaded.
+Load them with build_db first."""
+
+UNKNOWN_PLAYER_ID_MESSAGE = """Table {table} has no player id in the crosswalk."""
+
+UNKNOWN_TARGET_MESSAGE = (
+    """{target} is neither a pipeline node nor a table one produces."""
+)
+
+PIPELINE_CYCLE_MESSAGE = """Pipeline nodes depend on each other in a cycle: {nodes}"""
+
+PIPELINE_NODE_MESSAGE = """Node %s finished in %.2fs."""
+
+PIPELINE_SKIPPED_MESSAGE = (
+    """Node %s inputs unchanged since its last run. Skipping..."""
+)
+
+PIPELINE_FAILED_MESSAGE = """Node %s failed: %s"""
+
+PIPELINE_UPSTREAM_MESSAGE = """Upstream node {node} failed."""
+
+CACHE_EVICT_MESSAGE = """Evicted %s from the download cache."""
+
+CACHE_CORRUPT_MESSAGE = (
+    """Cached object %s does not match its content hash. Downloading it again..."""
+)
+
+STREAM_STAGING_MESSAGE = """Parquet staging needs whole seasons and cannot be combined with chunked streaming."""
+
+WRITE_RATE_MESSAGE = """Wrote %i rows to %s (season %s) in %.2fs (%.0f rows/s)."""
+
+DUPLICATE_KEY_MESSAGE = (
+    """Table %s repeats natural key %s. Building a non-unique index..."""
+)
+
+DEDUP_MESSAGE = """Dropped %i duplicate rows from %s on key %s"""
+
+QUERY_PLAN_SCAN_MESSAGE = """Query %s is not index-driven: %s"""
+
+FETCH_RETRY_MESSAGE = """Download of %s failed (attempt %i): %s. Retrying in %.1fs..."""
+
+UNKNOWN_STAT_MESSAGE = (
+    """Scoring rule uses {stat}, which is not a numeric player_stats column."""
+)
+
+BENCHMARK_REGRESSION_MESSAGE = """{seasons} season(s) {key}: {metric} {value:,.0f} against baseline {baseline:,.0f}"""
+
+FEATURE_REFRESH_MESSAGE = """Refreshed features for %i changed week(s), dropped %i"""
+
+
+###################
+# instrumentation #
+###################
+
+METRICS_LOGGER = "ff_projections.metrics"
+METRICS_EVENT = "stage"
+METRICS_STAGES = ["fetch", "decompress", "parse", "filter", "write"]
+METRICS_RSS_INTERVAL_SECONDS = 0.01
+METRICS_RSS_SAMPLE_BYTES = 1 << 24
+METRICS_LABEL_STRUCTURE = 'table="{table}",season="{season}",stage="{stage}"'
+METRICS_PROMETHEUS_DICT = {
+    "wall_seconds": (
+        "ff_projections_stage_wall_seconds_total",
+        "counter",
+        "Wall time spent in a build stage.",
+    ),
+    "cpu_seconds": (
+        "ff_projections_stage_cpu_seconds_total",
+        "counter",
+        "CPU time of the thread running a build stage.",
+    ),
+    "bytes": (
+        "ff_projections_stage_bytes_total",
+        "counter",
+        "Bytes handled by a build stage.",
+    ),
+    "rows": (
+        "ff_projections_stage_rows_total",
+        "counter",
+        "Rows handled by a build stage.",
+    ),
+    "peak_rss_bytes": (
+        "ff_projections_stage_peak_rss_bytes",
+        "gauge",
+        "Largest process resident set size seen during a build stage.",
+    ),
+}
+
+
+#############
+# benchmark #
+#############
+
+BENCHMARK_SCALES = [1, 5, 25]
+BENCHMARK_FIRST_SEASON = 1999
+BENCHMARK_SEED = 19
+BENCHMARK_WEEKS = 18
+BENCHMARK_GAMES_PER_WEEK = 16
+BENCHMARK_PLAYS_PER_GAME = 150
+BENCHMARK_PLAYERS = 600
+BENCHMARK_ROSTER_SIZE = 53
+BENCHMARK_TEAMS = [
+    "ARI", "ATL", "BAL", "BUF", "CAR", "CHI", "CIN", "CLE",
+    "DAL", "DEN", "DET", "GB", "HOU", "IND", "JAX", "KC",
+    "LA", "LAC", "LV", "MIA", "MIN", "NE", "NO", "NYG",
+    "NYJ", "PHI", "PIT", "SEA", "SF", "TB", "TEN", "WAS",
+]  # fmt: skip
+BENCHMARK_POSITIONS = ["QB", "RB", "WR", "TE"]
+BENCHMARK_TEXT_VALUES = ["A", "B", "C", "D"]
+BENCHMARK_RSS_INTERVAL_SECONDS = 0.005
+BENCHMARK_TOLERANCE = 0.3
+BENCHMARK_MIN_SECONDS = 0.05
+BENCHMARK_KEY_STRUCTURE = "{table}/{stage}"
+BENCHMARK_BASELINE_PATH = "benchmark_baseline.json"
+BENCHMARK_BUILD_DB_PATH = "build_db.db"
+BENCHMARK_MACHINE_KEY = "machine"
+BENCHMARK_CALIBRATION_ROWS = 100_000
+BENCHMARK_CALIBRATION_REPEATS = 3
+
+
+#####################
+# ingest scheduling #
+#####################
+
+SCHEDULER_MAX_WORKERS = 8
+SCHEDULER_DOWNLOAD_LIMIT = 4
+SCHEDULER_PARSE_LIMIT = 2
+SCHEDULER_WRITE_LIMIT = 1
+
+
+##################
+# download cache #
+##################
+
+CACHE_DIR = "~/.cache/ff_projections"
+CACHE_INDEX_FILE = "index.json"
+CACHE_OBJECTS_DIR = "objects"
+CACHE_MAX_BYTES = 5 * 1024**3
+CACHE_MAX_AGE_SECONDS = 24 * 60 * 60
+CACHE_CHUNK_BYTES = 1 << 20
+
+
+##################
+# async fetching #
+##################
+
+FETCH_DIR = "~/.cache/ff_projections/downloads"
+FETCH_PART_SUFFIX = ".part"
+FETCH_CONCURRENCY = 8
+FETCH_RETRIES = 5
+FETCH_BACKOFF_SECONDS = 0.5
+FETCH_TIMEOUT_SECONDS = 60
+FETCH_CHUNK_BYTES = 1 << 16
+FETCH_RETRY_STATUSES = [408, 429, 500, 502, 503, 504]
+
+
+#####################
+# incremental loads #
+#####################
+
+MANIFEST_PATH = "~/.cache/ff_projections/load_manifest.json"
+MANIFEST_KEY_STRUCTURE = "{table}/{season}"
+
+
+################
+# pipeline DAG #
+################
+
+PIPELINE_STATE_PATH = "~/.cache/ff_projections/pipeline_state.json"
+PIPELINE_MAX_WORKERS = 4
+# Steps run after the source downloads, by the tables they read and write.
+# Every source in ALL_TABLE_NAMES is a node of its own whose outputs are the
+# tables it loads; inputs no node produces are read as they are.
+PIPELINE_STEP_DICT = {
+    "features": {
+        "inputs": ["game", "pbp", "pbp_player", "pbp_probabilities", "pbp_weeks"],
+        "outputs": ["feature_weeks", "player_season_features", "player_week_features"],
+    },
+    "player_identity": {
+        "inputs": ["players", "weekly_rosters"],
+        "outputs": ["player_identity"],
+    },
+    "serving": {
+        "inputs": ["player_stats", "player_week_features", "player_season_features"],
+        "outputs": [],
+    },
+}
+
+
+###################
+# parquet staging #
+###################
+
+STAGING_DIR = "~/.cache/ff_projections/staging"
+STAGING_PARTITION_STRUCTURE = "{table}/season={season}/part.parquet"
+STAGING_ALL_SEASONS = "all"
+STAGING_TEMP_SUFFIX = ".tmp"
+STAGING_COMPRESSION = "snappy"
+
+
+#################
+# serving layer #
+#################
+
+SERVING_DIR = "~/.cache/ff_projections/serving"
+SERVING_FILE_STRUCTURE = "{table}.arrow"
+SERVING_INDEX_STRUCTURE = "{table}.index.arrow"
+SERVING_TEMP_SUFFIX = ".tmp"
+SERVING_KEY_COLUMN = "player_id"
+# Tables read by the projection API on every request. Each is exported sorted
+# by its natural key, which starts with SERVING_KEY_COLUMN.
+SERVING_TABLES = ["player_stats", "player_week_features", "player_season_features"]
+
+
+#######################
+# dictionary encoding #
+#######################
+
+DICTIONARY_TABLE_STRUCTURE = "dictionary_{domain}"
+# Columns stored as integer codes into the dictionary table of a domain, per
+# table. Columns sharing a domain share codes, so they join on integers.
+ENCODED_COLUMN_DICT = {
+    "pbp": {"posteam": "team", "defteam": "team"},
+    "pbp_player": {"player_id": "player", "team": "team"},
+    "player_stats": {
+        "player_id": "player",
+        "position": "position",
+        "recent_team": "team",
+    },
+}
+
+
+#####################
+# chunked streaming #
+#####################
+
+STREAM_CHUNK_ROWS = 10_000
+
+
+######################
+# sqlite bulk writes #
+######################
+
+DB_PATH = "nflverse.db"
+SQLITE_TIMEOUT_SECONDS = 60
+WRITE_BATCH_ROWS = 5_000
+SQLITE_INTEGER_TYPE = "INTEGER"
+SQLITE_REAL_TYPE = "REAL"
+SQLITE_TEXT_TYPE = "TEXT"
+SQLITE_DTYPE_DICT = {
+    "boolean": SQLITE_INTEGER_TYPE,
+    "category": SQLITE_TEXT_TYPE,
+    "float32": SQLITE_REAL_TYPE,
+    "Int8": SQLITE_INTEGER_TYPE,
+    "Int16": SQLITE_INTEGER_TYPE,
+    "Int32": SQLITE_INTEGER_TYPE,
+    "string": SQLITE_TEXT_TYPE,
+}
+
 
 #####################
 # nflverse metadata #
@@ -84,16 +381,35 @@ NFLV_TABLE_DEFAULT = "pbp"
 NFLV_TABLE_NGS = "nextgen_stats"
 NFLV_TABLE_PFR = "pfr_advstats"
 
-NFLV_SUFFIX_DICT = {NFLV_TABLE_NGS: "_{stat_type}", NFLV_TABLE_PFR: "{stat_type}_"}
+NFLV_STAT_TYPE_URL_DICT = {
+    NFLV_TABLE_NGS: "{year}_{stat_type}",
+    NFLV_TABLE_PFR: "{stat_type}_{year}",
+}
+
+# Release directories holding one file per stat type, mapped to the table
+# each stat type loads into.
+NFLV_STAT_TYPE_DICT = {
+    NFLV_TABLE_NGS: {
+        "passing": "ngs_passing",
+        "receiving": "ngs_receiving",
+        "rushing": "ngs_rushing",
+    },
+    NFLV_TABLE_PFR: {
+        "def": "pfr_defense",
+        "pass": "pfr_passing",
+        "rec": "pfr_receiving",
+        "rush": "pfr_rushing",
+    },
+}
+NFLV_STAT_TABLE_DICT = {
+    load_table: table
+    for table, stat_types in NFLV_STAT_TYPE_DICT.items()
+    for load_table in stat_types.values()
+}
 
 NON_SEASONAL_TABLES = ["combine", "contracts", "draft_picks", "officials", "players"]
-ALL_TABLE_NAMES = [key for key in NFLV_DIR_DICT.keys() if key != NFLV_BASE_KEY]
-SEASONAL_TABLES = [
-    key for key in NFLV_DIR_DICT.keys() if key not in NON_SEASONAL_TABLES
-]
 
-SUFFIX_TABLES = ["pfr_advstats"]
-URL_STRUCTURE = "{base_url}{url_addendum}{year}{url_suffix}{extension}"
+URL_STRUCTURE = "{base_url}{url_addendum}{url_file}{extension}"
 
 NFLV_DIR_DICT = {
     "base": {"url": NFLV_BASE_URL, "start_season": NFLV_BASE_START_SEASON},
@@ -122,6 +438,7 @@ NFLV_DIR_DICT = {
         "url": NFLV_PFR_URL_ADDENDUM,
         "season_range": range(NFLV_PFR_START_SEASON, CURRENT_YEAR + 1),
     },
+    "players": {"url": NFLV_PLAYERS_URL_ADDENDUM},
     "player_stats": {
         "url": NFLV_PLAYER_STATS_URL_ADDENDUM,
         "season_range": range(NFLV_PLAYER_STATS_START_SEASON, CURRENT_YEAR + 1),
@@ -137,6 +454,11 @@ NFLV_DIR_DICT = {
     },
 }
 
+ALL_TABLE_NAMES = [key for key in NFLV_DIR_DICT.keys() if key != NFLV_BASE_KEY]
+SEASONAL_TABLES = [
+    key for key in NFLV_DIR_DICT.keys() if key not in NON_SEASONAL_TABLES
+]
+
 ##################
 # renaming dicts #
 ##################
@@ -147,8 +469,6 @@ PBP_RENAME_DICT = {"time": "play_time", "desc": "play_desc"}
 # subset columns #
 ##################
 
-PLAYER_COLS = ["player_id", "player_name"]
-
 COMBINE_TBL_COLUMNS = [
     "season",
     "draft_year",
@@ -199,7 +519,7 @@ CONTRACTS_TBL_COLUMNS = [
 ]
 
 
-DRAFT_TBL_COLUMNS = [
+DEPTH_CHARTS_TBL_COLUMNS = [
     "season",
     "club_code",
     "week",
@@ -537,67 +857,35 @@ PBP_PARTICIPATION_TBL_COLUMNS = [
 ]
 
 
-PBP_PLAYER_TBL_COLUMNS = [
-    "play_id",
-    "game_id",
-    "safety_player_id",
-    "passer_player_id",
-    "receiver_player_id",
-    "rusher_player_id",
-    "lateral_receiver_player_id",
-    "lateral_rusher_player_id",
-    "lateral_rushing_yards",
-    "lateral_sack_player_id",
-    "interception_player_id",
-    "lateral_interception_player_id",
-    "punt_returner_player_id",
-    "lateral_punt_returner_player_id",
-    "kickoff_returner_player_id",
-    "lateral_kickoff_returner_player_id",
-    "punter_player_id",
-    "kicker_player_id",
-    "own_kickoff_recovery_player_id",
-    "blocked_player_id",
-    "tackle_for_loss_1_player_id",
-    "tackle_for_loss_2_player_id",
-    "qb_hit_1_player_id",
-    "qb_hit_2_player_id",
-    "forced_fumble_player_1_team",
-    "forced_fumble_player_1_player_id",
-    "forced_fumble_player_2_team",
-    "forced_fumble_player_2_player_id",
-    "solo_tackle_1_team",
-    "solo_tackle_2_team",
-    "solo_tackle_1_player_id",
-    "solo_tackle_2_player_id",
-    "assist_tackle_1_player_id",
-    "assist_tackle_1_team",
-    "assist_tackle_2_player_id",
-    "assist_tackle_2_team",
-    "assist_tackle_3_player_id",
-    "assist_tackle_3_team",
-    "assist_tackle_4_player_id",
-    "assist_tackle_4_team",
-    "tackle_with_assist_1_player_id",
-    "tackle_with_assist_1_team",
-    "tackle_with_assist_2_player_id",
-    "tackle_with_assist_2_team",
-    "pass_defense_1_player_id",
-    "pass_defense_2_player_id",
-    "fumbled_1_team",
-    "fumbled_1_player_id",
-    "fumbled_2_player_id",
-    "fumbled_2_team",
-    "fumble_recovery_1_team",
-    "fumble_recovery_1_yards",
-    "fumble_recovery_1_player_id",
-    "fumble_recovery_2_team",
-    "fumble_recovery_2_yards",
-    "fumble_recovery_2_player_id",
-    "sack_player_id",
-    "half_sack_1_player_id",
-    "half_sack_2_player_id",
-    "penalty_player_id",
+# pbp_player holds one row per player involved in a play. The wide pbp
+# columns '{role}_player_id', '{role}_{slot}_player_id' and
+# '{role}_player_{slot}_player_id' are melted into (role, slot, player_id),
+# with the team read from the matching '_team' column where pbp has one.
+PBP_PLAYER_TBL_COLUMNS = ["game_id", "play_id", "role", "slot", "player_id", "team"]
+
+PBP_PARTICIPANT_PLAY_COLUMNS = ["game_id", "play_id", "posteam", "defteam"]
+
+PBP_PARTICIPANT_ID_PATTERN = r"(?P<role>.+?)(?:_player)?(?:_(?P<slot>\d+))?_player_id"
+
+PBP_PARTICIPANT_ID_SUFFIX = "player_id"
+
+PBP_PARTICIPANT_TEAM_SUFFIX = "team"
+
+PBP_POSTEAM_ROLES = [
+    "lateral_receiver",
+    "lateral_rusher",
+    "passer",
+    "receiver",
+    "rusher",
+]
+
+PBP_DEFTEAM_ROLES = [
+    "half_sack",
+    "interception",
+    "pass_defense",
+    "qb_hit",
+    "sack",
+    "tackle_for_loss",
 ]
 
 
@@ -753,9 +1041,60 @@ PFR_RECEIVING_TBL_COLUMNS = [
 ]
 
 
+PLAYER_TBL_COLUMNS = [
+    "nflfastr_id",
+    "fantasy_id",
+    "name",
+]
+
+
+PLAYERS_TBL_COLUMNS = [
+    "gsis_id",
+    "display_name",
+    "common_first_name",
+    "first_name",
+    "last_name",
+    "short_name",
+    "football_name",
+    "suffix",
+    "esb_id",
+    "nfl_id",
+    "pfr_id",
+    "pff_id",
+    "otc_id",
+    "espn_id",
+    "smart_id",
+    "birth_date",
+    "position_group",
+    "position",
+    "ngs_position_group",
+    "ngs_position",
+    "height",
+    "weight",
+    "headshot",
+    "college_name",
+    "college_conference",
+    "jersey_number",
+    "rookie_season",
+    "last_season",
+    "latest_team",
+    "status",
+    "ngs_status",
+    "ngs_status_short_description",
+    "years_of_experience",
+    "pff_position",
+    "pff_status",
+    "draft_year",
+    "draft_round",
+    "draft_pick",
+    "draft_team",
+]
+
+
 PLAYER_STATS_TBL_COLUMNS = [
     "player_id",
     "player_name",
+    "position",
     "recent_team",
     "season",
     "week",
@@ -868,13 +1207,987 @@ WEEKLY_ROSTERS_TBL_COLUMNS = [
 # table column dicts #
 ######################
 
+# pbp_weeks summarizes every (season, week) of pbp with a play count and an
+# order-independent checksum (sum of row hashes mod 2**64) of the pbp columns
+# the pbp tables below are built from. Summary tables are aggregated over the
+# whole source file, so streamed loads combine chunk summaries before writing.
+PBP_WEEKS_TBL_COLUMNS = ["season", "week", "season_type", "plays", "checksum"]
+
+PBP_WEEKS_GROUP_COLUMNS = ["season", "week", "season_type"]
+
+PBP_WEEKS_HASHED_TABLES = ["pbp", "pbp_player", "pbp_probabilities"]
+
+SUMMARY_TABLES = ["pbp_weeks"]
+
+PLAYER_WEEK_FEATURES_TBL_COLUMNS = [
+    "player_id",
+    "season",
+    "week",
+    "season_type",
+    "team",
+    "targets",
+    "receptions",
+    "receiving_air_yards",
+    "carries",
+    "carries_inside_10",
+    "red_zone_targets",
+    "red_zone_carries",
+    "red_zone_looks",
+    "passing_epa",
+    "rushing_epa",
+    "receiving_epa",
+    "total_epa",
+]
+
+PLAYER_SEASON_FEATURES_TBL_COLUMNS = [
+    "player_id",
+    "season",
+    "team",
+    "games",
+    *PLAYER_WEEK_FEATURES_TBL_COLUMNS[5:],
+]
+
+FEATURE_WEEKS_TBL_COLUMNS = ["season", "week", "checksum"]
+
+PLAYER_IDENTITY_ID_COLUMNS = [
+    "gsis_id",
+    "pfr_id",
+    "espn_id",
+    "sportradar_id",
+    "yahoo_id",
+    "rotowire_id",
+    "pff_id",
+    "fantasy_data_id",
+    "sleeper_id",
+    "esb_id",
+    "otc_id",
+]
+
+PLAYER_IDENTITY_TBL_COLUMNS = ["player_key", *PLAYER_IDENTITY_ID_COLUMNS, "full_name"]
+
+FEATURE_TABLE_DICT = {
+    "feature_weeks": FEATURE_WEEKS_TBL_COLUMNS,
+    "player_season_features": PLAYER_SEASON_FEATURES_TBL_COLUMNS,
+    "player_week_features": PLAYER_WEEK_FEATURES_TBL_COLUMNS,
+}
+
+
 NFLV_TABLE_DICT = {
     "drive": DRIVE_TBL_COLUMNS,
     "game": GAME_TBL_COLUMNS,
     "pbp": PBP_TBL_COLUMNS,
     "pbp_player": PBP_PLAYER_TBL_COLUMNS,
     "pbp_probabilities": PBP_PROBABILITIES_TBL_COLUMNS,
+    "pbp_weeks": PBP_WEEKS_TBL_COLUMNS,
     "player_stats": PLAYER_STATS_TBL_COLUMNS,
     "rushing": RUSHING_TBL_COLUMNS,
     "weekly_rosters": WEEKLY_ROSTERS_TBL_COLUMNS,
 }
+
+NFLV_SCHEMA_DICT = {
+    **NFLV_TABLE_DICT,
+    **FEATURE_TABLE_DICT,
+    "combine": COMBINE_TBL_COLUMNS,
+    "contracts": CONTRACTS_TBL_COLUMNS,
+    "depth_charts": DEPTH_CHARTS_TBL_COLUMNS,
+    "draft_picks": DRAFT_PICKS_TBL_COLUMNS,
+    "ngs_passing": NGS_PASSING_TBL_COLUMNS,
+    "ngs_receiving": NGS_RECEIVING_TBL_COLUMNS,
+    "ngs_rushing": NGS_RUSHING_TBL_COLUMNS,
+    "pbp_participation": PBP_PARTICIPATION_TBL_COLUMNS,
+    "pfr_defense": PFR_DEFENSE_TBL_COLUMNS,
+    "pfr_passing": PFR_PASSING_TBL_COLUMNS,
+    "pfr_receiving": PFR_RECEIVING_TBL_COLUMNS,
+    "player": PLAYER_TBL_COLUMNS,
+    "player_identity": PLAYER_IDENTITY_TBL_COLUMNS,
+    "players": PLAYERS_TBL_COLUMNS,
+}
+
+NON_SEASONAL_SCHEMA_TABLES = ["contracts", "player", "player_identity", "players"]
+WITHOUT_ROWID_TABLES = [
+    "drive",
+    "feature_weeks",
+    "game",
+    "pbp_weeks",
+    "player_identity",
+    "player_season_features",
+    "player_week_features",
+]
+
+NFLV_SOURCE_TABLE_DICT = {
+    "drive": "pbp",
+    "game": "pbp",
+    "pbp": "pbp",
+    "pbp_player": "pbp",
+    "pbp_probabilities": "pbp",
+    "pbp_weeks": "pbp",
+    "player_stats": "player_stats",
+    "rushing": "pfr_rushing",
+    "weekly_rosters": "weekly_rosters",
+}
+
+
+#########################
+# column dtype registry #
+#########################
+
+CATEGORY_DTYPE = "category"
+STRING_DTYPE = "string"
+BOOLEAN_DTYPE = "boolean"
+INT8_DTYPE = "Int8"
+INT16_DTYPE = "Int16"
+INT32_DTYPE = "Int32"
+FLOAT32_DTYPE = "float32"
+
+CATEGORY_COLUMNS = [
+    "assist_tackle_1_team",
+    "assist_tackle_2_team",
+    "assist_tackle_3_team",
+    "assist_tackle_4_team",
+    "away_coach",
+    "away_team",
+    "category",
+    "club_code",
+    "college",
+    "college_conference",
+    "defense_personnel",
+    "defteam",
+    "depth_chart_position",
+    "depth_position",
+    "depth_team",
+    "draft_club",
+    "draft_team",
+    "drive_end_transition",
+    "drive_start_transition",
+    "extra_point_result",
+    "field_goal_result",
+    "fixed_drive_result",
+    "forced_fumble_player_1_team",
+    "forced_fumble_player_2_team",
+    "formation",
+    "fumble_recovery_1_team",
+    "fumble_recovery_2_team",
+    "fumbled_1_team",
+    "fumbled_2_team",
+    "game_half",
+    "game_type",
+    "home_coach",
+    "home_team",
+    "ngs_position",
+    "ngs_position_group",
+    "ngs_status",
+    "ngs_status_short_description",
+    "offense_formation",
+    "offense_personnel",
+    "opponent",
+    "pass_length",
+    "pass_location",
+    "penalty_team",
+    "penalty_type",
+    "pff_position",
+    "pff_status",
+    "play_type",
+    "player_position",
+    "pos",
+    "position",
+    "position_group",
+    "possession_team",
+    "posteam",
+    "recent_team",
+    "replay_or_challenge_result",
+    "return_team",
+    "role",
+    "roof",
+    "run_gap",
+    "run_location",
+    "school",
+    "season_type",
+    "side",
+    "side_of_field",
+    "solo_tackle_1_team",
+    "solo_tackle_2_team",
+    "stadium",
+    "stadium_id",
+    "status",
+    "status_description_abbr",
+    "surface",
+    "tackle_with_assist_1_team",
+    "tackle_with_assist_2_team",
+    "td_team",
+    "team",
+    "team_abbr",
+    "timeout_team",
+    "two_point_conv_result",
+]
+
+STRING_COLUMNS = [
+    "assist_tackle_1_player_id",
+    "assist_tackle_2_player_id",
+    "assist_tackle_3_player_id",
+    "assist_tackle_4_player_id",
+    "birth_date",
+    "blocked_player_id",
+    "cfb_id",
+    "cfb_player_id",
+    "checksum",
+    "college_name",
+    "common_first_name",
+    "date_of_birth",
+    "defense_players",
+    "display_name",
+    "drive_end_yard_line",
+    "drive_game_clock_end",
+    "drive_game_clock_start",
+    "drive_real_start_time",
+    "drive_start_yard_line",
+    "drive_time_of_possession",
+    "elias_id",
+    "esb_id",
+    "espn_id",
+    "fantasy_data_id",
+    "fantasy_id",
+    "first_name",
+    "football_name",
+    "forced_fumble_player_1_player_id",
+    "forced_fumble_player_2_player_id",
+    "full_name",
+    "fumble_recovery_1_player_id",
+    "fumble_recovery_2_player_id",
+    "fumbled_1_player_id",
+    "fumbled_2_player_id",
+    "game_date",
+    "game_id",
+    "gsis_id",
+    "gsis_it_id",
+    "half_sack_1_player_id",
+    "half_sack_2_player_id",
+    "headshot",
+    "headshot_url",
+    "height",
+    "ht",
+    "interception_player_id",
+    "kicker_player_id",
+    "kickoff_returner_player_id",
+    "last_name",
+    "lateral_interception_player_id",
+    "lateral_kickoff_returner_player_id",
+    "lateral_punt_returner_player_id",
+    "lateral_receiver_player_id",
+    "lateral_rusher_player_id",
+    "lateral_sack_player_id",
+    "name",
+    "nfl_api_id",
+    "nfl_id",
+    "nflfastr_id",
+    "offense_players",
+    "old_game_id",
+    "otc_id",
+    "own_kickoff_recovery_player_id",
+    "pass_defense_1_player_id",
+    "pass_defense_2_player_id",
+    "passer_player_id",
+    "penalty_player_id",
+    "pff_id",
+    "pfr_game_id",
+    "pfr_id",
+    "pfr_player_id",
+    "pfr_player_name",
+    "play_desc",
+    "play_time",
+    "player",
+    "player_display_name",
+    "player_first_name",
+    "player_gsis_id",
+    "player_id",
+    "player_last_name",
+    "player_name",
+    "player_page",
+    "player_short_name",
+    "punt_returner_player_id",
+    "punter_player_id",
+    "qb_hit_1_player_id",
+    "qb_hit_2_player_id",
+    "receiver_player_id",
+    "rotowire_id",
+    "rusher_player_id",
+    "sack_player_id",
+    "safety_player_id",
+    "season_history",
+    "short_name",
+    "sleeper_id",
+    "smart_id",
+    "solo_tackle_1_player_id",
+    "solo_tackle_2_player_id",
+    "sportradar_id",
+    "start_time",
+    "suffix",
+    "tackle_for_loss_1_player_id",
+    "tackle_for_loss_2_player_id",
+    "tackle_with_assist_1_player_id",
+    "tackle_with_assist_2_player_id",
+    "td_player_id",
+    "td_player_name",
+    "weather",
+    "yahoo_id",
+    "yrdln",
+]
+
+BOOLEAN_COLUMNS = [
+    "hof",
+    "is_active",
+]
+
+INT8_COLUMNS = [
+    "allpro",
+    "assist_tackle",
+    "away_timeouts_remaining",
+    "complete_pass",
+    "def_ints",
+    "def_receiving_td_allowed",
+    "defenders_in_box",
+    "defensive_extra_point_attempt",
+    "defensive_extra_point_conv",
+    "defensive_two_point_attempt",
+    "defensive_two_point_conv",
+    "down",
+    "draft_round",
+    "drive_ended_with_score",
+    "drive_first_downs",
+    "drive_inside20",
+    "drive_quarter_end",
+    "drive_quarter_start",
+    "extra_point_attempt",
+    "field_goal_attempt",
+    "first_down",
+    "first_down_pass",
+    "first_down_penalty",
+    "first_down_rush",
+    "fourth_down_converted",
+    "fourth_down_failed",
+    "fumble",
+    "fumble_forced",
+    "fumble_lost",
+    "fumble_not_forced",
+    "fumble_out_of_bounds",
+    "goal_to_go",
+    "home_opening_kickoff",
+    "home_timeouts_remaining",
+    "incomplete_pass",
+    "interception",
+    "jersey_number",
+    "kickoff_attempt",
+    "kickoff_downed",
+    "kickoff_fair_catch",
+    "kickoff_in_endzone",
+    "kickoff_inside_twenty",
+    "kickoff_out_of_bounds",
+    "lateral_reception",
+    "lateral_recovery",
+    "lateral_return",
+    "lateral_rush",
+    "n_defense",
+    "n_offense",
+    "no_huddle",
+    "number_of_pass_rushers",
+    "out_of_bounds",
+    "own_kickoff_recovery",
+    "own_kickoff_recovery_td",
+    "pass",
+    "pass_attempt",
+    "pass_touchdown",
+    "passing_2pt_conversions",
+    "penalty",
+    "play",
+    "player_jersey_number",
+    "probowls",
+    "punt_attempt",
+    "punt_blocked",
+    "punt_downed",
+    "punt_fair_catch",
+    "punt_in_endzone",
+    "punt_inside_twenty",
+    "punt_out_of_bounds",
+    "qb_dropback",
+    "qb_hit",
+    "qb_kneel",
+    "qb_scramble",
+    "qb_spike",
+    "qtr",
+    "quarter_end",
+    "receiving_2pt_conversions",
+    "receiving_fumbles",
+    "receiving_fumbles_lost",
+    "receiving_int",
+    "return_touchdown",
+    "round",
+    "rush",
+    "rush_attempt",
+    "rush_touchdown",
+    "rushing_2pt_conversions",
+    "rushing_fumbles",
+    "rushing_fumbles_lost",
+    "sack",
+    "sack_fumbles",
+    "sack_fumbles_lost",
+    "safety",
+    "seasons_started",
+    "shotgun",
+    "slot",
+    "solo_tackle",
+    "sp",
+    "special",
+    "special_teams_tds",
+    "tackle_with_assist",
+    "tackled_for_loss",
+    "temp",
+    "third_down_converted",
+    "third_down_failed",
+    "timeout",
+    "touchback",
+    "touchdown",
+    "two_point_attempt",
+    "week",
+    "wind",
+    "yardline_100",
+    "ydstogo",
+    "years",
+    "years_exp",
+    "years_of_experience",
+]
+
+INT16_COLUMNS = [
+    "air_yards",
+    "attempts",
+    "car_av",
+    "carries",
+    "carries_inside_10",
+    "completions",
+    "def_air_yards_completed",
+    "def_completions_allowed",
+    "def_missed_tackles",
+    "def_pressures",
+    "def_solo_tackles",
+    "def_tackles_combined",
+    "def_targets",
+    "def_times_blitzed",
+    "def_times_hitqb",
+    "def_times_hurried",
+    "def_yards_after_catch",
+    "def_yards_allowed",
+    "defteam_score_post",
+    "dr_av",
+    "draft_number",
+    "draft_overall",
+    "draft_ovr",
+    "draft_pick",
+    "draft_year",
+    "drive_play_count",
+    "drive_play_id_ended",
+    "drive_play_id_started",
+    "drive_yards_penalized",
+    "entry_year",
+    "fixed_drive",
+    "fumble_recovery_1_yards",
+    "fumble_recovery_2_yards",
+    "game_seconds_remaining",
+    "games",
+    "half_seconds_remaining",
+    "interceptions",
+    "kick_distance",
+    "last_season",
+    "lateral_receiving_yards",
+    "lateral_rushing_yards",
+    "pass_attempts",
+    "pass_completions",
+    "pass_ints",
+    "pass_tds",
+    "pass_touchdowns",
+    "passing_air_yards",
+    "passing_bad_throws",
+    "passing_drops",
+    "passing_first_downs",
+    "passing_tds",
+    "passing_yards",
+    "passing_yards_after_catch",
+    "pick",
+    "play_id",
+    "posteam_score_post",
+    "quarter_seconds_remaining",
+    "rec_tds",
+    "rec_touchdowns",
+    "rec_yards",
+    "receiving_air_yards",
+    "receiving_broken_tackles",
+    "receiving_drop",
+    "receiving_first_downs",
+    "receiving_tds",
+    "receiving_yards",
+    "receiving_yards_after_catch",
+    "receptions",
+    "red_zone_carries",
+    "red_zone_looks",
+    "red_zone_targets",
+    "return_yards",
+    "rookie_season",
+    "rookie_year",
+    "rush_attempts",
+    "rush_atts",
+    "rush_tds",
+    "rush_touchdowns",
+    "rush_yards",
+    "rushing_broken_tackles",
+    "rushing_first_downs",
+    "rushing_tds",
+    "rushing_yards",
+    "rushing_yards_after_contact",
+    "rushing_yards_before_contact",
+    "sack_yards",
+    "score_differential",
+    "score_differential_post",
+    "season",
+    "series",
+    "targets",
+    "times_blitzed",
+    "times_hit",
+    "times_hurried",
+    "times_pressured",
+    "times_sacked",
+    "to",
+    "total_away_score",
+    "total_home_score",
+    "w_av",
+    "weight",
+    "wt",
+    "yards",
+    "yards_after_catch",
+    "yards_gained",
+    "ydsneg",
+    "year_signed",
+]
+
+INT32_COLUMNS = [
+    "pass_yards",
+    "player_key",
+    "plays",
+]
+
+FLOAT32_COLUMNS = [
+    "age",
+    "aggressiveness",
+    "air_epa",
+    "air_wpa",
+    "air_yards_share",
+    "apy",
+    "apy_cap_pct",
+    "avg_air_distance",
+    "avg_air_yards_differential",
+    "avg_air_yards_to_sticks",
+    "avg_completed_air_yards",
+    "avg_cushion",
+    "avg_expected_yac",
+    "avg_intended_air_yards",
+    "avg_rush_yards",
+    "avg_separation",
+    "avg_time_to_los",
+    "avg_time_to_throw",
+    "avg_yac",
+    "avg_yac_above_expectation",
+    "away_wp",
+    "away_wp_post",
+    "bench",
+    "broad_jump",
+    "catch_percentage",
+    "comp_air_epa",
+    "comp_air_wpa",
+    "comp_yac_epa",
+    "comp_yac_wpa",
+    "completion_percentage",
+    "completion_percentage_above_expectation",
+    "cone",
+    "dakota",
+    "def_adot",
+    "def_completion_pct",
+    "def_missed_tackle_pct",
+    "def_passer_rating_allowed",
+    "def_sacks",
+    "def_wp",
+    "def_yards_allowed_per_cmp",
+    "def_yards_allowed_per_tgt",
+    "efficiency",
+    "ep",
+    "epa",
+    "expected_completion_percentage",
+    "expected_rush_yards",
+    "extra_point_prob",
+    "fantasy_points",
+    "fantasy_points_ppr",
+    "fg_prob",
+    "forty",
+    "guaranteed",
+    "home_wp",
+    "home_wp_post",
+    "inflated_apy",
+    "inflated_guaranteed",
+    "inflated_value",
+    "max_air_distance",
+    "max_completed_air_distance",
+    "no_score_prob",
+    "opp_fg_prob",
+    "opp_safety_prob",
+    "opp_td_prob",
+    "pacr",
+    "pass_oe",
+    "passer_rating",
+    "passing_bad_throw_pct",
+    "passing_drop_pct",
+    "passing_epa",
+    "percent_attempts_gte_eight_defenders",
+    "percent_share_of_intended_air_yards",
+    "qb_epa",
+    "racr",
+    "receiving_drop_pct",
+    "receiving_epa",
+    "receiving_rat",
+    "rush_pct_over_expected",
+    "rush_yards_over_expected",
+    "rush_yards_over_expected_per_att",
+    "rushing_epa",
+    "rushing_yards_after_contact_avg",
+    "rushing_yards_before_contact_avg",
+    "sacks",
+    "safety_prob",
+    "shuttle",
+    "target_share",
+    "td_prob",
+    "times_pressured_pct",
+    "total_away_comp_air_epa",
+    "total_away_comp_air_wpa",
+    "total_away_comp_yac_epa",
+    "total_away_comp_yac_wpa",
+    "total_away_epa",
+    "total_away_pass_epa",
+    "total_away_pass_wpa",
+    "total_away_raw_air_epa",
+    "total_away_raw_air_wpa",
+    "total_away_raw_yac_epa",
+    "total_away_raw_yac_wpa",
+    "total_away_rush_epa",
+    "total_away_rush_wpa",
+    "total_epa",
+    "total_home_comp_air_epa",
+    "total_home_comp_air_wpa",
+    "total_home_comp_yac_epa",
+    "total_home_comp_yac_wpa",
+    "total_home_epa",
+    "total_home_pass_epa",
+    "total_home_pass_wpa",
+    "total_home_raw_air_epa",
+    "total_home_raw_air_wpa",
+    "total_home_raw_yac_epa",
+    "total_home_raw_yac_wpa",
+    "total_home_rush_epa",
+    "total_home_rush_wpa",
+    "two_point_conversion_prob",
+    "value",
+    "vegas_home_wp",
+    "vegas_home_wpa",
+    "vegas_wp",
+    "vegas_wpa",
+    "vertical",
+    "wopr",
+    "wp",
+    "wpa",
+    "xpass",
+    "xyac_epa",
+    "xyac_fd",
+    "xyac_mean_yardage",
+    "xyac_median_yardage",
+    "xyac_success",
+    "yac_epa",
+    "yac_wpa",
+]
+
+NFLV_DTYPE_DICT = {
+    **dict.fromkeys(CATEGORY_COLUMNS, CATEGORY_DTYPE),
+    **dict.fromkeys(STRING_COLUMNS, STRING_DTYPE),
+    **dict.fromkeys(BOOLEAN_COLUMNS, BOOLEAN_DTYPE),
+    **dict.fromkeys(INT8_COLUMNS, INT8_DTYPE),
+    **dict.fromkeys(INT16_COLUMNS, INT16_DTYPE),
+    **dict.fromkeys(INT32_COLUMNS, INT32_DTYPE),
+    **dict.fromkeys(FLOAT32_COLUMNS, FLOAT32_DTYPE),
+}
+
+NFLV_DTYPE_SUFFIX_DICT = {
+    "_player_id": STRING_DTYPE,
+    "_player_name": STRING_DTYPE,
+    "_team": CATEGORY_DTYPE,
+}
+
+
+#####################
+# natural key dicts #
+#####################
+
+KEY_DEDUP_TABLES = ["drive", "game"]
+
+NFLV_TABLE_KEY_DICT = {
+    "combine": ["season", "player_name", "pos", "school"],
+    "contracts": ["otc_id", "team", "year_signed"],
+    "depth_charts": ["season", "week", "club_code", "formation", "gsis_id"],
+    "draft_picks": ["season", "pick"],
+    "drive": ["game_id", "fixed_drive"],
+    "feature_weeks": ["season", "week"],
+    "game": ["game_id"],
+    "nextgen_stats": ["season", "season_type", "week", "player_gsis_id"],
+    "ngs_passing": ["season", "season_type", "week", "player_gsis_id"],
+    "ngs_receiving": ["season", "season_type", "week", "player_gsis_id"],
+    "ngs_rushing": ["season", "season_type", "week", "player_gsis_id"],
+    "pbp": ["game_id", "play_id"],
+    "pbp_participation": ["old_game_id", "play_id"],
+    "pbp_player": ["game_id", "play_id", "role", "slot"],
+    "pbp_probabilities": ["game_id", "play_id"],
+    "pbp_weeks": ["season", "week"],
+    "pfr_advstats": ["game_id", "pfr_player_id"],
+    "pfr_defense": ["game_id", "pfr_player_id"],
+    "pfr_passing": ["game_id", "pfr_player_id"],
+    "pfr_receiving": ["game_id", "pfr_player_id"],
+    "player": ["nflfastr_id"],
+    "player_identity": ["player_key"],
+    "players": ["gsis_id"],
+    "player_season_features": ["player_id", "season"],
+    "player_stats": ["player_id", "season", "week", "season_type"],
+    "player_week_features": ["player_id", "season", "week"],
+    "rushing": ["game_id", "pfr_player_id"],
+    "snap_counts": ["game_id", "pfr_player_id"],
+    "weekly_rosters": ["season", "week", "team", "gsis_id"],
+}
+
+
+#########################
+# secondary index dicts #
+#########################
+
+# Indexes built alongside the natural keys in NFLV_TABLE_KEY_DICT. Trailing
+# columns make the indexes covering for the fantasy aggregates, so those
+# queries are answered from the index without touching the table.
+NFLV_TABLE_INDEX_DICT = {
+    "game": {"season_week": ["season", "week", "home_team", "away_team"]},
+    "pbp": {"season_posteam": ["season", "posteam", "game_id", "play_id"]},
+    "pbp_player": {"player": ["player_id", "game_id", "play_id", "role"]},
+    "player_stats": {
+        "season_week_points": [
+            "season",
+            "week",
+            "player_id",
+            "fantasy_points",
+            "fantasy_points_ppr",
+        ],
+        "season_team": ["season", "recent_team", "player_id"],
+    },
+    "player_identity": {
+        "gsis": ["gsis_id", "player_key"],
+        "pfr": ["pfr_id", "player_key"],
+    },
+    "player_season_features": {"season": ["season", "player_id"]},
+    "player_week_features": {"season_week": ["season", "week", "player_id"]},
+    "rushing": {"player": ["pfr_player_id", "season", "week"]},
+    "weekly_rosters": {
+        "season_team": ["season", "team", "week"],
+        "player": ["gsis_id", "season", "week"],
+    },
+}
+
+
+#################
+# feature store #
+#################
+
+FEATURE_ROLES = ["passer", "receiver", "rusher"]
+
+FEATURE_SEASON_TYPE = "REG"
+
+RED_ZONE_YARDLINE = 20
+
+INSIDE_10_YARDLINE = 10
+
+
+#####################
+# player identities #
+#####################
+
+# Columns of the source tables feeding the crosswalk, renamed to
+# PLAYER_IDENTITY_TBL_COLUMNS. Later sources win, so the curated players
+# release overrides roster ids, and within weekly_rosters the latest week
+# that has an id wins.
+PLAYER_IDENTITY_SOURCE_DICT = {
+    "weekly_rosters": {
+        **{column: column for column in PLAYER_IDENTITY_ID_COLUMNS[:-1]},
+        "full_name": "full_name",
+    },
+    "players": {
+        **{
+            column: column
+            for column in ["gsis_id", "pfr_id", "espn_id", "pff_id", "esb_id", "otc_id"]
+        },
+        "display_name": "full_name",
+    },
+}
+
+# Player id column of each table and the crosswalk id it holds.
+PLAYER_IDENTITY_TABLE_DICT = {
+    "combine": ("pfr_id", "pfr_id"),
+    "contracts": ("otc_id", "otc_id"),
+    "depth_charts": ("gsis_id", "gsis_id"),
+    "draft_picks": ("gsis_id", "gsis_id"),
+    "ngs_passing": ("player_gsis_id", "gsis_id"),
+    "ngs_receiving": ("player_gsis_id", "gsis_id"),
+    "ngs_rushing": ("player_gsis_id", "gsis_id"),
+    "pbp_player": ("player_id", "gsis_id"),
+    "pfr_defense": ("pfr_player_id", "pfr_id"),
+    "pfr_passing": ("pfr_player_id", "pfr_id"),
+    "pfr_receiving": ("pfr_player_id", "pfr_id"),
+    "player": ("nflfastr_id", "gsis_id"),
+    "players": ("gsis_id", "gsis_id"),
+    "player_season_features": ("player_id", "gsis_id"),
+    "player_stats": ("player_id", "gsis_id"),
+    "player_week_features": ("player_id", "gsis_id"),
+    "rushing": ("pfr_player_id", "pfr_id"),
+    "weekly_rosters": ("gsis_id", "gsis_id"),
+}
+
+
+######################
+# season projections #
+######################
+
+PROJECTION_GAMES = 17
+
+PROJECTION_HISTORY_SEASONS = 3
+
+# Weight of a season relative to the one after it.
+PROJECTION_SEASON_DECAY = 0.6
+
+PROJECTION_OPPORTUNITY_COLUMNS = ["attempts", "targets", "carries"]
+
+# Projected stats and the opportunity each one is a rate of.
+PROJECTION_RATE_DICT = {
+    "completions": "attempts",
+    "passing_yards": "attempts",
+    "passing_tds": "attempts",
+    "interceptions": "attempts",
+    "receptions": "targets",
+    "receiving_yards": "targets",
+    "receiving_tds": "targets",
+    "rushing_yards": "carries",
+    "rushing_tds": "carries",
+}
+
+# League-average opportunities a player's rates are shrunk with.
+PROJECTION_PRIOR_OPPORTUNITY_DICT = {"attempts": 150, "targets": 50, "carries": 60}
+
+PROJECTION_POINTS_DICT = {
+    "passing_yards": 0.04,
+    "passing_tds": 4.0,
+    "interceptions": -2.0,
+    "receptions": 1.0,
+    "receiving_yards": 0.1,
+    "receiving_tds": 6.0,
+    "rushing_yards": 0.1,
+    "rushing_tds": 6.0,
+}
+
+PROJECTION_TBL_COLUMNS = [
+    "player_id",
+    "player_name",
+    "position",
+    "recent_team",
+    "season",
+    "games",
+    *PROJECTION_OPPORTUNITY_COLUMNS,
+    *PROJECTION_RATE_DICT,
+    "fantasy_points_ppr",
+]
+
+
+##########################
+# monte carlo simulation #
+##########################
+
+SIMULATION_SEASONS = 10_000
+
+# Seasons per shard: shards get their own seed, so results only depend on
+# the seed and the shard size, never on the number of workers.
+SIMULATION_SHARD_SEASONS = 1_000
+
+# Seasons sampled per array batch inside a shard, bounding peak memory.
+SIMULATION_BATCH_SEASONS = 250
+
+SIMULATION_SEED = 2_024
+
+# Share of a player's weekly variance shared with their team and game.
+SIMULATION_TEAM_CORRELATION = 0.25
+
+SIMULATION_GAME_CORRELATION = 0.1
+
+# Players with fewer history games use the league coefficient of variation.
+SIMULATION_MIN_GAMES = 4
+
+SIMULATION_HISTOGRAM_BINS = 400
+
+SIMULATION_HISTOGRAM_SPAN = 4.0
+
+SIMULATION_PERCENTILES = [10, 25, 50, 75, 90]
+
+BOOM_MULTIPLIER = 1.5
+
+BUST_MULTIPLIER = 0.5
+
+SIMULATION_TBL_COLUMNS = [
+    "player_id",
+    "player_name",
+    "recent_team",
+    "mean",
+    "std",
+    *[f"p{percentile}" for percentile in SIMULATION_PERCENTILES],
+    "boom_rate",
+    "bust_rate",
+]
+
+
+###################
+# fantasy scoring #
+###################
+
+SCORING_POINTS_KEY = "points"
+
+SCORING_POSITION_POINTS_KEY = "position_points"
+
+SCORING_BONUSES_KEY = "bonuses"
+
+SCORING_CACHE_SIZE = 256
+
+SCORING_STANDARD_POINTS = {
+    "passing_yards": 0.04,
+    "passing_tds": 4.0,
+    "interceptions": -2.0,
+    "passing_2pt_conversions": 2.0,
+    "rushing_yards": 0.1,
+    "rushing_tds": 6.0,
+    "rushing_2pt_conversions": 2.0,
+    "receiving_yards": 0.1,
+    "receiving_tds": 6.0,
+    "receiving_2pt_conversions": 2.0,
+    "rushing_fumbles_lost": -2.0,
+    "receiving_fumbles_lost": -2.0,
+    "sack_fumbles_lost": -2.0,
+    "special_teams_tds": 6.0,
+}
+
+# A league's scoring config: points per unit of player_stats columns, extra
+# points per unit for some positions (e.g. a TE premium) and threshold
+# bonuses earned when a stat reaches a value in a game.
+SCORING_PRESET_DICT = {
+    "standard": {SCORING_POINTS_KEY: SCORING_STANDARD_POINTS},
+    "half_ppr": {SCORING_POINTS_KEY: {**SCORING_STANDARD_POINTS, "receptions": 0.5}},
+    "ppr": {SCORING_POINTS_KEY: {**SCORING_STANDARD_POINTS, "receptions": 1.0}},
+}
@@ -0,0 +1,182 @@
+"""
+encoding.py
+This file contains the dictionary encoding of repetitive string columns
+(teams, positions, player ids), storing them in SQLite as small integer
+codes into per-domain dictionary tables and decoding them into categoricals
+on the way out, so strings are only materialized when a value is used
+"""
+
+import sqlite3
+
+from typing import Dict
+import numpy as np
+import pandas as pd
+import constants as c
+import queries as q
+
+
+def dictionary_table(domain: str) -> str:
+    """Helper function to name the dictionary table of a domain."""
+    return c.DICTIONARY_TABLE_STRUCTURE.format(domain=domain)
+
+
+def encoded_columns(table: str, data: pd.DataFrame) -> Dict[str, str]:
+    """Helper function to list the encoded columns of a table present in data.
+
+    Parameters
+    ----------
+    table : str
+        Name of the table.
+    data : pd.DataFrame
+        Table data.
+
+    Returns
+    -------
+    columns : Dict[str, str]
+        Domain of every column of ``data`` encoded in the table.
+    """
+    return {
+        column: domain
+        for column, domain in c.ENCODED_COLUMN_DICT.get(table, {}).items()
+        if column in data.columns
+    }
+
+
+def read_dictionary(connection: sqlite3.Connection, domain: str) -> pd.Series:
+    """Helper function to read the dictionary of a domain.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        Open database connection.
+    domain : str
+        Dictionary domain, a value of c.ENCODED_COLUMN_DICT.
+
+    Returns
+    -------
+    dictionary : pd.Series
+        Values indexed by code, in code order.
+    """
+    table = dictionary_table(domain)
+    connection.execute(q.CREATE_DICTIONARY_QUERY_STRUCTURE.format(table=table))
+    rows = connection.execute(
+        q.DICTIONARY_QUERY_STRUCTURE.format(table=table)
+    ).fetchall()
+    return pd.Series(
+        [value for _, value in rows],
+        index=pd.Index([code for code, _ in rows], dtype=np.int64),
+        dtype=object,
+    )
+
+
+def encode_values(
+    connection: sqlite3.Connection, domain: str, values: pd.Series
+) -> pd.Series:
+    """Helper function to replace values by their dictionary codes.
+
+    Values missing from the dictionary are added first. The column is
+    factorized once, so only its distinct values are looked up.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        Open database connection.
+    domain : str
+        Dictionary domain.
+    values : pd.Series
+        Values to encode.
+
+    Returns
+    -------
+    codes : pd.Series
+        Int32 codes aligned with ``values``, NA for missing values.
+    """
+    table = dictionary_table(domain)
+    categorical = pd.Categorical(values)
+    categories = [str(category) for category in categorical.categories]
+    connection.execute(q.CREATE_DICTIONARY_QUERY_STRUCTURE.format(table=table))
+    connection.executemany(
+        q.DICTIONARY_INSERT_QUERY_STRUCTURE.format(table=table),
+        [(category,) for category in categories],
+    )
+    dictionary = read_dictionary(connection, domain)
+    positions = pd.Index(dictionary.to_numpy()).get_indexer(categories)
+    category_codes = dictionary.index.to_numpy()[positions]
+    codes = np.append(category_codes, 0)[categorical.codes].astype(np.int32)
+    return pd.Series(
+        pd.arrays.IntegerArray(codes, categorical.codes < 0),
+        index=values.index,
+        name=values.name,
+    )
+
+
+def encode_columns(
+    connection: sqlite3.Connection, table: str, data: pd.DataFrame
+) -> pd.DataFrame:
+    """Function to dictionary encode the columns of a table before writing.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        Open database connection.
+    table : str
+        Name of the table the data is written to.
+    data : pd.DataFrame
+        Table data.
+
+    Returns
+    -------
+    data : pd.DataFrame
+        Copy of the data with every encoded column replaced by its codes.
+    """
+    columns = encoded_columns(table, data)
+    if not columns:
+        return data
+    return data.assign(
+        **{
+            column: encode_values(connection, domain, data[column])
+            for column, domain in columns.items()
+        }
+    )
+
+
+def decode_columns(
+    connection: sqlite3.Connection, table: str, data: pd.DataFrame
+) -> pd.DataFrame:
+    """Function to decode the dictionary codes of a table read from SQLite.
+
+    Codes become categoricals over the whole dictionary, so every string is
+    held once rather than once per row. Columns already holding strings are
+    left untouched.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        Open database connection.
+    table : str
+        Name of the table the columns were read from.
+    data : pd.DataFrame
+        Data read from the table.
+
+    Returns
+    -------
+    data : pd.DataFrame
+        Copy of the data with categorical encoded columns.
+    """
+    decoded = {}
+    dictionaries: Dict[str, pd.Series] = {}
+    for column, domain in encoded_columns(table, data).items():
+        if not pd.api.types.is_numeric_dtype(data[column]):
+            continue
+        if domain not in dictionaries:
+            dictionaries[domain] = read_dictionary(connection, domain)
+        dictionary = dictionaries[domain]
+        codes = pd.to_numeric(data[column]).astype("Int64").fillna(0)
+        decoded[column] = pd.Series(
+            pd.Categorical.from_codes(
+                dictionary.index.get_indexer(codes.to_numpy(dtype=np.int64)),
+                categories=dictionary.to_numpy(),
+            ),
+            index=data.index,
+        )
+    return data.assign(**decoded) if decoded else data
@@ -0,0 +1,309 @@
+"""
+features.py
+This file contains the player feature store, materializing player-week and
+player-season aggregates from the pbp tables built by script.py and
+refreshing them only for weeks whose pbp changed
+"""
+
+import logging
+
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from encoding import decode_columns
+from script import connect_db, create_key_indexes, write_table
+import constants as c
+import queries as q
+
+
+def build_week_features(plays: pd.DataFrame) -> pd.DataFrame:
+    """Helper function to aggregate feature inputs into player-week features.
+
+    Parameters
+    ----------
+    plays : pd.DataFrame
+        One row per (play, participant) as read by read_feature_plays.
+
+    Returns
+    -------
+    week_features : pd.DataFrame
+        One row per (player_id, season, week), with
+        c.PLAYER_WEEK_FEATURES_TBL_COLUMNS columns.
+    """
+    role = plays["role"].astype(object).to_numpy()
+    yardline = pd.to_numeric(plays["yardline_100"]).to_numpy(dtype=float)
+    epa = pd.to_numeric(plays["epa"]).fillna(0).to_numpy(dtype=float)
+    is_target = role == "receiver"
+    is_carry = role == "rusher"
+    in_red_zone = yardline <= c.RED_ZONE_YARDLINE
+    inputs = pd.DataFrame(
+        {
+            "player_id": plays["player_id"].to_numpy(dtype=object),
+            "season": plays["season"].to_numpy(),
+            "week": plays["week"].to_numpy(),
+            "season_type": plays["season_type"].to_numpy(dtype=object),
+            "team": plays["team"].to_numpy(dtype=object),
+            "targets": is_target,
+            "receptions": is_target
+            & (pd.to_numeric(plays["complete_pass"]).fillna(0).to_numpy() == 1),
+            "receiving_air_yards": np.where(
+                is_target, pd.to_numeric(plays["air_yards"]).fillna(0), 0
+            ),
+            "carries": is_carry,
+            "carries_inside_10": is_carry & (yardline <= c.INSIDE_10_YARDLINE),
+            "red_zone_targets": is_target & in_red_zone,
+            "red_zone_carries": is_carry & in_red_zone,
+            "red_zone_looks": (is_target | is_carry) & in_red_zone,
+            "passing_epa": np.where(role == "passer", epa, 0.0),
+            "rushing_epa": np.where(is_carry, epa, 0.0),
+            "receiving_epa": np.where(is_target, epa, 0.0),
+            "total_epa": epa,
+        }
+    )
+    sums = c.PLAYER_WEEK_FEATURES_TBL_COLUMNS[5:]
+    week_features = (
+        inputs.groupby(["player_id", "season", "week"], sort=True)
+        .agg(
+            season_type=("season_type", "first"),
+            team=("team", "first"),
+            **{column: (column, "sum") for column in sums},
+        )
+        .reset_index()
+    )
+    return week_features[c.PLAYER_WEEK_FEATURES_TBL_COLUMNS]
+
+
+def build_season_features(week_features: pd.DataFrame) -> pd.DataFrame:
+    """Helper function to roll player-week features up to player-seasons.
+
+    Only c.FEATURE_SEASON_TYPE weeks count towards the season.
+
+    Parameters
+    ----------
+    week_features : pd.DataFrame
+        Player-week features of one or more seasons.
+
+    Returns
+    -------
+    season_features : pd.DataFrame
+        One row per (player_id, season), with
+        c.PLAYER_SEASON_FEATURES_TBL_COLUMNS columns. The team is the one of
+        the player's last week.
+    """
+    regular_season = week_features[
+        week_features["season_type"].astype(object) == c.FEATURE_SEASON_TYPE
+    ].sort_values(["player_id", "season", "week"])
+    sums = c.PLAYER_SEASON_FEATURES_TBL_COLUMNS[4:]
+    season_features = (
+        regular_season.groupby(["player_id", "season"], sort=True)
+        .agg(
+            team=("team", "last"),
+            games=("week", "size"),
+            **{column: (column, "sum") for column in sums},
+        )
+        .reset_index()
+    )
+    return season_features[c.PLAYER_SEASON_FEATURES_TBL_COLUMNS]
+
+
+def read_feature_plays(
+    weeks: List[Tuple[int, int]], db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """Helper function to read the feature inputs of several weeks.
+
+    Each week is read through the game, pbp_player, pbp and
+    pbp_probabilities natural key indexes rather than a pass over pbp.
+
+    Parameters
+    ----------
+    weeks : List[Tuple[int, int]]
+        (season, week) pairs to read.
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    plays : pd.DataFrame
+        One row per (play, participant) in c.FEATURE_ROLES.
+    """
+    query = q.build_feature_plays_query(c.FEATURE_ROLES)
+    connection = connect_db(db_path)
+    try:
+        plays = pd.concat(
+            [
+                pd.read_sql_query(query, connection, params=(int(season), int(week)))
+                for season, week in weeks
+            ],
+            ignore_index=True,
+        )
+        return decode_columns(connection, "pbp_player", plays)
+    finally:
+        connection.close()
+
+
+def changed_weeks(
+    db_path: Optional[str] = None,
+) -> Tuple[pd.DataFrame, List[Tuple[int, int]]]:
+    """Helper function to compare pbp week checksums against the feature store.
+
+    Parameters
+    ----------
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    pbp_weeks : pd.DataFrame
+        Current (season, week, checksum) of every pbp week.
+    changed : List[Tuple[int, int]]
+        (season, week) pairs whose features are missing or out of date,
+        including weeks that no longer exist in pbp.
+    """
+    connection = connect_db(db_path)
+    try:
+        pbp_weeks = pd.read_sql_query(q.PBP_WEEKS_QUERY, connection)
+        try:
+            feature_weeks = pd.read_sql_query(q.FEATURE_WEEKS_QUERY, connection)
+        except pd.errors.DatabaseError:
+            feature_weeks = pd.DataFrame(columns=c.FEATURE_WEEKS_TBL_COLUMNS)
+    finally:
+        connection.close()
+    current = dict(
+        zip(zip(pbp_weeks["season"], pbp_weeks["week"]), pbp_weeks["checksum"])
+    )
+    stored = dict(
+        zip(
+            zip(feature_weeks["season"], feature_weeks["week"]),
+            feature_weeks["checksum"],
+        )
+    )
+    changed = sorted(
+        (int(season), int(week))
+        for season, week in current.keys() | stored.keys()
+        if current.get((season, week)) != stored.get((season, week))
+    )
+    return pbp_weeks, changed
+
+
+def refresh_features(db_path: Optional[str] = None) -> List[Tuple[int, int]]:
+    """Function to bring the feature tables up to date with pbp.
+
+    Player-week features are rebuilt only for weeks whose pbp_weeks checksum
+    differs from the one they were built from, and player-season features
+    only for the seasons of those weeks.
+
+    Parameters
+    ----------
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    refreshed : List[Tuple[int, int]]
+        (season, week) pairs that were rebuilt or dropped.
+    """
+    pbp_weeks, changed = changed_weeks(db_path=db_path)
+    if not changed:
+        return []
+    current = set(zip(pbp_weeks["season"], pbp_weeks["week"]))
+    rebuilt = [week for week in changed if week in current]
+    if rebuilt:
+        week_features = build_week_features(
+            read_feature_plays(rebuilt, db_path=db_path)
+        )
+    else:
+        week_features = pd.DataFrame(columns=c.PLAYER_WEEK_FEATURES_TBL_COLUMNS)
+
+    connection = connect_db(db_path)
+    try:
+        for table in ("player_week_features", "feature_weeks"):
+            connection.executescript(q.CREATE_TABLE_QUERY_DICT[table])
+        connection.execute("BEGIN")
+        for season, week in changed:
+            connection.execute(
+                q.DELETE_WEEK_QUERY_STRUCTURE.format(table="player_week_features"),
+                (season, week),
+            )
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+    for season in sorted({season for season, _ in changed}):
+        write_table(
+            "player_week_features",
+            season,
+            week_features[week_features["season"] == season],
+            append=True,
+            db_path=db_path,
+        )
+        write_table(
+            "player_season_features",
+            season,
+            build_season_features(load_week_features(season, db_path=db_path)),
+            db_path=db_path,
+        )
+        write_table(
+            "feature_weeks",
+            season,
+            pbp_weeks.loc[pbp_weeks["season"] == season, c.FEATURE_WEEKS_TBL_COLUMNS],
+            db_path=db_path,
+        )
+    create_key_indexes(db_path=db_path, tables=list(c.FEATURE_TABLE_DICT))
+    logging.info(c.FEATURE_REFRESH_MESSAGE, len(rebuilt), len(changed) - len(rebuilt))
+    return changed
+
+
+def load_week_features(
+    season: int, weeks: Optional[List[int]] = None, db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """Function to serve materialized player-week features of a season.
+
+    Parameters
+    ----------
+    season : int
+        Season to serve.
+    weeks : Optional[List[int]]
+        Weeks to keep (default: every week).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    week_features : pd.DataFrame
+        Player-week features ordered by week and player_id.
+    """
+    connection = connect_db(db_path)
+    try:
+        week_features = pd.read_sql_query(
+            q.WEEK_FEATURES_QUERY, connection, params=(season,)
+        )
+    finally:
+        connection.close()
+    if weeks is not None:
+        week_features = week_features[week_features["week"].isin(weeks)]
+    return week_features[c.PLAYER_WEEK_FEATURES_TBL_COLUMNS].reset_index(drop=True)
+
+
+def load_season_features(season: int, db_path: Optional[str] = None) -> pd.DataFrame:
+    """Function to serve materialized player-season features.
+
+    Parameters
+    ----------
+    season : int
+        Season to serve.
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    season_features : pd.DataFrame
+        Player-season features ordered by player_id.
+    """
+    connection = connect_db(db_path)
+    try:
+        season_features = pd.read_sql_query(
+            q.SEASON_FEATURES_QUERY, connection, params=(season,)
+        )
+    finally:
+        connection.close()
+    return season_features[c.PLAYER_SEASON_FEATURES_TBL_COLUMNS]
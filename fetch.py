@@ -0,0 +1,276 @@
+"""
+fetch.py
+This file contains an asyncio-based downloader for nflverse release files,
+sharing one pooled keep-alive session across downloads, retrying failures
+with exponential backoff and resuming partial files with HTTP Range requests
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+
+from typing import BinaryIO, Dict, List, Mapping, NamedTuple, Optional
+import aiohttp
+import constants as c
+
+
+class RetryableStatusError(Exception):
+    """Raised when the server answers with a status worth retrying."""
+
+
+RETRYABLE_ERRORS = (
+    aiohttp.ClientPayloadError,
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+    RetryableStatusError,
+)
+
+
+class Download(NamedTuple):
+    """A finished request and the validators the server sent with it.
+
+    ``file`` is None when a conditional request was answered 304 Not
+    Modified.
+    """
+
+    file: Optional[BinaryIO]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class AsyncFetcher:
+    """Download many urls concurrently over one pooled HTTP session.
+
+    An event loop runs on a background thread so the synchronous ingestion
+    workers can call ``fetch`` directly. Every request streams to its own
+    anonymous temporary file in the download directory, so concurrent
+    fetches of one url never share a part and nothing is left behind by a
+    crashed run. When the connection drops, the retry asks only for the
+    missing bytes with a Range header instead of starting over. The Range is
+    sent with an If-Range header holding the validator of the first
+    response, so a file replaced upstream in between is downloaded again
+    from the start rather than appended to older bytes. Retries wait
+    ``backoff * 2 ** attempt`` seconds. Completed downloads are handed back
+    as open files, so callers can stream them instead of holding the
+    contents in memory.
+
+    Parameters
+    ----------
+    download_dir : Optional[str]
+        Directory holding in-flight downloads (default: c.FETCH_DIR).
+    concurrency : int
+        Maximum concurrent downloads and pooled connections
+        (default: c.FETCH_CONCURRENCY).
+    retries : int
+        Retries per url before giving up (default: c.FETCH_RETRIES).
+    backoff : float
+        Seconds waited before the first retry (default: c.FETCH_BACKOFF_SECONDS).
+    timeout : float
+        Seconds allowed to connect or between two reads
+        (default: c.FETCH_TIMEOUT_SECONDS).
+    """
+
+    def __init__(
+        self,
+        download_dir: Optional[str] = None,
+        concurrency: int = c.FETCH_CONCURRENCY,
+        retries: int = c.FETCH_RETRIES,
+        backoff: float = c.FETCH_BACKOFF_SECONDS,
+        timeout: float = c.FETCH_TIMEOUT_SECONDS,
+    ) -> None:
+        self.download_dir = os.path.expanduser(download_dir or c.FETCH_DIR)
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        os.makedirs(self.download_dir, exist_ok=True)
+
+    def __enter__(self) -> "AsyncFetcher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """Start the event loop thread and open the pooled session."""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+
+    def close(self) -> None:
+        """Close the session and stop the event loop thread."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = self._session = self._semaphore = None
+
+    def fetch(self, url: str) -> BinaryIO:
+        """Download ``url``, blocking until the download completed.
+
+        Parameters
+        ----------
+        url : str
+            Url of the file to fetch.
+
+        Returns
+        -------
+        file : BinaryIO
+            Downloaded file, positioned at its start and removed when closed.
+        """
+        return self.request(url).file
+
+    def fetch_all(self, urls: List[str]) -> List[BinaryIO]:
+        """Download several urls concurrently, blocking until all completed.
+
+        Parameters
+        ----------
+        urls : List[str]
+            Urls of the files to fetch.
+
+        Returns
+        -------
+        files : List[BinaryIO]
+            Downloaded files, in url order, removed when closed.
+        """
+        self.start()
+
+        async def download_all() -> List[Download]:
+            return await asyncio.gather(*(self.download(url) for url in urls))
+
+        downloads = asyncio.run_coroutine_threadsafe(
+            download_all(), self._loop
+        ).result()
+        return [download.file for download in downloads]
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None) -> Download:
+        """Download ``url`` with extra request headers, e.g. conditional ones.
+
+        Parameters
+        ----------
+        url : str
+            Url of the file to fetch.
+        headers : Optional[Dict[str, str]]
+            Headers sent with the first request, such as If-None-Match. They
+            are not repeated on resumed requests (default: no headers).
+
+        Returns
+        -------
+        download : Download
+            Downloaded file and its validators.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self.download(url, headers), self._loop
+        ).result()
+
+    async def download(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> Download:
+        """Download ``url`` to a temporary file, retrying on failure.
+
+        Parameters
+        ----------
+        url : str
+            Url of the file to download.
+        headers : Optional[Dict[str, str]]
+            Headers sent with the first request (default: no headers).
+
+        Returns
+        -------
+        download : Download
+            Completed download, positioned at its start and removed when
+            closed, and its validators.
+        """
+        part_file = tempfile.TemporaryFile(
+            dir=self.download_dir, suffix=c.FETCH_PART_SUFFIX
+        )
+        validators: Dict[str, str] = {}
+        try:
+            async with self._semaphore:
+                for attempt in range(self.retries + 1):
+                    try:
+                        modified = await self._download_once(
+                            url, part_file, headers or {}, validators
+                        )
+                        break
+                    except RETRYABLE_ERRORS as error:
+                        if attempt == self.retries:
+                            raise
+                        delay = self.backoff * 2**attempt
+                        logging.warning(
+                            c.FETCH_RETRY_MESSAGE, url, attempt + 1, repr(error), delay
+                        )
+                        await asyncio.sleep(delay)
+        except BaseException:
+            part_file.close()
+            raise
+        if not modified:
+            part_file.close()
+            return Download(None)
+        part_file.seek(0)
+        return Download(
+            part_file, validators.get("ETag"), validators.get("Last-Modified")
+        )
+
+    async def _open(self) -> None:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=self.timeout, sock_read=self.timeout
+            ),
+            auto_decompress=False,
+        )
+
+    async def _download_once(
+        self,
+        url: str,
+        part_file: BinaryIO,
+        conditional: Dict[str, str],
+        validators: Dict[str, str],
+    ) -> bool:
+        offset = part_file.tell()
+        validator = self._validator(validators)
+        headers = {} if offset else dict(conditional)
+        if offset and validator is not None:
+            headers = {"Range": "bytes=%i-" % offset, "If-Range": validator}
+        async with self._session.get(url, headers=headers) as response:
+            if response.status == 304 and conditional and not offset:
+                return False
+            if response.status == 416 and "Range" in headers:
+                part_file.seek(0)
+                part_file.truncate()
+                raise RetryableStatusError(response.status)
+            if response.status in c.FETCH_RETRY_STATUSES:
+                raise RetryableStatusError(response.status)
+            response.raise_for_status()
+            if not (response.status == 206 and "Range" in headers):
+                part_file.seek(0)
+                part_file.truncate()
+                validators.clear()
+                for header in ("ETag", "Last-Modified"):
+                    if header in response.headers:
+                        validators[header] = response.headers[header]
+            async for chunk in response.content.iter_chunked(c.FETCH_CHUNK_BYTES):
+                part_file.write(chunk)
+        return True
+
+    @staticmethod
+    def _validator(headers: Mapping[str, str]) -> Optional[str]:
+        etag = headers.get("ETag")
+        if etag is not None and not etag.startswith("W/"):
+            return etag
+        return headers.get("Last-Modified")
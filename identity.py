@@ -0,0 +1,237 @@
+"""
+identity.py
+This file contains the player identity crosswalk, resolving the player ids
+used across nflverse tables (gsis, pfr, espn, sleeper, ...) to one integer
+player_key built from the players and weekly_rosters tables, so cross-table
+joins run on integer keys instead of merging on names
+"""
+
+import logging
+
+from typing import Dict, Iterable, Optional, Union
+import numpy as np
+import pandas as pd
+from script import connect_db, create_key_indexes, write_table
+import constants as c
+import queries as q
+
+
+def build_player_crosswalk(
+    sources: Dict[str, pd.DataFrame], previous: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """Helper function to combine the id columns of the sources into a crosswalk.
+
+    Every gsis_id becomes one player. Each other id takes the last non-null
+    value seen for the player, in c.PLAYER_IDENTITY_SOURCE_DICT order. Ids
+    shared by several players are dropped so that every id resolves to one
+    player. Players already in ``previous`` keep their player_key and new
+    players are numbered after the largest existing key.
+
+    Parameters
+    ----------
+    sources : Dict[str, pd.DataFrame]
+        Source data keyed by table name in c.PLAYER_IDENTITY_SOURCE_DICT.
+    previous : Optional[pd.DataFrame]
+        Crosswalk of the last build (default: number every player anew).
+
+    Returns
+    -------
+    crosswalk : pd.DataFrame
+        One row per player ordered by player_key, with
+        c.PLAYER_IDENTITY_TBL_COLUMNS columns.
+    """
+    renamed = [
+        sources[table][list(renames)].rename(columns=renames)
+        for table, renames in c.PLAYER_IDENTITY_SOURCE_DICT.items()
+        if table in sources
+    ]
+    ids = (
+        pd.concat(renamed, ignore_index=True)
+        .reindex(columns=c.PLAYER_IDENTITY_TBL_COLUMNS[1:])
+        .astype(c.STRING_DTYPE)
+    )
+    crosswalk = (
+        ids[ids["gsis_id"].notna()].groupby("gsis_id", sort=True).last().reset_index()
+    )
+
+    previous_keys = pd.Series(dtype="Int64")
+    if previous is not None and len(previous):
+        previous_keys = pd.Series(
+            previous["player_key"].to_numpy(dtype=np.int64),
+            index=previous["gsis_id"].astype(c.STRING_DTYPE),
+        )
+    player_keys = crosswalk["gsis_id"].map(previous_keys).astype("Int64")
+    new_players = player_keys.isna().to_numpy()
+    first_key = int(previous_keys.max()) + 1 if len(previous_keys) else 1
+    player_keys[new_players] = np.arange(first_key, first_key + new_players.sum())
+    crosswalk = crosswalk.assign(player_key=player_keys.astype(c.INT32_DTYPE))
+    crosswalk = crosswalk.sort_values("player_key", ignore_index=True)
+
+    for column in c.PLAYER_IDENTITY_ID_COLUMNS[1:]:
+        shared = crosswalk[column].notna() & crosswalk[column].duplicated(keep=False)
+        if shared.any():
+            logging.warning(
+                c.PLAYER_IDENTITY_CONFLICT_MESSAGE,
+                crosswalk.loc[shared, column].nunique(),
+                column,
+            )
+            crosswalk.loc[shared, column] = pd.NA
+    logging.info(c.PLAYER_IDENTITY_MESSAGE, len(crosswalk), int(new_players.sum()))
+    return crosswalk[c.PLAYER_IDENTITY_TBL_COLUMNS]
+
+
+class PlayerIdentity:
+    """In-memory lookup from any crosswalk id to the player_key.
+
+    Every id column is held as a hash index over its non-null values next to
+    an aligned player_key array, so resolving a column of ids is one
+    vectorized get_indexer call followed by an array take.
+
+    Parameters
+    ----------
+    crosswalk : pd.DataFrame
+        Crosswalk with c.PLAYER_IDENTITY_TBL_COLUMNS columns.
+    """
+
+    def __init__(self, crosswalk: pd.DataFrame) -> None:
+        self.crosswalk = crosswalk.sort_values("player_key", ignore_index=True)
+        self.player_key = self.crosswalk["player_key"].to_numpy(dtype=np.int32)
+        self._lookups: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self.crosswalk)
+
+    def _lookup(self, id_column: str) -> tuple:
+        if id_column not in self._lookups:
+            ids = self.crosswalk[id_column].astype(c.STRING_DTYPE)
+            present = ids.notna().to_numpy()
+            self._lookups[id_column] = (
+                pd.Index(ids[present].to_numpy(dtype=object)),
+                self.player_key[present],
+            )
+        return self._lookups[id_column]
+
+    def player_keys(
+        self, ids: Union[pd.Series, Iterable[str]], id_column: str = "gsis_id"
+    ) -> pd.Series:
+        """Resolve a column of player ids to player keys.
+
+        Parameters
+        ----------
+        ids : Union[pd.Series, Iterable[str]]
+            Player ids to resolve.
+        id_column : str
+            Crosswalk id the values are, one of c.PLAYER_IDENTITY_ID_COLUMNS
+            (default: 'gsis_id').
+
+        Returns
+        -------
+        player_keys : pd.Series
+            Int32 player keys aligned with ``ids``, NA for unknown ids.
+        """
+        ids = ids if isinstance(ids, pd.Series) else pd.Series(list(ids))
+        index, player_key = self._lookup(id_column)
+        positions = index.get_indexer(ids.astype(c.STRING_DTYPE).to_numpy(dtype=object))
+        found = positions >= 0
+        player_keys = pd.array(np.zeros(len(ids), dtype=np.int32), dtype=c.INT32_DTYPE)
+        player_keys[found] = player_key[positions[found]]
+        player_keys[~found] = pd.NA
+        return pd.Series(player_keys, index=ids.index, name="player_key")
+
+    def resolve(self, player_id: str, id_column: str = "gsis_id") -> Optional[int]:
+        """Return the player_key of one id, None when unknown."""
+        index, player_key = self._lookup(id_column)
+        position = index.get_indexer([player_id])[0]
+        return int(player_key[position]) if position >= 0 else None
+
+    def ids(self, player_key: int) -> Dict[str, Optional[str]]:
+        """Return every known id and the name of a player."""
+        position = np.searchsorted(self.player_key, player_key)
+        if position == len(self.player_key) or self.player_key[position] != player_key:
+            raise KeyError(player_key)
+        row = self.crosswalk.iloc[position]
+        return {
+            column: None if pd.isna(row[column]) else row[column]
+            for column in c.PLAYER_IDENTITY_TBL_COLUMNS[1:]
+        }
+
+    def attach_player_keys(self, data: pd.DataFrame, table: str) -> pd.DataFrame:
+        """Add a player_key column to a table's data.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Data of a table in c.PLAYER_IDENTITY_TABLE_DICT.
+        table : str
+            Name of the table.
+
+        Returns
+        -------
+        data : pd.DataFrame
+            Copy of the data with a player_key column.
+        """
+        if table not in c.PLAYER_IDENTITY_TABLE_DICT:
+            raise KeyError(c.UNKNOWN_PLAYER_ID_MESSAGE.format(table=table))
+        column, id_column = c.PLAYER_IDENTITY_TABLE_DICT[table]
+        return data.assign(player_key=self.player_keys(data[column], id_column))
+
+
+def read_player_crosswalk(db_path: Optional[str] = None) -> pd.DataFrame:
+    """Helper function to read the persisted crosswalk, empty when missing."""
+    connection = connect_db(db_path)
+    try:
+        return pd.read_sql_query(q.PLAYER_IDENTITY_QUERY, connection)[
+            c.PLAYER_IDENTITY_TBL_COLUMNS
+        ]
+    except pd.errors.DatabaseError:
+        return pd.DataFrame(columns=c.PLAYER_IDENTITY_TBL_COLUMNS)
+    finally:
+        connection.close()
+
+
+def refresh_player_identity(db_path: Optional[str] = None) -> PlayerIdentity:
+    """Function to rebuild the persisted crosswalk from the source tables.
+
+    Sources missing from the database are skipped with a warning, and a
+    ValueError is raised when none of them is loaded, rather than writing an
+    empty crosswalk. The crosswalk is written
+    to the player_identity table with indexes on player_key, gsis_id and
+    pfr_id, so SQL joins can resolve ids through the index as well.
+
+    Parameters
+    ----------
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    identity : PlayerIdentity
+        Lookup over the rebuilt crosswalk.
+    """
+    sources = {}
+    connection = connect_db(db_path)
+    try:
+        for table in c.PLAYER_IDENTITY_SOURCE_DICT:
+            try:
+                sources[table] = pd.read_sql_query(
+                    q.build_identity_source_query(table), connection
+                )
+            except pd.errors.DatabaseError:
+                logging.warning(c.MISSING_IDENTITY_SOURCE_MESSAGE, table)
+    finally:
+        connection.close()
+    if not sources:
+        raise ValueError(
+            c.NO_IDENTITY_SOURCES_MESSAGE.format(
+                tables=", ".join(c.PLAYER_IDENTITY_SOURCE_DICT)
+            )
+        )
+    crosswalk = build_player_crosswalk(sources, read_player_crosswalk(db_path))
+    write_table("player_identity", data=crosswalk, db_path=db_path)
+    create_key_indexes(db_path=db_path, tables=["player_identity"])
+    return PlayerIdentity(crosswalk)
+
+
+def load_player_identity(db_path: Optional[str] = None) -> PlayerIdentity:
+    """Function to load the persisted crosswalk into an in-memory lookup."""
+    return PlayerIdentity(read_player_crosswalk(db_path))
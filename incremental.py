@@ -0,0 +1,147 @@
+"""
+incremental.py
+This file contains the load manifest used by incremental builds to skip
+(table, season) pairs whose source file has not changed since the last load
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from typing import BinaryIO, Dict, List, Optional, Union
+from planner import IngestJob
+import constants as c
+
+
+def file_checksum(
+    raw: Union[bytes, BinaryIO], compression: Optional[str] = None
+) -> str:
+    """Helper function to checksum a downloaded source file.
+
+    Compressed files are checksummed on their decompressed contents, as the
+    gzip header stores the time the file was written and an upstream file
+    compressed again with the same data would otherwise look changed.
+    Streams are read in chunks and rewound afterwards.
+
+    Parameters
+    ----------
+    raw : Union[bytes, BinaryIO]
+        File contents, or a seekable stream of them.
+    compression : Optional[str]
+        Compression of the contents, decompressed first when 'gzip'
+        (default: None).
+
+    Returns
+    -------
+    checksum : str
+        Hex sha256 digest of the (decompressed) contents.
+    """
+    buffer = io.BytesIO(raw) if isinstance(raw, bytes) else raw
+    digest = hashlib.sha256()
+    stream = gzip.GzipFile(fileobj=buffer) if compression == "gzip" else buffer
+    for chunk in iter(lambda: stream.read(c.FETCH_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    if stream is not buffer:
+        stream.close()
+    buffer.seek(0)
+    return digest.hexdigest()
+
+
+class LoadManifest:
+    """Record of what has been loaded into the database.
+
+    Each (table, season) entry stores the checksum of the source file it was
+    loaded from, the number of rows written and when. The manifest is kept as
+    a JSON file next to the database and rewritten atomically on every record.
+
+    Parameters
+    ----------
+    path : Optional[str]
+        Location of the manifest file (default: c.MANIFEST_PATH).
+    refresh_completed_seasons : bool
+        Re-download seasons before c.CURRENT_YEAR that are already in the
+        manifest to check for upstream corrections (default: False).
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, refresh_completed_seasons: bool = False
+    ) -> None:
+        self.path = os.path.expanduser(path or c.MANIFEST_PATH)
+        self.refresh_completed_seasons = refresh_completed_seasons
+        self._lock = threading.Lock()
+        self._pending: Dict[str, str] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as manifest_file:
+                self._entries: Dict[str, Dict] = json.load(manifest_file)
+        except FileNotFoundError:
+            self._entries = {}
+
+    @staticmethod
+    def _key(table: str, season: Optional[int]) -> str:
+        return c.MANIFEST_KEY_STRUCTURE.format(table=table, season=season)
+
+    def get(self, table: str, season: Optional[int] = None) -> Optional[Dict]:
+        """Return the manifest entry for a (table, season) pair, if any."""
+        with self._lock:
+            return self._entries.get(self._key(table, season))
+
+    def entries(self) -> List[Dict]:
+        """Return every manifest entry, ordered by table and season."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        return sorted(entries, key=lambda entry: (entry["table"], entry["season"] or 0))
+
+    def needs_download(self, job: IngestJob) -> bool:
+        """Whether a job's source file has to be fetched at all.
+
+        Completed seasons that were already loaded are assumed final unless
+        ``refresh_completed_seasons`` is set; the in-progress season and
+        non-seasonal tables are always checked.
+        """
+        if self.refresh_completed_seasons or job.season is None:
+            return True
+        if job.season >= c.CURRENT_YEAR:
+            return True
+        return self.get(job.table, job.season) is None
+
+    def is_current(self, raw: Union[bytes, BinaryIO], job: IngestJob) -> bool:
+        """Whether ``raw`` matches the checksum loaded for ``job``.
+
+        The checksum is remembered so a following ``record`` call for the same
+        job can store it once the write succeeds.
+        """
+        checksum = file_checksum(raw, job.compression)
+        key = self._key(job.table, job.season)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["checksum"] == checksum:
+                return True
+            self._pending[key] = checksum
+        return False
+
+    def record(self, job: IngestJob, rows: int) -> None:
+        """Store the checksum and row count of a successful load."""
+        key = self._key(job.table, job.season)
+        with self._lock:
+            self._entries[key] = {
+                "table": job.table,
+                "season": job.season,
+                "checksum": self._pending.pop(key),
+                "rows": rows,
+                "loaded_at": time.time(),
+            }
+            self._save()
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, delete=False, encoding="utf-8"
+        ) as temp_file:
+            json.dump(self._entries, temp_file, indent=1, sort_keys=True)
+        os.replace(temp_file.name, self.path)
@@ -0,0 +1,300 @@
+"""
+instrument.py
+This file contains the build instrumentation, measuring wall time, CPU time,
+bytes, rows and peak memory of every (table, season) stage, emitting them as
+JSON events and exporting them as Prometheus text metrics
+"""
+
+import contextlib
+import gzip
+import io
+import json
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+
+from dataclasses import asdict, dataclass
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+import constants as c
+
+
+@dataclass
+class StageMetrics:
+    """Measurements of one stage of one (table, season)."""
+
+    table: str
+    season: Optional[int]
+    stage: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    bytes: int = 0
+    rows: int = 0
+    peak_rss_bytes: int = 0
+
+
+def current_rss() -> int:
+    """Helper function to read the resident set size of the process in bytes."""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class BuildMetrics:
+    """Collect stage measurements of a build and publish them.
+
+    Wall time is measured with a monotonic clock and CPU time with the CPU
+    clock of the calling thread, so concurrent jobs do not inflate each
+    other. Peak memory is the largest process RSS seen by a background
+    sampler while the stage ran. Every finished stage is logged as a JSON
+    event on the c.METRICS_LOGGER logger and, when ``events_path`` is given,
+    appended to that file as one JSON line.
+
+    Parameters
+    ----------
+    events_path : Optional[str]
+        JSON lines file events are appended to (default: log only).
+    prometheus_path : Optional[str]
+        File the Prometheus text metrics are written to on close
+        (default: no export).
+    interval : float
+        Seconds between RSS samples (default: c.METRICS_RSS_INTERVAL_SECONDS).
+    """
+
+    def __init__(
+        self,
+        events_path: Optional[str] = None,
+        prometheus_path: Optional[str] = None,
+        interval: float = c.METRICS_RSS_INTERVAL_SECONDS,
+    ) -> None:
+        self.events_path = events_path
+        self.prometheus_path = prometheus_path
+        self.interval = interval
+        self.records: List[StageMetrics] = []
+        self._active: Dict[int, StageMetrics] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "BuildMetrics":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @contextlib.contextmanager
+    def stage(
+        self, table: str, season: Optional[int], stage: str
+    ) -> Iterator[StageMetrics]:
+        """Measure the block as one stage of a (table, season).
+
+        The block sets ``rows`` and ``bytes`` on the yielded record. Wall and
+        CPU time are added to whatever the block already set, so a block can
+        deduct time it attributes to another stage.
+
+        Parameters
+        ----------
+        table : str
+            Table the stage works on.
+        season : Optional[int]
+            Season the stage works on, None for non-seasonal tables.
+        stage : str
+            Stage name, one of c.METRICS_STAGES.
+
+        Returns
+        -------
+        record : Iterator[StageMetrics]
+            Record of the stage, published when the block exits.
+        """
+        record = StageMetrics(table=table, season=season, stage=stage)
+        record.peak_rss_bytes = current_rss()
+        with self._lock:
+            self._active[id(record)] = record
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True)
+                self._sampler.start()
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds += time.perf_counter() - wall_start
+            record.cpu_seconds += time.thread_time() - cpu_start
+            with self._lock:
+                del self._active[id(record)]
+            record.peak_rss_bytes = max(record.peak_rss_bytes, current_rss())
+            self.add(record)
+
+    def add(self, record: StageMetrics) -> None:
+        """Store and publish a stage record measured elsewhere."""
+        event = json.dumps({"event": c.METRICS_EVENT, **asdict(record)})
+        with self._lock:
+            self.records.append(record)
+            if self.events_path is not None:
+                with open(self.events_path, "a", encoding="utf-8") as events_file:
+                    events_file.write(event + "\n")
+        logging.getLogger(c.METRICS_LOGGER).info(event)
+
+    def totals(self) -> Dict[Tuple[str, Optional[int], str], StageMetrics]:
+        """Return the records summed per (table, season, stage).
+
+        Times, bytes and rows add up; peak_rss_bytes is the largest seen.
+        """
+        totals: Dict[Tuple[str, Optional[int], str], StageMetrics] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            key = (record.table, record.season, record.stage)
+            total = totals.setdefault(
+                key, StageMetrics(table=key[0], season=key[1], stage=key[2])
+            )
+            total.wall_seconds += record.wall_seconds
+            total.cpu_seconds += record.cpu_seconds
+            total.bytes += record.bytes
+            total.rows += record.rows
+            total.peak_rss_bytes = max(total.peak_rss_bytes, record.peak_rss_bytes)
+        return totals
+
+    def prometheus_text(self) -> str:
+        """Return the totals in the Prometheus text exposition format."""
+        totals = sorted(
+            self.totals().values(),
+            key=lambda total: (total.table, total.season or 0, total.stage),
+        )
+        lines = []
+        for field, (name, kind, description) in c.METRICS_PROMETHEUS_DICT.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for total in totals:
+                labels = c.METRICS_LABEL_STRUCTURE.format(
+                    table=total.table,
+                    season="" if total.season is None else total.season,
+                    stage=total.stage,
+                )
+                lines.append(f"{name}{{{labels}}} {getattr(total, field):.6g}")
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path: Optional[str] = None) -> None:
+        """Write the Prometheus text metrics atomically.
+
+        Parameters
+        ----------
+        path : Optional[str]
+            Destination file (default: ``prometheus_path``).
+
+        Returns
+        -------
+        None.
+        """
+        path = path or self.prometheus_path
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, delete=False, encoding="utf-8"
+        ) as temp_file:
+            temp_file.write(self.prometheus_text())
+        os.replace(temp_file.name, path)
+
+    def close(self) -> None:
+        """Stop the RSS sampler and write the Prometheus export, if any."""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        self._stop.clear()
+        if self.prometheus_path is not None:
+            self.export_prometheus()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            with self._lock:
+                for record in self._active.values():
+                    record.peak_rss_bytes = max(record.peak_rss_bytes, rss)
+
+
+@contextlib.contextmanager
+def measure(
+    metrics: Optional[BuildMetrics], table: str, season: Optional[int], stage: str
+) -> Iterator[StageMetrics]:
+    """Helper function to measure a stage when instrumentation is enabled.
+
+    Without ``metrics`` the block runs unmeasured and the yielded record is
+    discarded, so callers can fill it in unconditionally.
+    """
+    if metrics is None:
+        yield StageMetrics(table=table, season=season, stage=stage)
+    else:
+        with metrics.stage(table, season, stage) as record:
+            yield record
+
+
+class MeteredReader(io.RawIOBase):
+    """Readable stream recording the time, bytes and RSS spent reading.
+
+    Wrapping the gzip stream of a download lets parsing read decompressed
+    bytes as it goes, while decompression is still measured on its own.
+    Reading RSS costs a system call, so it is sampled on the first read and
+    then once every c.METRICS_RSS_SAMPLE_BYTES decompressed bytes rather
+    than on every read.
+
+    Parameters
+    ----------
+    raw : Union[bytes, BinaryIO]
+        Downloaded file contents, or a seekable stream of them.
+    compression : Optional[str]
+        Compression of the contents, decompressed while reading when 'gzip'.
+    """
+
+    def __init__(
+        self, raw: Union[bytes, BinaryIO], compression: Optional[str] = None
+    ) -> None:
+        super().__init__()
+        buffer: BinaryIO = io.BytesIO(raw) if isinstance(raw, bytes) else raw
+        self.compressed_bytes = buffer.seek(0, io.SEEK_END)
+        buffer.seek(0)
+        if compression == "gzip":
+            buffer = gzip.GzipFile(fileobj=buffer)
+        self._stream = buffer
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.bytes = 0
+        self.peak_rss_bytes = 0
+        self._next_sample = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._stream.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._stream.tell()
+
+    def readinto(self, buffer) -> int:
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        size = self._stream.readinto(buffer)
+        self.wall_seconds += time.perf_counter() - wall_start
+        self.cpu_seconds += time.thread_time() - cpu_start
+        self.bytes += size
+        if self.bytes >= self._next_sample:
+            self.peak_rss_bytes = max(self.peak_rss_bytes, current_rss())
+            self._next_sample = self.bytes + c.METRICS_RSS_SAMPLE_BYTES
+        return size
+
+    def record(self, table: str, season: Optional[int]) -> StageMetrics:
+        """Return what has been read so far as a decompress stage record."""
+        return StageMetrics(
+            table=table,
+            season=season,
+            stage="decompress",
+            wall_seconds=self.wall_seconds,
+            cpu_seconds=self.cpu_seconds,
+            bytes=self.bytes,
+            peak_rss_bytes=self.peak_rss_bytes,
+        )
@@ -0,0 +1,350 @@
+"""
+pipeline.py
+This file contains the table-level build DAG, declaring every source
+download, derived table and feature/serving step by the tables it reads and
+writes, and running each node as soon as its inputs have landed while
+skipping nodes whose inputs did not change since their last run
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from cache import DownloadCache
+from incremental import LoadManifest
+from script import build_db, derived_table_names
+import constants as c
+import features
+import identity
+import serving
+
+
+class PipelineNode(NamedTuple):
+    """A node of the build DAG and the tables it reads and writes.
+
+    Source nodes download a release directory and load every table derived
+    from it in one pass, e.g. 'pbp' writes game, drive, pbp_player, ...
+    """
+
+    name: str
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    source: bool = False
+
+
+@dataclass
+class NodeResult:
+    """Per-node report returned by run_pipeline."""
+
+    node: str
+    seconds: float = 0.0
+    skipped: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@functools.lru_cache(maxsize=None)
+def build_pipeline() -> Dict[str, PipelineNode]:
+    """Function to declare the build DAG, once.
+
+    Every release directory in c.ALL_TABLE_NAMES becomes a source node
+    writing the tables loaded from it, and every step in
+    c.PIPELINE_STEP_DICT a node reading and writing the tables listed there.
+
+    Returns
+    -------
+    pipeline : Dict[str, PipelineNode]
+        Nodes keyed by name.
+    """
+    pipeline = {}
+    for source in c.ALL_TABLE_NAMES:
+        load_tables = c.NFLV_STAT_TYPE_DICT.get(source, {None: source}).values()
+        pipeline[source] = PipelineNode(
+            name=source,
+            inputs=(),
+            outputs=tuple(
+                table_name
+                for load_table in load_tables
+                for table_name in derived_table_names(load_table) or [load_table]
+            ),
+            source=True,
+        )
+    for step, tables in c.PIPELINE_STEP_DICT.items():
+        pipeline[step] = PipelineNode(
+            name=step,
+            inputs=tuple(tables["inputs"]),
+            outputs=tuple(tables["outputs"]),
+        )
+    return pipeline
+
+
+def pipeline_dependencies(
+    targets: Optional[List[str]] = None,
+) -> Dict[str, List[str]]:
+    """Helper function to select the subgraph needed to build some targets.
+
+    Parameters
+    ----------
+    targets : Optional[List[str]]
+        Node names or tables to build (default: every node).
+
+    Returns
+    -------
+    dependencies : Dict[str, List[str]]
+        Upstream nodes of every selected node, the targets and everything
+        they need.
+    """
+    pipeline = build_pipeline()
+    producers = {
+        table: node.name for node in pipeline.values() for table in node.outputs
+    }
+    dependencies = {
+        node.name: sorted(
+            {producers[table] for table in node.inputs if table in producers}
+        )
+        for node in pipeline.values()
+    }
+    if targets is None:
+        return dependencies
+    pending = []
+    for target in targets:
+        if target not in pipeline and target not in producers:
+            raise ValueError(c.UNKNOWN_TARGET_MESSAGE.format(target=target))
+        pending.append(target if target in pipeline else producers[target])
+    selected = {}
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected[name] = dependencies[name]
+            pending.extend(dependencies[name])
+    return selected
+
+
+def pipeline_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    """Helper function to order nodes so each follows its upstream nodes.
+
+    Parameters
+    ----------
+    dependencies : Dict[str, List[str]]
+        Upstream nodes of every node, e.g. from pipeline_dependencies.
+
+    Returns
+    -------
+    order : List[str]
+        Node names, every node after the nodes it depends on.
+    """
+    order: List[str] = []
+    done = set()
+    while len(order) < len(dependencies):
+        ready = [
+            name
+            for name, upstream in dependencies.items()
+            if name not in done and done.issuperset(upstream)
+        ]
+        if not ready:
+            raise ValueError(
+                c.PIPELINE_CYCLE_MESSAGE.format(nodes=sorted(set(dependencies) - done))
+            )
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+
+def fingerprint(values: object) -> str:
+    """Helper function to hash JSON-serializable values into a fingerprint."""
+    return hashlib.sha256(
+        json.dumps(values, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def read_pipeline_state(path: Optional[str] = None) -> Dict[str, str]:
+    """Helper function to read the input fingerprint of every node's last run."""
+    try:
+        with open(
+            os.path.expanduser(path or c.PIPELINE_STATE_PATH), "r", encoding="utf-8"
+        ) as state_file:
+            return json.load(state_file)
+    except FileNotFoundError:
+        return {}
+
+
+def write_pipeline_state(state: Dict[str, str], path: Optional[str] = None) -> None:
+    """Helper function to store the node fingerprints atomically."""
+    path = os.path.expanduser(path or c.PIPELINE_STATE_PATH)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=directory, delete=False, encoding="utf-8"
+    ) as temp_file:
+        json.dump(state, temp_file, indent=1, sort_keys=True)
+    os.replace(temp_file.name, path)
+
+
+def run_pipeline(
+    targets: Optional[List[str]] = None,
+    base_url: Optional[str] = None,
+    cache: Optional[DownloadCache] = None,
+    manifest: Optional[LoadManifest] = None,
+    state_path: Optional[str] = None,
+    serve_dir: Optional[str] = None,
+    max_workers: int = c.PIPELINE_MAX_WORKERS,
+    force: bool = False,
+    db_path: Optional[str] = None,
+) -> List[NodeResult]:
+    """Function to build the targets, running each node once its inputs landed.
+
+    The selected source nodes are loaded first, together in one build_db
+    call, so their files download concurrently through the ingestion
+    scheduler while a single writer loads the database and the key indexes
+    are rebuilt once. Steps whose upstream nodes have finished are then
+    submitted right away, so a step starts as soon as the last table it
+    reads is written. Source nodes always run, and with a load manifest only
+    re-load files that changed; their fingerprint is the checksums the
+    manifest recorded of the decompressed files, so a source compressed
+    again with the same data does not trigger a rebuild. Every step is
+    skipped when the fingerprints of its upstream nodes match those of its
+    last successful run. Without a manifest, source fingerprints are unknown
+    and every step runs.
+
+    Parameters
+    ----------
+    targets : Optional[List[str]]
+        Node names or tables to build, e.g. 'player_week_features', together
+        with everything upstream of them (default: every node).
+    base_url : Optional[str]
+        Root of the nflverse release server (default: c.NFLV_BASE_URL).
+    cache : Optional[DownloadCache]
+        Download cache to read release files through (default: no cache).
+    manifest : Optional[LoadManifest]
+        Load manifest making source loads incremental (default: full rebuild).
+    state_path : Optional[str]
+        File holding the fingerprints of the last runs
+        (default: c.PIPELINE_STATE_PATH).
+    serve_dir : Optional[str]
+        Directory of the serving files (default: c.SERVING_DIR).
+    max_workers : int
+        Nodes running at the same time (default: c.PIPELINE_MAX_WORKERS).
+    force : bool
+        Run every selected node even when its inputs are unchanged
+        (default: False).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    results : List[NodeResult]
+        One report per selected node, in completion order.
+    """
+    pipeline = build_pipeline()
+    dependencies = pipeline_dependencies(targets)
+    pipeline_order(dependencies)
+    state = read_pipeline_state(state_path)
+    state_lock = threading.Lock()
+    fingerprints: Dict[str, Optional[str]] = {}
+    results: Dict[str, NodeResult] = {}
+
+    def source_fingerprint(name: str) -> Optional[str]:
+        if manifest is None:
+            return None
+        load_tables = set(c.NFLV_STAT_TYPE_DICT.get(name, {None: name}).values())
+        return fingerprint(
+            [
+                (entry["table"], entry["season"], entry["checksum"])
+                for entry in manifest.entries()
+                if entry["table"] in load_tables
+            ]
+        )
+
+    def run_sources(names: List[str]) -> None:
+        start = time.perf_counter()
+        error = None
+        try:
+            build_db(
+                base_url=base_url,
+                tables=names,
+                cache=cache,
+                manifest=manifest,
+                db_path=db_path,
+            )
+        except Exception as exception:  # pylint: disable=broad-except
+            error = f"{type(exception).__name__}: {exception}"
+            logging.warning(c.PIPELINE_FAILED_MESSAGE, ", ".join(names), error)
+        seconds = time.perf_counter() - start
+        for name in names:
+            results[name] = NodeResult(node=name, seconds=seconds, error=error)
+            if error is not None:
+                continue
+            fingerprints[name] = source_fingerprint(name)
+            if fingerprints[name] is not None:
+                state[name] = fingerprints[name]
+            logging.info(c.PIPELINE_NODE_MESSAGE, name, seconds)
+        if error is None and manifest is not None:
+            write_pipeline_state(state, state_path)
+
+    steps: Dict[str, Callable[[], object]] = {
+        "features": lambda: features.refresh_features(db_path=db_path),
+        "player_identity": lambda: identity.refresh_player_identity(db_path=db_path),
+        "serving": lambda: serving.export_serving_tables(
+            serve_dir=serve_dir, db_path=db_path
+        ),
+    }
+
+    def run_node(name: str) -> NodeResult:
+        result = NodeResult(node=name)
+        start = time.perf_counter()
+        failed = [
+            upstream for upstream in dependencies[name] if not results[upstream].ok
+        ]
+        if failed:
+            result.error = c.PIPELINE_UPSTREAM_MESSAGE.format(node=failed[0])
+            return result
+        upstream = [fingerprints[upstream] for upstream in dependencies[name]]
+        inputs = None if None in upstream else fingerprint([name, *upstream])
+        try:
+            if not force and inputs is not None and state.get(name) == inputs:
+                result.skipped = True
+                fingerprints[name] = inputs
+                logging.info(c.PIPELINE_SKIPPED_MESSAGE, name)
+            else:
+                steps[name]()
+                fingerprints[name] = inputs
+        except Exception as error:  # pylint: disable=broad-except
+            result.error = f"{type(error).__name__}: {error}"
+            logging.warning(c.PIPELINE_FAILED_MESSAGE, name, result.error)
+        result.seconds = time.perf_counter() - start
+        if result.ok and not result.skipped:
+            if fingerprints[name] is not None:
+                with state_lock:
+                    state[name] = fingerprints[name]
+                    write_pipeline_state(state, state_path)
+            logging.info(c.PIPELINE_NODE_MESSAGE, name, result.seconds)
+        return result
+
+    sources = sorted(name for name in dependencies if pipeline[name].source)
+    if sources:
+        run_sources(sources)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running: Dict[Future, str] = {}
+        while len(results) < len(dependencies):
+            for name, upstream in dependencies.items():
+                if (
+                    name not in results
+                    and name not in running.values()
+                    and all(node in results for node in upstream)
+                ):
+                    running[executor.submit(run_node, name)] = name
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[running.pop(future)] = future.result()
+    return list(results.values())
@@ -0,0 +1,165 @@
+"""
+planner.py
+This file contains the ingestion planner, expanding the nflverse metadata
+into fetch jobs. It only depends on the standard library so planning stays
+cheap for callers that never download or parse anything
+"""
+
+import functools
+
+from typing import List, NamedTuple, Optional, Tuple
+import constants as c
+
+
+class IngestJob(NamedTuple):
+    """A single (table, season) unit of work for the ingestion scheduler.
+
+    ``table`` is the table the file loads into. For release directories with
+    one file per stat type (c.NFLV_STAT_TYPE_DICT) it differs from the
+    ``source`` directory, e.g. 'pfr_passing' from 'pfr_advstats'.
+    """
+
+    table: str
+    season: Optional[int]
+    url: str
+    compression: Optional[str]
+    source: Optional[str] = None
+    stat_type: Optional[str] = None
+
+
+@functools.lru_cache(maxsize=None)
+def build_job_manifest(base_url: Optional[str] = None) -> Tuple[IngestJob, ...]:
+    """Function to expand the nflverse metadata into every fetch job, once.
+
+    c.NFLV_DIR_DICT and c.NFLV_STAT_TYPE_DICT are expanded into one job per
+    (table, season, stat type) with its url already built. The result is
+    cached per base_url, so planners, schedulers and dry runs share one plan.
+
+    Parameters
+    ----------
+    base_url : Optional[str]
+        Root of the nflverse release server (default: c.NFLV_BASE_URL).
+
+    Returns
+    -------
+    jobs : Tuple[IngestJob, ...]
+        Every job with data available, grouped by table in c.ALL_TABLE_NAMES
+        order and then by season.
+    """
+    jobs = []
+    start_season = c.NFLV_DIR_DICT[c.NFLV_BASE_KEY][c.NLFV_START_SEASON_KEY]
+    for table in c.ALL_TABLE_NAMES:
+        if table in c.SEASONAL_TABLES:
+            seasons = [
+                season
+                for season in c.NFLV_DIR_DICT[table][c.NFLV_SEASON_RANGE_KEY]
+                if season >= start_season
+            ]
+        else:
+            seasons = [None]
+        stat_types = c.NFLV_STAT_TYPE_DICT.get(table, {None: table})
+        for stat_type, load_table in stat_types.items():
+            for season in seasons:
+                table_url, compression = construct_table_url(
+                    table=table, year=season, stat_type=stat_type, base_url=base_url
+                )
+                jobs.append(
+                    IngestJob(
+                        table=load_table,
+                        season=season,
+                        url=table_url,
+                        compression=compression,
+                        source=table,
+                        stat_type=stat_type,
+                    )
+                )
+    return tuple(jobs)
+
+
+def plan_ingest_jobs(
+    base_url: Optional[str] = None,
+    tables: Optional[List[str]] = None,
+    seasons: Optional[List[int]] = None,
+) -> List[IngestJob]:
+    """Helper function to select the ingestion jobs of some tables.
+
+    Parameters
+    ----------
+    base_url : Optional[str]
+        Root of the nflverse release server (default: c.NFLV_BASE_URL).
+    tables : Optional[List[str]]
+        Subset of tables to plan, either release directories (e.g.
+        'pfr_advstats', every stat type) or the tables they load into (e.g.
+        'pfr_passing') (default: c.ALL_TABLE_NAMES).
+    seasons : Optional[List[int]]
+        Seasons to plan; non-seasonal files are always planned
+        (default: every season).
+
+    Returns
+    -------
+    jobs : List[IngestJob]
+        One job per (table, season, stat type) with data available.
+    """
+    jobs = list(build_job_manifest(base_url))
+    if seasons is not None:
+        jobs = [job for job in jobs if job.season is None or job.season in seasons]
+    if tables is None:
+        return jobs
+    selected = set(tables)
+    return [job for job in jobs if job.source in selected or job.table in selected]
+
+
+def construct_table_url(
+    table: str = c.NFLV_TABLE_DEFAULT,
+    year: int = c.CURRENT_YEAR,
+    stat_type: Optional[str] = None,
+    base_url: Optional[str] = None,
+) -> Tuple[str, str]:
+    """Helper function to build nflverse url from table information.
+
+    Parameters
+    ----------
+    table : str
+        Name of repo subdirectory containing relevant data (default: 'pbp').
+    year : int
+        Year to read data (default: current year).
+    stat_type : Optional[str]
+        Stat type of the file, required for the tables in
+        c.NFLV_STAT_TYPE_DICT (e.g. 'passing' for nextgen_stats, 'pass' for
+        pfr_advstats).
+    base_url : Optional[str]
+        Root of the nflverse release server (default: c.NFLV_BASE_URL).
+
+    Returns
+    -------
+    table_url, compression : Tuple[str, str]
+        Tuple of the url to read NFLV data from and the compression used to store it.
+    """
+    base_url = base_url or c.NFLV_DIR_DICT[c.NFLV_BASE_KEY][c.NFLV_URL_KEY]
+    url_addendum = c.NFLV_DIR_DICT[table][c.NFLV_URL_KEY]
+    compression = (
+        c.NFLV_DIR_DICT[table][c.NFLV_COMPRESSION_KEY]
+        if c.NFLV_COMPRESSION_KEY in c.NFLV_DIR_DICT[table].keys()
+        else None
+    )
+    extension = c.GZIP_EXTENSION if compression else c.CSV_EXTENSION
+    url_year = str(year) if table not in c.NON_SEASONAL_TABLES else ""
+    if table in c.NFLV_STAT_TYPE_DICT:
+        if stat_type not in c.NFLV_STAT_TYPE_DICT[table]:
+            raise ValueError(
+                c.MISSING_STAT_TYPE_MESSAGE.format(
+                    table=table, stat_types=list(c.NFLV_STAT_TYPE_DICT[table])
+                )
+            )
+        url_file = c.NFLV_STAT_TYPE_URL_DICT[table].format(
+            year=url_year, stat_type=stat_type
+        )
+    else:
+        url_file = url_year
+    table_url = c.URL_STRUCTURE.format(
+        base_url=base_url,
+        url_addendum=url_addendum,
+        url_file=url_file,
+        extension=extension,
+    )
+    return table_url, compression
@@ -0,0 +1,239 @@
+"""
+projections.py
+This file contains the season-long projection engine, a rate x opportunity
+model evaluated for every player at once with NumPy array operations
+"""
+
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from encoding import decode_columns
+from script import connect_db
+import constants as c
+import queries as q
+
+
+def load_projection_history(
+    season: int,
+    history_seasons: int = c.PROJECTION_HISTORY_SEASONS,
+    db_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """Function to read the player_stats weeks a season is projected from.
+
+    Parameters
+    ----------
+    season : int
+        Season to project.
+    history_seasons : int
+        Number of seasons before ``season`` to read
+        (default: c.PROJECTION_HISTORY_SEASONS).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    player_stats : pd.DataFrame
+        Regular season player-weeks of the history seasons.
+    """
+    connection = connect_db(db_path)
+    try:
+        player_stats = pd.read_sql_query(
+            q.build_projection_stats_query(c.PLAYER_STATS_TBL_COLUMNS),
+            connection,
+            params=(season - history_seasons, season - 1, c.FEATURE_SEASON_TYPE),
+        )
+        return decode_columns(connection, "player_stats", player_stats)
+    finally:
+        connection.close()
+
+
+def season_weights(
+    seasons: np.ndarray, season: int, decay: float = c.PROJECTION_SEASON_DECAY
+) -> np.ndarray:
+    """Helper function to weight history rows by how recent their season is.
+
+    Parameters
+    ----------
+    seasons : np.ndarray
+        Season of every history row.
+    season : int
+        Season being projected; the season before it gets weight 1.
+    decay : float
+        Weight of a season relative to the one after it
+        (default: c.PROJECTION_SEASON_DECAY).
+
+    Returns
+    -------
+    weights : np.ndarray
+        Weight of every history row.
+    """
+    return decay ** (season - 1 - seasons.astype(float))
+
+
+def grouped_sums(codes: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    """Helper function to sum the columns of a matrix by group.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Group of every row, in [0, groups).
+    values : np.ndarray
+        (rows, columns) matrix to sum.
+    groups : int
+        Number of groups.
+
+    Returns
+    -------
+    sums : np.ndarray
+        (groups, columns) matrix of sums.
+    """
+    return np.column_stack(
+        [
+            np.bincount(codes, weights=values[:, column], minlength=groups)
+            for column in range(values.shape[1])
+        ]
+    )
+
+
+def project_arrays(
+    codes: np.ndarray,
+    weights: np.ndarray,
+    opportunities: np.ndarray,
+    stats: np.ndarray,
+    rate_opportunities: np.ndarray,
+    prior_opportunities: np.ndarray,
+    players: int,
+    games: float = c.PROJECTION_GAMES,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Rate x opportunity model evaluated for every player at once.
+
+    Every history row is one player-game. Per-game opportunities are the
+    weighted mean over a player's games. Per-opportunity rates are shrunk
+    towards the league rate as if the player also had ``prior_opportunities``
+    league-average opportunities.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Player of every history row, in [0, players).
+    weights : np.ndarray
+        Weight of every history row, e.g. from season_weights.
+    opportunities : np.ndarray
+        (rows, opportunity types) matrix of opportunities.
+    stats : np.ndarray
+        (rows, stats) matrix of the projected stats.
+    rate_opportunities : np.ndarray
+        Column of ``opportunities`` every stat is a rate of.
+    prior_opportunities : np.ndarray
+        Shrinkage strength of every opportunity type.
+    players : int
+        Number of players.
+    games : float
+        Games to project (default: c.PROJECTION_GAMES).
+
+    Returns
+    -------
+    projected_opportunities : np.ndarray
+        (players, opportunity types) matrix of season opportunities.
+    projected_stats : np.ndarray
+        (players, stats) matrix of season stats.
+    """
+    weighted_games = np.bincount(codes, weights=weights, minlength=players)
+    weighted_opportunities = grouped_sums(
+        codes, opportunities * weights[:, None], players
+    )
+    weighted_stats = grouped_sums(codes, stats * weights[:, None], players)
+
+    league_rates = weighted_stats.sum(axis=0) / np.maximum(
+        weighted_opportunities.sum(axis=0)[rate_opportunities], 1e-9
+    )
+    prior = prior_opportunities[rate_opportunities]
+    rates = (weighted_stats + league_rates * prior) / (
+        weighted_opportunities[:, rate_opportunities] + prior
+    )
+    projected_opportunities = (
+        weighted_opportunities / np.maximum(weighted_games, 1e-9)[:, None] * games
+    )
+    projected_stats = projected_opportunities[:, rate_opportunities] * rates
+    return projected_opportunities, projected_stats
+
+
+def project_players(
+    player_stats: pd.DataFrame,
+    season: Optional[int] = None,
+    games: float = c.PROJECTION_GAMES,
+    points: Optional[Dict[str, float]] = None,
+) -> pd.DataFrame:
+    """Function to project the season of every player in the history.
+
+    Parameters
+    ----------
+    player_stats : pd.DataFrame
+        Player-weeks with c.PLAYER_STATS_TBL_COLUMNS columns, e.g. from
+        load_projection_history.
+    season : Optional[int]
+        Season to project (default: the season after the latest in the data).
+    games : float
+        Games to project (default: c.PROJECTION_GAMES).
+    points : Optional[Dict[str, float]]
+        Fantasy points per unit of each projected stat
+        (default: c.PROJECTION_POINTS_DICT).
+
+    Returns
+    -------
+    projections : pd.DataFrame
+        One row per player with c.PROJECTION_TBL_COLUMNS columns, ordered by
+        projected fantasy points.
+    """
+    if player_stats.empty:
+        return pd.DataFrame(columns=c.PROJECTION_TBL_COLUMNS)
+    seasons = player_stats["season"].to_numpy(dtype=int)
+    season = int(seasons.max()) + 1 if season is None else season
+    codes, player_ids = pd.factorize(player_stats["player_id"], sort=True)
+    stat_columns = list(c.PROJECTION_RATE_DICT)
+    rate_opportunities = np.array(
+        [
+            c.PROJECTION_OPPORTUNITY_COLUMNS.index(c.PROJECTION_RATE_DICT[stat])
+            for stat in stat_columns
+        ]
+    )
+    prior_opportunities = np.array(
+        [
+            c.PROJECTION_PRIOR_OPPORTUNITY_DICT[opportunity]
+            for opportunity in c.PROJECTION_OPPORTUNITY_COLUMNS
+        ],
+        dtype=float,
+    )
+    numeric = player_stats[c.PROJECTION_OPPORTUNITY_COLUMNS + stat_columns]
+    values = numeric.apply(pd.to_numeric).fillna(0).to_numpy(dtype=float)
+    projected_opportunities, projected_stats = project_arrays(
+        codes=codes,
+        weights=season_weights(seasons, season),
+        opportunities=values[:, : len(c.PROJECTION_OPPORTUNITY_COLUMNS)],
+        stats=values[:, len(c.PROJECTION_OPPORTUNITY_COLUMNS) :],
+        rate_opportunities=rate_opportunities,
+        prior_opportunities=prior_opportunities,
+        players=len(player_ids),
+        games=games,
+    )
+    points = c.PROJECTION_POINTS_DICT if points is None else points
+    point_weights = np.array([points.get(stat, 0.0) for stat in stat_columns])
+
+    latest = np.lexsort((-player_stats["week"].to_numpy(dtype=int), -seasons, codes))
+    _, first = np.unique(codes[latest], return_index=True)
+    latest_rows = player_stats.iloc[latest[first]]
+    projections = pd.DataFrame(
+        {
+            "player_id": np.asarray(player_ids, dtype=object),
+            "player_name": latest_rows["player_name"].to_numpy(dtype=object),
+            "recent_team": latest_rows["recent_team"].to_numpy(dtype=object),
+            "season": season,
+            "games": float(games),
+            **dict(zip(c.PROJECTION_OPPORTUNITY_COLUMNS, projected_opportunities.T)),
+            **dict(zip(stat_columns, projected_stats.T)),
+            "fantasy_points_ppr": projected_stats @ point_weights,
+        }
+    )
+    return projections.sort_values(
+        "fantasy_points_ppr", ascending=False, ignore_index=True
+    )
@@ -0,0 +1,162 @@
+"""
+scheduler.py
+This file contains a bounded worker pool for running nflverse ingestion
+jobs (one per table/season) with separate download, parse and write limits
+"""
+
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+from planner import IngestJob
+import constants as c
+
+
+@dataclass
+class JobTiming:
+    """Per-job timing report returned by IngestScheduler.run."""
+
+    table: str
+    season: Optional[int]
+    download_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    write_seconds: float = 0.0
+    total_seconds: float = 0.0
+    rows: int = 0
+    skipped: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class IngestScheduler:
+    """Run ingestion jobs on a bounded thread pool.
+
+    Each job passes through three stages: ``download`` (fetch raw bytes),
+    ``parse`` (bytes to DataFrame) and ``write`` (DataFrame to the database).
+    Every stage is guarded by its own semaphore, so e.g. many downloads can be
+    in flight while only a single writer touches the database at a time.
+
+    Parameters
+    ----------
+    download : Callable[[IngestJob], Any]
+        Function returning the raw payload for a job.
+    parse : Callable[[Any, IngestJob], Any]
+        Function converting the raw payload into a DataFrame.
+    write : Callable[[Any, IngestJob], Any]
+        Function persisting the parsed DataFrame. When it returns an int, that
+        is reported as the job's row count instead of ``len`` of the parsed
+        data, which lets streaming writers count rows as they go.
+    max_workers : int
+        Number of worker threads (default: c.SCHEDULER_MAX_WORKERS).
+    download_limit : int
+        Maximum concurrent downloads (default: c.SCHEDULER_DOWNLOAD_LIMIT).
+    parse_limit : int
+        Maximum concurrent parses (default: c.SCHEDULER_PARSE_LIMIT).
+    write_limit : int
+        Maximum concurrent writes (default: c.SCHEDULER_WRITE_LIMIT).
+    skip : Optional[Callable[[Any, IngestJob], bool]]
+        Optional check run on the downloaded payload; when it returns True the
+        job stops before parsing and is reported as skipped.
+    """
+
+    def __init__(
+        self,
+        download: Callable[[IngestJob], Any],
+        parse: Callable[[Any, IngestJob], Any],
+        write: Callable[[Any, IngestJob], Any],
+        max_workers: int = c.SCHEDULER_MAX_WORKERS,
+        download_limit: int = c.SCHEDULER_DOWNLOAD_LIMIT,
+        parse_limit: int = c.SCHEDULER_PARSE_LIMIT,
+        write_limit: int = c.SCHEDULER_WRITE_LIMIT,
+        skip: Optional[Callable[[Any, IngestJob], bool]] = None,
+    ) -> None:
+        self.download = download
+        self.parse = parse
+        self.write = write
+        self.skip = skip
+        self.max_workers = max_workers
+        self._download_slots = threading.BoundedSemaphore(download_limit)
+        self._parse_slots = threading.BoundedSemaphore(parse_limit)
+        self._write_slots = threading.BoundedSemaphore(write_limit)
+
+    def run(self, jobs: List[IngestJob]) -> List[JobTiming]:
+        """Run every job and return their timings in submission order.
+
+        Parameters
+        ----------
+        jobs : List[IngestJob]
+            Jobs to execute.
+
+        Returns
+        -------
+        timings : List[JobTiming]
+            One timing report per job. Failed jobs carry an ``error`` message
+            instead of raising, so one missing file does not stop the build.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.run_job, jobs))
+
+    def run_job(self, job: IngestJob) -> JobTiming:
+        """Run a single job through the download, parse and write stages.
+
+        Parameters
+        ----------
+        job : IngestJob
+            Job to execute.
+
+        Returns
+        -------
+        timing : JobTiming
+            Timing report for the job.
+        """
+        timing = JobTiming(table=job.table, season=job.season)
+        job_start = time.perf_counter()
+        stage = "download"
+        try:
+            with self._download_slots:
+                stage_start = time.perf_counter()
+                payload = self.download(job)
+                timing.download_seconds = time.perf_counter() - stage_start
+            if self.skip is not None and self.skip(payload, job):
+                timing.skipped = True
+                timing.total_seconds = time.perf_counter() - job_start
+                logging.info(c.JOB_SKIPPED_MESSAGE, job.table, job.season)
+                return timing
+
+            stage = "parse"
+            with self._parse_slots:
+                stage_start = time.perf_counter()
+                data = self.parse(payload, job)
+                timing.parse_seconds = time.perf_counter() - stage_start
+            del payload
+
+            stage = "write"
+            with self._write_slots:
+                stage_start = time.perf_counter()
+                rows = self.write(data, job)
+                timing.write_seconds = time.perf_counter() - stage_start
+            timing.rows = rows if isinstance(rows, int) else len(data)
+        except Exception as error:  # pylint: disable=broad-except
+            timing.error = f"{type(error).__name__}: {error}"
+            logging.warning(
+                c.JOB_FAILED_MESSAGE, job.table, job.season, stage, timing.error
+            )
+        timing.total_seconds = time.perf_counter() - job_start
+        if timing.ok:
+            logging.info(
+                c.JOB_TIMING_MESSAGE,
+                job.table,
+                job.season,
+                timing.total_seconds,
+                timing.download_seconds,
+                timing.parse_seconds,
+                timing.write_seconds,
+                timing.rows,
+            )
+        return timing
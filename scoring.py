@@ -0,0 +1,235 @@
+"""
+scoring.py
+This file contains the fantasy scoring engine, compiling a league's scoring
+config into one vectorized expression over the player_stats columns
+"""
+
+import hashlib
+import json
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from script import column_dtype
+import constants as c
+
+NUMERIC_DTYPES = (c.INT8_DTYPE, c.INT16_DTYPE, c.INT32_DTYPE, c.FLOAT32_DTYPE)
+
+SCORING_COLUMNS = [
+    column
+    for column in c.PLAYER_STATS_TBL_COLUMNS
+    if column not in ("season", "week") and column_dtype(column) in NUMERIC_DTYPES
+]
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    """A league's scoring config compiled against SCORING_COLUMNS.
+
+    Attributes
+    ----------
+    weights : np.ndarray
+        Points per unit of every scoring column.
+    position_weights : Tuple[Tuple[str, np.ndarray], ...]
+        Extra points per unit of every scoring column, by position.
+    bonuses : Tuple[Tuple[int, float, float], ...]
+        (column position, threshold, points) of every threshold bonus.
+    digest : str
+        Hash of the canonical config, used as cache key.
+    """
+
+    weights: np.ndarray
+    position_weights: Tuple[Tuple[str, np.ndarray], ...]
+    bonuses: Tuple[Tuple[int, float, float], ...]
+    digest: str
+
+
+def column_position(stat: str) -> int:
+    """Helper function to locate a stat among SCORING_COLUMNS."""
+    if stat not in SCORING_COLUMNS:
+        raise KeyError(c.UNKNOWN_STAT_MESSAGE.format(stat=stat))
+    return SCORING_COLUMNS.index(stat)
+
+
+def weight_vector(points: Dict[str, float]) -> np.ndarray:
+    """Helper function to turn points per stat into a weight vector."""
+    weights = np.zeros(len(SCORING_COLUMNS))
+    for stat, value in points.items():
+        weights[column_position(stat)] = value
+    return weights
+
+
+def compile_rules(config: Union[str, Dict[str, Any]]) -> ScoringRules:
+    """Function to compile a scoring config.
+
+    Parameters
+    ----------
+    config : Union[str, Dict[str, Any]]
+        Name of a preset in c.SCORING_PRESET_DICT, or a config with
+        c.SCORING_POINTS_KEY ({stat: points}), c.SCORING_POSITION_POINTS_KEY
+        ({position: {stat: extra points}}) and c.SCORING_BONUSES_KEY
+        ([{"stat", "threshold", "points"}]) entries, all optional.
+
+    Returns
+    -------
+    rules : ScoringRules
+        Compiled rules.
+    """
+    if isinstance(config, str):
+        config = c.SCORING_PRESET_DICT[config]
+    position_points = config.get(c.SCORING_POSITION_POINTS_KEY, {})
+    bonuses = config.get(c.SCORING_BONUSES_KEY, [])
+    return ScoringRules(
+        weights=weight_vector(config.get(c.SCORING_POINTS_KEY, {})),
+        position_weights=tuple(
+            (position, weight_vector(points))
+            for position, points in sorted(position_points.items())
+        ),
+        bonuses=tuple(
+            (
+                column_position(bonus["stat"]),
+                float(bonus["threshold"]),
+                float(bonus["points"]),
+            )
+            for bonus in bonuses
+        ),
+        digest=hashlib.sha256(
+            json.dumps(config, sort_keys=True).encode("utf-8")
+        ).hexdigest(),
+    )
+
+
+def score_matrix(
+    rules: ScoringRules, stats: np.ndarray, positions: np.ndarray
+) -> np.ndarray:
+    """Helper function to evaluate compiled rules over a stat matrix.
+
+    Parameters
+    ----------
+    rules : ScoringRules
+        Compiled rules.
+    stats : np.ndarray
+        (rows, SCORING_COLUMNS) matrix of stats, zero where missing.
+    positions : np.ndarray
+        Position of every row.
+
+    Returns
+    -------
+    points : np.ndarray
+        Fantasy points of every row.
+    """
+    points = stats @ rules.weights
+    for position, weights in rules.position_weights:
+        points += np.where(positions == position, stats @ weights, 0.0)
+    for column, threshold, bonus in rules.bonuses:
+        points += np.where(stats[:, column] >= threshold, bonus, 0.0)
+    return points
+
+
+class ScoringEngine:
+    """Score player_stats under many scoring configs.
+
+    The stat matrix of every season is extracted once, and scores are cached
+    per (ruleset hash, season) so repeated evaluations of a league are free.
+
+    Parameters
+    ----------
+    player_stats : pd.DataFrame
+        Player-weeks with c.PLAYER_STATS_TBL_COLUMNS columns.
+    cache_size : int
+        Number of (ruleset, season) scores kept (default: c.SCORING_CACHE_SIZE).
+    """
+
+    def __init__(
+        self, player_stats: pd.DataFrame, cache_size: int = c.SCORING_CACHE_SIZE
+    ) -> None:
+        self.player_stats = player_stats.reset_index(drop=True)
+        self.cache_size = cache_size
+        seasons = self.player_stats["season"].to_numpy(dtype=int)
+        self._season_rows = {
+            int(season): np.flatnonzero(seasons == season)
+            for season in np.unique(seasons)
+        }
+        self._matrices: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._scores: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+
+    @property
+    def seasons(self) -> List[int]:
+        return sorted(self._season_rows)
+
+    def _season_matrix(self, season: int) -> Tuple[np.ndarray, np.ndarray]:
+        if season not in self._matrices:
+            rows = self.player_stats.iloc[self._season_rows[season]]
+            stats = (
+                rows.reindex(columns=SCORING_COLUMNS)
+                .apply(pd.to_numeric)
+                .fillna(0)
+                .to_numpy(dtype=float)
+            )
+            positions = rows.get("position", pd.Series(index=rows.index, dtype=object))
+            self._matrices[season] = (stats, positions.to_numpy(dtype=object))
+        return self._matrices[season]
+
+    def score(
+        self, config: Union[str, Dict[str, Any], ScoringRules], season: int
+    ) -> np.ndarray:
+        """Return the fantasy points of every player-week of a season.
+
+        Parameters
+        ----------
+        config : Union[str, Dict[str, Any], ScoringRules]
+            Scoring config, preset name or compiled rules.
+        season : int
+            Season to score.
+
+        Returns
+        -------
+        points : np.ndarray
+            Points aligned with ``rows(season)``.
+        """
+        rules = config if isinstance(config, ScoringRules) else compile_rules(config)
+        key = (rules.digest, season)
+        if key in self._scores:
+            self._scores.move_to_end(key)
+            return self._scores[key]
+        points = score_matrix(rules, *self._season_matrix(season))
+        points.setflags(write=False)
+        self._scores[key] = points
+        if len(self._scores) > self.cache_size:
+            self._scores.popitem(last=False)
+        return points
+
+    def rows(self, season: int) -> pd.DataFrame:
+        """Return the player-weeks of a season, in scoring order."""
+        return self.player_stats.iloc[self._season_rows[season]]
+
+    def score_frame(
+        self,
+        config: Union[str, Dict[str, Any], ScoringRules],
+        seasons: Optional[List[int]] = None,
+    ) -> pd.DataFrame:
+        """Return player-week fantasy points of several seasons.
+
+        Parameters
+        ----------
+        config : Union[str, Dict[str, Any], ScoringRules]
+            Scoring config, preset name or compiled rules.
+        seasons : Optional[List[int]]
+            Seasons to score (default: every season of the data).
+
+        Returns
+        -------
+        points : pd.DataFrame
+            player_id, season, week and fantasy_points columns.
+        """
+        rules = config if isinstance(config, ScoringRules) else compile_rules(config)
+        seasons = seasons or self.seasons
+        rows = np.concatenate([self._season_rows[season] for season in seasons])
+        points = self.player_stats.loc[rows, ["player_id", "season", "week"]]
+        return points.assign(
+            fantasy_points=np.concatenate(
+                [self.score(rules, season) for season in seasons]
+            )
+        ).reset_index(drop=True)
@@ -4,84 +4,224 @@ This file contains helper functions for reading nflfastpy data into a
 workable pandas dataframe
 """
 
+import gzip
+import io
+import itertools
 import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+import urllib.request
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 
-from typing import List, Optional, Tuple
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from cache import DownloadCache
+from encoding import encode_columns
+from fetch import AsyncFetcher
+from instrument import BuildMetrics, MeteredReader, measure
+from incremental import LoadManifest
+from planner import construct_table_url, plan_ingest_jobs
+from scheduler import IngestJob, IngestScheduler, JobTiming
+from staging import is_staged, read_staged_schema, read_staged_table, stage_table
 import constants as c
+import queries as q
 
 
-def build_db() -> None:
+def build_db(
+    base_url: Optional[str] = None,
+    tables: Optional[List[str]] = None,
+    seasons: Optional[List[int]] = None,
+    max_workers: int = c.SCHEDULER_MAX_WORKERS,
+    download_limit: int = c.SCHEDULER_DOWNLOAD_LIMIT,
+    parse_limit: int = c.SCHEDULER_PARSE_LIMIT,
+    write_limit: int = c.SCHEDULER_WRITE_LIMIT,
+    cache: Optional[DownloadCache] = None,
+    fetcher: Optional[AsyncFetcher] = None,
+    manifest: Optional[LoadManifest] = None,
+    staging_dir: Optional[str] = None,
+    chunksize: Optional[int] = None,
+    metrics: Optional[BuildMetrics] = None,
+    db_path: Optional[str] = None,
+) -> List[JobTiming]:
     """Function to loop through seasons/tables and write each to the db if data exists.
 
+    Jobs are executed on a bounded worker pool with separate concurrency
+    limits for the download, parse and write stages.
+
     Parameters
     ----------
-    None.
+    base_url : Optional[str]
+        Root of the nflverse release server. Point this at a local directory
+        mirroring the release layout to build without network access
+        (default: c.NFLV_BASE_URL).
+    tables : Optional[List[str]]
+        Subset of tables to build (default: c.ALL_TABLE_NAMES).
+    seasons : Optional[List[int]]
+        Seasons to load; non-seasonal tables are always loaded
+        (default: every season).
+    max_workers : int
+        Number of worker threads.
+    download_limit : int
+        Maximum concurrent downloads.
+    parse_limit : int
+        Maximum concurrent parses.
+    write_limit : int
+        Maximum concurrent database writes.
+    cache : Optional[DownloadCache]
+        Download cache to read release files through (default: no cache).
+    fetcher : Optional[AsyncFetcher]
+        Pooled asyncio downloader used for remote urls the cache does not
+        serve, retrying and resuming interrupted downloads
+        (default: one plain request per file).
+    manifest : Optional[LoadManifest]
+        Load manifest enabling incremental mode: completed seasons already
+        loaded are not downloaded, unchanged files are skipped, and changed
+        files replace their season in one transaction while the key indexes
+        stay in place (default: full rebuild).
+    staging_dir : Optional[str]
+        When given, every parsed season is also staged to Parquet under this
+        directory so derived tables can later be rebuilt with
+        rebuild_from_staging (default: no staging).
+    chunksize : Optional[int]
+        When given, files are streamed through column selection, dtype
+        coercion and the writer in chunks of this many rows, keeping peak
+        memory flat. Cannot be combined with staging_dir (default: parse
+        whole files).
+    metrics : Optional[BuildMetrics]
+        When given, the fetch, decompress, parse, filter and write stages of
+        every (table, season) are measured into it (default: no metrics).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
 
     Returns
     -------
-    None.
+    timings : List[JobTiming]
+        Per-job timing report, in job order.
     """
+    if chunksize is not None and staging_dir is not None:
+        raise ValueError(c.STREAM_STAGING_MESSAGE)
+    jobs = plan_ingest_jobs(base_url=base_url, tables=tables, seasons=seasons)
+    loaded_tables = [
+        table_name
+        for table in dict.fromkeys(job.table for job in jobs)
+        for table_name in derived_table_names(table) or [table]
+        if table_name in c.NFLV_TABLE_KEY_DICT
+    ]
+    if manifest is not None:
+        jobs = [job for job in jobs if manifest.needs_download(job)]
+    if manifest is None:
+        drop_key_indexes(db_path=db_path, tables=loaded_tables)
 
-    for table in c.ALL_TABLE_NAMES:
-        if table in c.SEASONAL_TABLES:
-            for season in range(
-                c.NFLV_DIR_DICT[table][c.NLFV_START_SEASON_KEY], c.CURRENT_YEAR + 1
-            ):
-                if season in c.NFLV_DIR_DICT[table][c.NFLV_SEASON_RANGE_KEY]:
-                    write_table(table=table, season=season)
-                else:
-                    logging.info(c.MISSING_SEASON_MESSAGE, season, table)
-        else:
-            write_table(table=table)
+    readers: Dict[IngestJob, MeteredReader] = {}
 
+    def download(job: IngestJob) -> BinaryIO:
+        with measure(metrics, job.table, job.season, "fetch") as record:
+            raw = fetch_table_data(job.url, cache=cache, fetcher=fetcher)
+            record.bytes = raw.seek(0, io.SEEK_END)
+            raw.seek(0)
+        return raw
 
-def construct_table_url(
-    table: str = c.NFLV_TABLE_DEFAULT,
-    year: int = c.CURRENT_YEAR,
-    suffix: Optional[str] = None,
-) -> Tuple[str, str]:
-    """Helper function to build nflverse url from table information.
+    def skip(raw: BinaryIO, job: IngestJob) -> bool:
+        if not manifest.is_current(raw, job):
+            return False
+        raw.close()
+        return True
 
-    Parameters
-    ----------
-    table : str
-        Name of repo subdirectory containing relevant data (default: 'pbp').
-    year : int
-        Year to read data (default: current year).
-    suffix :
-        Optional string appended to the end of the url corresponding to
-        stat type (one of 'passing_', 'rushing_', or 'receiving_').
+    def parse(raw: BinaryIO, job: IngestJob) -> Any:
+        source, compression = raw, job.compression
+        if metrics is not None:
+            source, compression = MeteredReader(raw, job.compression), None
+        if chunksize is not None:
+            # chunks are decompressed while they are written
+            if metrics is not None:
+                readers[job] = source
+            return close_after(
+                iter_table_chunks(
+                    source,
+                    compression=compression,
+                    table=job.table,
+                    chunksize=chunksize,
+                ),
+                raw,
+            )
+        try:
+            with raw, measure(metrics, job.table, job.season, "parse") as record:
+                size = raw.seek(0, io.SEEK_END)
+                raw.seek(0)
+                data = parse_table_data(
+                    source, compression=compression, table=job.table
+                )
+                record.bytes, record.rows = size, len(data)
+                if metrics is not None:
+                    record.wall_seconds -= source.wall_seconds
+                    record.cpu_seconds -= source.cpu_seconds
+        finally:
+            if metrics is not None:
+                metrics.add(source.record(job.table, job.season))
+        return data
 
-    Returns
-    -------
-    table_url, compression : Tuple[str, str]
-        Tuple of the url to read NFLV data from and the compression used to store it.
-    """
-    base_url = c.NFLV_DIR_DICT[c.NFLV_BASE_KEY][c.NFLV_URL_KEY]
-    url_addendum = c.NFLV_DIR_DICT[table][c.NFLV_URL_KEY]
-    compression = (
-        c.NFLV_DIR_DICT[table][c.NFLV_COMPRESSION_KEY]
-        if c.NFLV_COMPRESSION_KEY in c.NFLV_DIR_DICT[table].keys()
-        else None
-    )
-    extension = c.GZIP_EXTENSION if compression else c.CSV_EXTENSION
-    url_suffix = suffix if table in c.SUFFIX_TABLES else ""
-    url_year = str(year) if table not in c.NON_SEASONAL_TABLES else ""
-    table_url = c.URL_STRUCTURE.format(
-        base_url=base_url,
-        url_addendum=url_addendum,
-        year=url_year,
-        url_suffix=url_suffix,
-        extension=extension,
+    def write(data: Any, job: IngestJob) -> int:
+        try:
+            if chunksize is not None:
+                rows = stream_derived_tables(
+                    data,
+                    table=job.table,
+                    season=job.season,
+                    metrics=metrics,
+                    db_path=db_path,
+                )
+            else:
+                if staging_dir is not None:
+                    stage_table(
+                        data,
+                        table=job.table,
+                        season=job.season,
+                        staging_dir=staging_dir,
+                    )
+                write_derived_tables(
+                    data,
+                    table=job.table,
+                    season=job.season,
+                    metrics=metrics,
+                    db_path=db_path,
+                )
+                rows = len(data)
+        finally:
+            reader = readers.pop(job, None)
+            if reader is not None:
+                metrics.add(reader.record(job.table, job.season))
+        if manifest is not None:
+            manifest.record(job, rows=rows)
+        return rows
+
+    scheduler = IngestScheduler(
+        download=download,
+        parse=parse,
+        write=write,
+        skip=skip if manifest is not None else None,
+        max_workers=max_workers,
+        download_limit=download_limit,
+        parse_limit=parse_limit,
+        write_limit=write_limit,
     )
-    return table_url, compression
+    timings = scheduler.run(jobs)
+    create_key_indexes(db_path=db_path, tables=loaded_tables)
+    check_query_plans(db_path=db_path)
+    return timings
 
 
 def read_nflverse_data_year(
     table: str = c.NFLV_TABLE_DEFAULT,
     year: int = c.CURRENT_YEAR,
     stat_type: Optional[str] = None,
+    cache: Optional[DownloadCache] = None,
+    fetcher: Optional[AsyncFetcher] = None,
 ) -> pd.DataFrame:
     """Helper function to read any table from nflverse repo.
 
@@ -92,23 +232,337 @@ def read_nflverse_data_year(
     year : int
         Year to read data (default: current year).
     stat_type : Optional[str]
-        Optional string indicating stat type.
+        Stat type of the file, required for the tables in c.NFLV_STAT_TYPE_DICT.
+    cache : Optional[DownloadCache]
+        Download cache to read the file through (default: read the url directly).
+    fetcher : Optional[AsyncFetcher]
+        Pooled asyncio downloader to read the url with (default: plain request).
 
     Returns
     -------
     data : pd.DataFrame
         Pandas DataFrame of nflverse data.
     """
-    suffix = (
-        c.NFLV_SUFFIX_DICT[table].format(stat_type=stat_type)
-        if table in c.NFLV_SUFFIX_DICT.keys()
-        else ""
+    table_url, compression = construct_table_url(
+        table=table, year=year, stat_type=stat_type
     )
-    table_url, compression = construct_table_url(table=table, suffix=suffix, year=year)
-    data = pd.read_csv(table_url, compression=compression, low_memory=False)
+    load_table = c.NFLV_STAT_TYPE_DICT.get(table, {None: table}).get(stat_type)
+    with fetch_table_data(table_url, cache=cache, fetcher=fetcher) as raw:
+        data = parse_table_data(raw, compression=compression, table=load_table)
     return data
 
 
+def fetch_table_data(
+    table_url: str,
+    cache: Optional[DownloadCache] = None,
+    fetcher: Optional[AsyncFetcher] = None,
+) -> BinaryIO:
+    """Helper function to download an nflverse file and open it for parsing.
+
+    Remote files are streamed to disk, through the cache when one is given,
+    and handed back as an open file, so a download is never held in memory
+    as a whole. Cache misses go through the fetcher when both are given.
+
+    Parameters
+    ----------
+    table_url : str
+        Url (or local path) of the file to download.
+    cache : Optional[DownloadCache]
+        Download cache to serve remote urls from (default: no cache).
+    fetcher : Optional[AsyncFetcher]
+        Pooled asyncio downloader for remote urls, retrying and resuming
+        interrupted downloads (default: plain request).
+
+    Returns
+    -------
+    raw : BinaryIO
+        Undecoded file contents, opened for reading. Closing the file removes
+        temporary downloads.
+    """
+    if not table_url.startswith(("http://", "https://")):
+        return open(table_url, "rb")  # pylint: disable=consider-using-with
+    if cache is not None:
+        return cache.fetch(table_url, fetcher=fetcher)
+    if fetcher is not None:
+        return fetcher.fetch(table_url)
+    raw = tempfile.TemporaryFile()  # pylint: disable=consider-using-with
+    try:
+        with urllib.request.urlopen(table_url) as response:
+            shutil.copyfileobj(response, raw)
+    except BaseException:
+        raw.close()
+        raise
+    raw.seek(0)
+    return raw
+
+
+def parse_table_data(
+    raw: Union[bytes, BinaryIO],
+    compression: Optional[str] = None,
+    table: Optional[str] = None,
+) -> pd.DataFrame:
+    """Helper function to parse downloaded nflverse bytes into a DataFrame.
+
+    The file is parsed with the multithreaded pyarrow reader (see
+    read_arrow_csv), reading only text columns as their registered dtype,
+    and numeric columns are downcast to their c.NFLV_DTYPE_DICT dtypes
+    afterwards by apply_dtypes; parsing straight into nullable integer
+    dtypes is several times slower. Source tables with derived tables in
+    c.NFLV_TABLE_DICT only parse the columns those tables use. Should pyarrow
+    reject a file, or read timestamps in it, it is parsed with the pandas C
+    engine instead.
+
+    Parameters
+    ----------
+    raw : Union[bytes, BinaryIO]
+        File contents, or a seekable stream of them such as the file returned
+        by fetch_table_data or a MeteredReader.
+    compression : Optional[str]
+        Compression used to store the file (e.g. 'gzip').
+    table : Optional[str]
+        Name of the nflverse source table (default: parse every column).
+
+    Returns
+    -------
+    data : pd.DataFrame
+        Pandas DataFrame of nflverse data.
+    """
+    buffer = io.BytesIO(raw) if isinstance(raw, bytes) else raw
+    options = read_csv_options(buffer, compression=compression, table=table)
+    try:
+        data = read_arrow_csv(buffer, compression=compression, **options)
+    except (TypeError, ValueError):
+        data = None
+    # pyarrow turns ISO timestamps in unregistered columns into datetimes,
+    # which the C engine and the database keep as text
+    if data is None or any(
+        pd.api.types.is_datetime64_any_dtype(dtype) for dtype in data.dtypes
+    ):
+        buffer.seek(0)
+        data = pd.read_csv(buffer, compression=compression, low_memory=False, **options)
+    return apply_dtypes(data)
+
+
+def iter_table_chunks(
+    raw: Union[bytes, BinaryIO],
+    compression: Optional[str] = None,
+    table: Optional[str] = None,
+    chunksize: int = c.STREAM_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Helper function to stream downloaded nflverse bytes as typed row chunks.
+
+    Only one chunk is held in memory at a time, besides the compressed file
+    when given as bytes. Text columns are parsed as their registered dtype
+    and numeric columns are coerced chunk by chunk, so a stray value cannot
+    abort a stream halfway.
+
+    Parameters
+    ----------
+    raw : Union[bytes, BinaryIO]
+        File contents, or a seekable stream of them such as the file returned
+        by fetch_table_data or a MeteredReader.
+    compression : Optional[str]
+        Compression used to store the file (e.g. 'gzip').
+    table : Optional[str]
+        Name of the nflverse source table (default: parse every column).
+    chunksize : int
+        Rows per chunk (default: c.STREAM_CHUNK_ROWS).
+
+    Returns
+    -------
+    chunks : Iterator[pd.DataFrame]
+        Typed DataFrame chunks in file order.
+    """
+    buffer = io.BytesIO(raw) if isinstance(raw, bytes) else raw
+    options = read_csv_options(buffer, compression=compression, table=table)
+    with pd.read_csv(
+        buffer, compression=compression, chunksize=chunksize, **options
+    ) as reader:
+        for chunk in reader:
+            yield apply_dtypes(chunk)
+
+
+def close_after(
+    chunks: Iterator[pd.DataFrame], raw: BinaryIO
+) -> Iterator[pd.DataFrame]:
+    """Helper function to close a downloaded file once its chunks are consumed.
+
+    The file is also closed when the consumer stops early and the iterator
+    is closed or garbage collected.
+    """
+    with raw:
+        yield from chunks
+
+
+def read_arrow_csv(
+    buffer: BinaryIO,
+    compression: Optional[str] = None,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """Helper function to parse a csv stream with the multithreaded pyarrow reader.
+
+    pyarrow.csv is called directly rather than through pd.read_csv, whose
+    pyarrow engine casts columns to ``dtype`` only after pyarrow typed them,
+    so ids such as '007' would arrive as '7.0' and empty text as ''.
+
+    Parameters
+    ----------
+    buffer : BinaryIO
+        File contents.
+    compression : Optional[str]
+        Compression used to store the file (e.g. 'gzip').
+    usecols : Optional[List[str]]
+        Columns to read (default: every column).
+    dtype : Optional[Dict[str, str]]
+        Columns read as nullable text; every other column is typed by
+        pyarrow (default: no text columns).
+
+    Returns
+    -------
+    data : pd.DataFrame
+        Parsed data, not yet cast to the registered dtypes.
+    """
+    stream = gzip.GzipFile(fileobj=buffer) if compression == "gzip" else buffer
+    table = pa_csv.read_csv(
+        stream,
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: pa.string() for column in dtype or {}},
+            include_columns=usecols,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
+
+def read_csv_options(
+    buffer: BinaryIO, compression: Optional[str] = None, table: Optional[str] = None
+) -> Dict[str, Any]:
+    """Helper function to derive pd.read_csv options from a file header.
+
+    Parameters
+    ----------
+    buffer : BinaryIO
+        File contents. The buffer is rewound after reading the header.
+    compression : Optional[str]
+        Compression used to store the file (e.g. 'gzip').
+    table : Optional[str]
+        Name of the nflverse source table (default: read every column).
+
+    Returns
+    -------
+    options : Dict[str, Any]
+        ``usecols`` and ``dtype`` arguments for pd.read_csv. Only text columns
+        get their registered dtype, so ids such as '00-0012345' are never
+        parsed as numbers; numeric columns are left to apply_dtypes.
+    """
+    header = pd.read_csv(buffer, compression=compression, nrows=0).columns
+    buffer.seek(0)
+    usecols = source_column_names(table=table, columns=header) if table else None
+    columns = usecols if usecols is not None else list(header)
+    text_dtypes = {
+        column: dtype
+        for column, dtype in resolve_dtypes(columns).items()
+        if dtype in (c.CATEGORY_DTYPE, c.STRING_DTYPE)
+    }
+    return {"usecols": usecols, "dtype": text_dtypes}
+
+
+def column_dtype(column: str) -> Optional[str]:
+    """Helper function to look up the registered dtype of a column.
+
+    Parameters
+    ----------
+    column : str
+        Column name.
+
+    Returns
+    -------
+    dtype : Optional[str]
+        Dtype from c.NFLV_DTYPE_DICT, falling back to the suffix rules in
+        c.NFLV_DTYPE_SUFFIX_DICT, or None for unregistered columns.
+    """
+    if column in c.NFLV_DTYPE_DICT:
+        return c.NFLV_DTYPE_DICT[column]
+    for suffix, dtype in c.NFLV_DTYPE_SUFFIX_DICT.items():
+        if column.endswith(suffix):
+            return dtype
+    return None
+
+
+def resolve_dtypes(columns: List[str]) -> Dict[str, str]:
+    """Helper function to map columns to their registered dtypes.
+
+    Parameters
+    ----------
+    columns : List[str]
+        Column names.
+
+    Returns
+    -------
+    dtypes : Dict[str, str]
+        Registered dtype of every column that has one.
+    """
+    dtypes = {column: column_dtype(column) for column in columns}
+    return {column: dtype for column, dtype in dtypes.items() if dtype is not None}
+
+
+def coerce_column(values: pd.Series, dtype: str) -> pd.Series:
+    """Helper function to convert a column to its registered dtype.
+
+    Integer columns holding fractional values fall back to float32 and
+    integer columns outgrowing their width are widened to Int64, so coercion
+    never loses data.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Column to convert.
+    dtype : str
+        Target dtype.
+
+    Returns
+    -------
+    values : pd.Series
+        Converted column.
+    """
+    if str(values.dtype) == dtype:
+        return values
+    if dtype in (c.CATEGORY_DTYPE, c.STRING_DTYPE, c.BOOLEAN_DTYPE):
+        return values.astype(dtype)
+    numeric = pd.to_numeric(values, errors="coerce")
+    if dtype.startswith("Int"):
+        present = numeric.dropna()
+        if not present.mod(1).eq(0).all():
+            return numeric.astype(c.FLOAT32_DTYPE)
+        bounds = np.iinfo(dtype.lower())
+        if len(present) and (present.min() < bounds.min or present.max() > bounds.max):
+            return numeric.astype("Int64")
+    return numeric.astype(dtype)
+
+
+def apply_dtypes(nflv_data: pd.DataFrame) -> pd.DataFrame:
+    """Helper function to enforce the dtype registry on a DataFrame.
+
+    Parameters
+    ----------
+    nflv_data : pd.DataFrame
+        NFLVerse data.
+
+    Returns
+    -------
+    typed_data : pd.DataFrame
+        Copy of the data with every registered column converted.
+    """
+    dtypes = resolve_dtypes(nflv_data.columns)
+    converted = {
+        column: coerce_column(nflv_data[column], dtype)
+        for column, dtype in dtypes.items()
+        if str(nflv_data[column].dtype) != dtype
+    }
+    return nflv_data.assign(**converted) if converted else nflv_data
+
+
 def return_column_names(nflv_data: pd.DataFrame, table_name: str) -> List[str]:
     """Helper function to return column names for each table.
 
@@ -126,13 +580,23 @@ def return_column_names(nflv_data: pd.DataFrame, table_name: str) -> List[str]:
         List of columns for writing to the NFLVerse database.
     """
     if table_name == "pbp_player":
-        column_list = [
-            pbp_column
-            for pbp_column in nflv_data.columns
-            if any(
-                colname_substring in pbp_column for colname_substring in c.PLAYER_COLS
+        id_columns = participant_id_columns(nflv_data.columns)
+        column_list = (
+            c.PBP_PARTICIPANT_PLAY_COLUMNS
+            + id_columns
+            + [participant_team_column(column) for column in id_columns]
+        )
+    elif table_name == "pbp_weeks":
+        column_list = list(
+            dict.fromkeys(
+                c.PBP_WEEKS_GROUP_COLUMNS
+                + [
+                    column
+                    for hashed_table in c.PBP_WEEKS_HASHED_TABLES
+                    for column in return_column_names(nflv_data, hashed_table)
+                ]
             )
-        ]
+        )
     elif table_name not in c.NFLV_TABLE_DICT.keys():
         raise KeyError(c.MISSING_TABLE_MESSAGE)
     else:
@@ -140,6 +604,164 @@ def return_column_names(nflv_data: pd.DataFrame, table_name: str) -> List[str]:
     return column_list
 
 
+def participant_id_columns(columns: Iterable[str]) -> List[str]:
+    """Helper function to list the wide pbp columns naming a play participant.
+
+    Parameters
+    ----------
+    columns : Iterable[str]
+        Columns of the pbp data.
+
+    Returns
+    -------
+    id_columns : List[str]
+        Columns matching c.PBP_PARTICIPANT_ID_PATTERN, in input order.
+    """
+    return [
+        column
+        for column in columns
+        if re.fullmatch(c.PBP_PARTICIPANT_ID_PATTERN, column) is not None
+    ]
+
+
+def participant_team_column(id_column: str) -> str:
+    """Helper function to name the team column paired with a participant column.
+
+    Parameters
+    ----------
+    id_column : str
+        Participant id column (e.g. 'solo_tackle_1_player_id').
+
+    Returns
+    -------
+    team_column : str
+        Matching team column (e.g. 'solo_tackle_1_team'), which pbp does not
+        carry for every role.
+    """
+    return (
+        id_column[: -len(c.PBP_PARTICIPANT_ID_SUFFIX)] + c.PBP_PARTICIPANT_TEAM_SUFFIX
+    )
+
+
+def melt_play_participants(wide_data: pd.DataFrame) -> pd.DataFrame:
+    """Helper function to melt wide pbp participant columns into one row per player.
+
+    Every non-null '*_player_id' cell becomes a (game_id, play_id, role, slot,
+    player_id, team) row. The team comes from the role's '_team' column, or
+    from posteam/defteam for roles in c.PBP_POSTEAM_ROLES/c.PBP_DEFTEAM_ROLES,
+    and is null otherwise. All roles are melted in one pass over a 2D array.
+
+    Parameters
+    ----------
+    wide_data : pd.DataFrame
+        Play identifiers, posteam/defteam and participant columns of pbp data.
+
+    Returns
+    -------
+    long_data : pd.DataFrame
+        Participants ordered by play, with c.PBP_PLAYER_TBL_COLUMNS columns.
+    """
+    id_columns = participant_id_columns(wide_data.columns)
+    matches = [re.fullmatch(c.PBP_PARTICIPANT_ID_PATTERN, col) for col in id_columns]
+    roles = np.array([match["role"] for match in matches], dtype=object)
+    slots = np.array([int(match["slot"] or 1) for match in matches], dtype=np.int8)
+    missing_teams = np.full(len(wide_data), None, dtype=object)
+    team_columns = []
+    for id_column, role in zip(id_columns, roles):
+        team_column = participant_team_column(id_column)
+        if team_column not in wide_data.columns:
+            if role in c.PBP_POSTEAM_ROLES:
+                team_column = "posteam"
+            elif role in c.PBP_DEFTEAM_ROLES:
+                team_column = "defteam"
+        if team_column in wide_data.columns:
+            team_columns.append(wide_data[team_column].to_numpy(dtype=object))
+        else:
+            team_columns.append(missing_teams)
+
+    participants = wide_data[id_columns]
+    plays, positions = np.nonzero(participants.notna().to_numpy())
+    teams = (
+        np.column_stack(team_columns)[plays, positions]
+        if team_columns
+        else np.empty(0, dtype=object)
+    )
+    long_data = pd.DataFrame(
+        {
+            "game_id": wide_data["game_id"].to_numpy(dtype=object)[plays],
+            "play_id": wide_data["play_id"].to_numpy()[plays],
+            "role": pd.Categorical(roles[positions]),
+            "slot": pd.array(slots[positions], dtype="Int8"),
+            "player_id": pd.array(
+                participants.to_numpy(dtype=object)[plays, positions], dtype="string"
+            ),
+            "team": pd.Categorical(pd.Series(teams, dtype=object).where(pd.notna)),
+        }
+    )
+    return long_data
+
+
+def summarize_pbp_weeks(week_data: pd.DataFrame) -> pd.DataFrame:
+    """Helper function to count and checksum the plays of every pbp week.
+
+    The checksum is the sum of the row hashes of a week modulo 2**64, so it
+    does not depend on row order and partial summaries can be added up with
+    combine_pbp_weeks.
+
+    Parameters
+    ----------
+    week_data : pd.DataFrame
+        pbp data restricted to the columns hashed into the checksum.
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        One row per (season, week, season_type), with c.PBP_WEEKS_TBL_COLUMNS
+        columns. Empty when the data has no week columns.
+    """
+    if not set(c.PBP_WEEKS_GROUP_COLUMNS) <= set(week_data.columns):
+        return pd.DataFrame(columns=c.PBP_WEEKS_TBL_COLUMNS)
+    week_data = week_data[week_data["week"].notna()]
+    hashes = pd.util.hash_pandas_object(week_data, index=False).to_numpy()
+    summary = (
+        week_data[c.PBP_WEEKS_GROUP_COLUMNS]
+        .assign(plays=1, checksum=hashes)
+        .groupby(c.PBP_WEEKS_GROUP_COLUMNS, observed=True, sort=True)
+        .sum()
+        .reset_index()
+    )
+    summary["checksum"] = [f"{checksum:016x}" for checksum in summary["checksum"]]
+    return summary
+
+
+def combine_pbp_weeks(summaries: List[pd.DataFrame]) -> pd.DataFrame:
+    """Helper function to add up pbp week summaries of several chunks.
+
+    Parameters
+    ----------
+    summaries : List[pd.DataFrame]
+        Outputs of summarize_pbp_weeks.
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        Summary of all chunks together.
+    """
+    combined = pd.concat(
+        [pd.DataFrame(columns=c.PBP_WEEKS_TBL_COLUMNS)] + summaries, ignore_index=True
+    )
+    combined["checksum"] = [int(checksum, 16) for checksum in combined["checksum"]]
+    summary = (
+        combined.groupby(c.PBP_WEEKS_GROUP_COLUMNS, observed=True, sort=True)
+        .agg(plays=("plays", "sum"), checksum=("checksum", "sum"))
+        .reset_index()
+    )
+    summary["checksum"] = [
+        f"{checksum % 2 ** 64:016x}" for checksum in summary["checksum"]
+    ]
+    return summary
+
+
 def build_table(nflv_data: pd.DataFrame, table_name: str) -> pd.DataFrame:
     """Helper function to extract table-specific information from pbp data.
 
@@ -157,12 +779,750 @@ def build_table(nflv_data: pd.DataFrame, table_name: str) -> pd.DataFrame:
         Re-indexed pandas DataFrame with only the relevant columns available and
         duplicate rows removed. Ready to be written to the database.
     """
-    column_list = return_column_names(nflv_data=nflv_data, table_name=table_name)
-    filtered_data = (
-        nflv_data.filter(column_list, axis=1).drop_duplicates().reset_index(drop=True)
+    return build_tables(nflv_data=nflv_data, table_names=[table_name])[table_name]
+
+
+def build_column_index(
+    nflv_data: pd.DataFrame, table_names: List[str]
+) -> Dict[str, Tuple[List[int], List[str]]]:
+    """Helper function to resolve the source column positions of several tables at once.
+
+    Source columns renamed by c.PBP_RENAME_DICT (e.g. 'desc') are matched to
+    their table column names (e.g. 'play_desc').
+
+    Parameters
+    ----------
+    nflv_data : pd.DataFrame
+        NFLVerse data for database upload.
+    table_names : List[str]
+        Names of the tables to resolve.
+
+    Returns
+    -------
+    column_index : Dict[str, Tuple[List[int], List[str]]]
+        For every table, the positions of its columns in nflv_data and the
+        names those columns take in the table.
+    """
+    positions = {column: position for position, column in enumerate(nflv_data.columns)}
+    source_names = {target: source for source, target in c.PBP_RENAME_DICT.items()}
+    column_index = {}
+    for table_name in table_names:
+        table_positions, table_columns = [], []
+        for column in return_column_names(nflv_data=nflv_data, table_name=table_name):
+            source = column if column in positions else source_names.get(column)
+            if source in positions:
+                table_positions.append(positions[source])
+                table_columns.append(column)
+        column_index[table_name] = (table_positions, table_columns)
+    return column_index
+
+
+def dedup_columns(table_name: str, columns: List[str]) -> List[str]:
+    """Helper function to choose the columns a table is deduplicated on.
+
+    Parameters
+    ----------
+    table_name : str
+        Name of the table.
+    columns : List[str]
+        Columns of the table.
+
+    Returns
+    -------
+    dedup_columns : List[str]
+        The natural key in c.NFLV_TABLE_KEY_DICT when every key column is
+        present, otherwise every column.
+    """
+    key_columns = c.NFLV_TABLE_KEY_DICT.get(table_name, [])
+    if key_columns and set(key_columns) <= set(columns):
+        return list(key_columns)
+    return list(columns)
+
+
+def first_rows(keys: pd.DataFrame) -> np.ndarray:
+    """Helper function to flag the first occurrence of every key.
+
+    Each row is hashed to one uint64 by pd.util.hash_pandas_object, so
+    duplicates are found on a single integer array instead of comparing the
+    key columns one by one.
+
+    Parameters
+    ----------
+    keys : pd.DataFrame
+        Key columns of every row.
+
+    Returns
+    -------
+    keep : np.ndarray
+        Boolean mask, True for the first row of every key.
+    """
+    hashes = pd.util.hash_pandas_object(keys, index=False)
+    return ~hashes.duplicated().to_numpy()
+
+
+def build_tables(
+    nflv_data: pd.DataFrame, table_names: Optional[List[str]] = None
+) -> Dict[str, pd.DataFrame]:
+    """Helper function to fan one parsed source frame out into several tables.
+
+    Column positions are resolved once for all tables and each table copies
+    only its own columns; pbp_player is melted into one row per participant
+    by melt_play_participants and pbp_weeks is summarized by
+    summarize_pbp_weeks. Every other table keeps the first row of each
+    natural key chosen by dedup_columns, found by hashing only the key
+    columns before any other column is copied, and logs how many duplicates
+    it dropped. Tables listed in c.KEY_DEDUP_TABLES also drop rows missing
+    any part of the key, and come out empty when the key is missing.
+
+    Parameters
+    ----------
+    nflv_data : pd.DataFrame
+        NFLVerse data for database upload.
+    table_names : Optional[List[str]]
+        Names of the tables to build (default: c.NFLV_TABLE_DICT.keys()).
+
+    Returns
+    -------
+    tables : Dict[str, pd.DataFrame]
+        Re-indexed table data keyed by table name, ready to be written to the
+        database.
+    """
+    column_index = build_column_index(
+        nflv_data=nflv_data, table_names=list(table_names or c.NFLV_TABLE_DICT.keys())
+    )
+    tables = {}
+    for table_name, (positions, columns) in column_index.items():
+        if table_name == "pbp_weeks":
+            tables[table_name] = summarize_pbp_weeks(
+                nflv_data.iloc[:, positions].set_axis(columns, axis=1)
+            )
+            continue
+        source_data = nflv_data
+        if table_name == "pbp_player":
+            source_data = melt_play_participants(
+                nflv_data.iloc[:, positions].set_axis(columns, axis=1)
+            )
+            columns = list(source_data.columns)
+            positions = list(range(len(columns)))
+        key_columns = c.NFLV_TABLE_KEY_DICT.get(table_name, [])
+        if table_name in c.KEY_DEDUP_TABLES and not set(key_columns) <= set(columns):
+            table_data = source_data.iloc[:0, positions]
+        else:
+            key_columns = dedup_columns(table_name, columns)
+            keys = source_data.iloc[
+                :, [positions[columns.index(key)] for key in key_columns]
+            ]
+            keep = first_rows(keys)
+            duplicates = len(keep) - int(keep.sum())
+            if duplicates:
+                logging.info(c.DEDUP_MESSAGE, duplicates, table_name, key_columns)
+            if table_name in c.KEY_DEDUP_TABLES:
+                keep &= keys.notna().all(axis=1).to_numpy()
+            table_data = source_data.iloc[keep, positions]
+        tables[table_name] = table_data.set_axis(columns, axis=1).reset_index(drop=True)
+    return tables
+
+
+def derived_table_names(table: str) -> List[str]:
+    """Helper function to list the database tables built from a source table.
+
+    Parameters
+    ----------
+    table : str
+        Name of the nflverse source table (e.g. 'pbp').
+
+    Returns
+    -------
+    table_names : List[str]
+        Keys of c.NFLV_TABLE_DICT derived from the source table.
+    """
+    return [
+        table_name
+        for table_name, source_table in c.NFLV_SOURCE_TABLE_DICT.items()
+        if source_table == table
+    ]
+
+
+def source_column_names(table: str, columns: List[str]) -> Optional[List[str]]:
+    """Helper function to list the source columns the derived tables of a table use.
+
+    Parameters
+    ----------
+    table : str
+        Name of the nflverse source table (e.g. 'pbp').
+    columns : List[str]
+        Columns available in the source file.
+
+    Returns
+    -------
+    column_list : Optional[List[str]]
+        Used source columns in file order, or None when the source table has
+        no derived tables and is kept whole.
+    """
+    table_names = derived_table_names(table)
+    if not table_names:
+        return None
+    column_index = build_column_index(
+        nflv_data=pd.DataFrame(columns=columns), table_names=table_names
+    )
+    used = {
+        position for positions, _ in column_index.values() for position in positions
+    }
+    return [column for position, column in enumerate(columns) if position in used]
+
+
+def write_derived_tables(
+    nflv_data: pd.DataFrame,
+    table: str,
+    season: Optional[int] = None,
+    metrics: Optional[BuildMetrics] = None,
+    db_path: Optional[str] = None,
+) -> None:
+    """Helper function to build and write every table derived from a source frame.
+
+    Source tables without derived tables in c.NFLV_TABLE_DICT are written as is.
+
+    Parameters
+    ----------
+    nflv_data : pd.DataFrame
+        Parsed nflverse source data.
+    table : str
+        Name of the nflverse source table.
+    season : Optional[int]
+        Season of the data, None for non-seasonal tables.
+    metrics : Optional[BuildMetrics]
+        Instrumentation measuring the filter and write stages
+        (default: no metrics).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    None.
+    """
+    table_names = derived_table_names(table)
+    if not table_names:
+        tables = {table: nflv_data}
+    else:
+        with measure(metrics, table, season, "filter") as record:
+            tables = build_tables(nflv_data=nflv_data, table_names=table_names)
+            record.rows = sum(len(table_data) for table_data in tables.values())
+    for table_name, table_data in tables.items():
+        with measure(metrics, table_name, season, "write") as record:
+            record.rows = write_table(
+                table=table_name,
+                season=season,
+                data=table_data,
+                db_path=db_path,
+            )
+
+
+def stream_derived_tables(
+    chunks: Iterable[pd.DataFrame],
+    table: str,
+    season: Optional[int] = None,
+    metrics: Optional[BuildMetrics] = None,
+    db_path: Optional[str] = None,
+) -> int:
+    """Helper function to build and write derived tables chunk by chunk.
+
+    Row hashes already written are remembered per table so that rows
+    repeated across chunks (e.g. a game or drive spanning two chunks) are
+    only written once, hashing the columns chosen by dedup_columns. Tables
+    in c.SUMMARY_TABLES are combined across chunks and written once at the
+    end.
+
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        Typed source chunks, e.g. from iter_table_chunks.
+    table : str
+        Name of the nflverse source table.
+    season : Optional[int]
+        Season of the data, None for non-seasonal tables.
+    metrics : Optional[BuildMetrics]
+        Instrumentation measuring the parse, filter and write stages of every
+        chunk; parse time includes decompression (default: no metrics).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    rows : int
+        Number of source rows streamed.
+    """
+    table_names = derived_table_names(table)
+    seen_hashes = {table_name: set() for table_name in table_names}
+    summaries = {
+        table_name: [] for table_name in table_names if table_name in c.SUMMARY_TABLES
+    }
+    rows = 0
+    chunk_iterator = iter(chunks)
+    for chunk_number in itertools.count():
+        with measure(metrics, table, season, "parse") as record:
+            chunk = next(chunk_iterator, None)
+            record.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        rows += len(chunk)
+        append = chunk_number > 0
+        if not table_names:
+            with measure(metrics, table, season, "write") as record:
+                record.rows = write_table(
+                    table=table,
+                    season=season,
+                    data=chunk,
+                    append=append,
+                    db_path=db_path,
+                )
+            continue
+        with measure(metrics, table, season, "filter") as record:
+            tables = build_tables(nflv_data=chunk, table_names=table_names)
+            new_tables = {}
+            for table_name, table_data in tables.items():
+                if table_name in summaries:
+                    summaries[table_name].append(table_data)
+                    continue
+                key_columns = dedup_columns(table_name, list(table_data.columns))
+                hashes = pd.util.hash_pandas_object(
+                    table_data[key_columns], index=False
+                )
+                new_rows = ~hashes.isin(seen_hashes[table_name]).to_numpy()
+                seen_hashes[table_name].update(hashes)
+                new_tables[table_name] = table_data[new_rows].reset_index(drop=True)
+            record.rows = sum(len(table_data) for table_data in new_tables.values())
+        for table_name, table_data in new_tables.items():
+            with measure(metrics, table_name, season, "write") as record:
+                record.rows = write_table(
+                    table=table_name,
+                    season=season,
+                    data=table_data,
+                    append=append,
+                    db_path=db_path,
+                )
+    for table_name, table_summaries in summaries.items():
+        with measure(metrics, table_name, season, "write") as record:
+            record.rows = write_table(
+                table=table_name,
+                season=season,
+                data=combine_pbp_weeks(table_summaries),
+                db_path=db_path,
+            )
+    return rows
+
+
+def build_staged_table(
+    table_name: str, season: Optional[int] = None, staging_dir: Optional[str] = None
+) -> pd.DataFrame:
+    """Helper function to build a database table from staged Parquet data.
+
+    Only the columns the table needs are read from the staged source season.
+
+    Parameters
+    ----------
+    table_name : str
+        Name of table to build. Options available
+        in ff_projections.constants.NFLV_TABLE_DICT.keys().
+    season : Optional[int]
+        Season to build, None for non-seasonal tables.
+    staging_dir : Optional[str]
+        Root of the staging area (default: c.STAGING_DIR).
+
+    Returns
+    -------
+    filtered_data : pd.DataFrame
+        Table data ready to be written to the database.
+    """
+    source_table = c.NFLV_SOURCE_TABLE_DICT[table_name]
+    column_list = return_column_names(
+        nflv_data=read_staged_schema(source_table, season, staging_dir=staging_dir),
+        table_name=table_name,
+    )
+    column_list = column_list + [
+        source for source, target in c.PBP_RENAME_DICT.items() if target in column_list
+    ]
+    staged_data = read_staged_table(
+        source_table, season, columns=column_list, staging_dir=staging_dir
+    )
+    return build_table(nflv_data=staged_data, table_name=table_name)
+
+
+def rebuild_from_staging(
+    tables: Optional[List[str]] = None,
+    seasons: Optional[List[int]] = None,
+    staging_dir: Optional[str] = None,
+    db_path: Optional[str] = None,
+) -> None:
+    """Function to rebuild database tables from the staging area without downloading.
+
+    Parameters
+    ----------
+    tables : Optional[List[str]]
+        Tables to rebuild (default: c.NFLV_TABLE_DICT.keys()).
+    seasons : Optional[List[int]]
+        Seasons to rebuild (default: every season available for the source table).
+    staging_dir : Optional[str]
+        Root of the staging area (default: c.STAGING_DIR).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    None.
+    """
+    for table_name in tables or c.NFLV_TABLE_DICT.keys():
+        source_table = c.NFLV_SOURCE_TABLE_DICT[table_name]
+        source_dir = c.NFLV_STAT_TABLE_DICT.get(source_table, source_table)
+        source_seasons = c.NFLV_DIR_DICT[source_dir].get(
+            c.NFLV_SEASON_RANGE_KEY, [None]
+        )
+        for season in seasons or source_seasons:
+            if season not in source_seasons or not is_staged(
+                source_table, season, staging_dir=staging_dir
+            ):
+                logging.info(c.MISSING_SEASON_MESSAGE, season, table_name)
+                continue
+            write_table(
+                table=table_name,
+                season=season,
+                data=build_staged_table(table_name, season, staging_dir=staging_dir),
+                db_path=db_path,
+            )
+
+
+def connect_db(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """Helper function to open the nflverse database tuned for bulk loads.
+
+    The connection runs in autocommit mode so callers control transactions
+    explicitly with BEGIN/COMMIT.
+
+    Parameters
+    ----------
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    connection : sqlite3.Connection
+        Open database connection.
+    """
+    connection = sqlite3.connect(
+        os.path.expanduser(db_path or c.DB_PATH),
+        timeout=c.SQLITE_TIMEOUT_SECONDS,
+        isolation_level=None,
+        check_same_thread=False,
+    )
+    for pragma_query in q.BULK_LOAD_PRAGMA_QUERIES:
+        connection.execute(pragma_query)
+    return connection
+
+
+def sqlite_column_type(values: pd.Series) -> str:
+    """Helper function to map a typed column to its SQLite storage class.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Column typed with apply_dtypes.
+
+    Returns
+    -------
+    column_type : str
+        One of 'INTEGER', 'REAL' or 'TEXT'.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return c.SQLITE_TEXT_TYPE
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        return c.SQLITE_INTEGER_TYPE
+    if pd.api.types.is_float_dtype(values):
+        return c.SQLITE_REAL_TYPE
+    return c.SQLITE_TEXT_TYPE
+
+
+def ensure_table_schema(
+    connection: sqlite3.Connection, table: str, nflv_data: pd.DataFrame
+) -> None:
+    """Helper function to create a table, or add columns it is missing.
+
+    Tables in c.NFLV_SCHEMA_DICT are created from their compiled DDL, any
+    other table from the columns of the data. nflverse adds columns over
+    time, so a later season may carry columns the table was created without.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        Open database connection.
+    table : str
+        Name of the table.
+    nflv_data : pd.DataFrame
+        Typed data about to be written.
+
+    Returns
+    -------
+    None.
+    """
+    column_types = {
+        column: sqlite_column_type(nflv_data[column]) for column in nflv_data.columns
+    }
+    existing = [
+        row[1]
+        for row in connection.execute(
+            q.TABLE_COLUMNS_QUERY_STRUCTURE.format(table=table)
+        )
+    ]
+    if not existing:
+        connection.execute(
+            q.CREATE_TABLE_QUERY_DICT.get(table)
+            or q.build_create_table_query(table, column_types)
+        )
+        existing = [
+            row[1]
+            for row in connection.execute(
+                q.TABLE_COLUMNS_QUERY_STRUCTURE.format(table=table)
+            )
+        ]
+    for column, column_type in column_types.items():
+        if column not in existing:
+            connection.execute(
+                q.ADD_COLUMN_QUERY_STRUCTURE.format(
+                    table=table, column=column, column_type=column_type
+                )
+            )
+
+
+def iter_sql_rows(
+    nflv_data: pd.DataFrame, batch_rows: int = c.WRITE_BATCH_ROWS
+) -> Iterator[List[tuple]]:
+    """Helper function to convert a DataFrame into batches of SQLite parameter rows.
+
+    Values are converted column by column to Python scalars, with missing
+    values as None.
+
+    Parameters
+    ----------
+    nflv_data : pd.DataFrame
+        Typed data to write.
+    batch_rows : int
+        Rows per batch (default: c.WRITE_BATCH_ROWS).
+
+    Returns
+    -------
+    batches : Iterator[List[tuple]]
+        Lists of row tuples ready for executemany.
+    """
+    for start in range(0, len(nflv_data), batch_rows):
+        batch = nflv_data.iloc[start : start + batch_rows]
+        columns = []
+        for column in batch.columns:
+            missing = batch[column].isna().to_numpy()
+            values = batch[column].astype(object).tolist()
+            columns.append(
+                [
+                    None if is_missing else value
+                    for value, is_missing in zip(values, missing)
+                ]
+            )
+        yield list(zip(*columns))
+
+
+def write_table(
+    table: str,
+    season: Optional[int] = None,
+    data: Optional[pd.DataFrame] = None,
+    append: bool = False,
+    db_path: Optional[str] = None,
+) -> int:
+    """Function to bulk load one (table, season) into the nflverse database.
+
+    The table is created (or widened) from the typed data, and the rows are
+    written with batched executemany calls inside a single transaction.
+    Columns listed in c.ENCODED_COLUMN_DICT are written as dictionary codes.
+    The season's existing rows (or, for non-seasonal tables, all rows) are
+    deleted and the new rows inserted in the same transaction, so a load
+    replaces its season as a unit: rows dropped upstream are removed and a
+    reload never duplicates rows, including rows with null key columns.
+    Seasonal loads always carry a season column for that reason.
+
+    Parameters
+    ----------
+    table : str
+        Name of the table to write.
+    season : Optional[int]
+        Season of the data, None for non-seasonal tables.
+    data : Optional[pd.DataFrame]
+        Data to write. Nothing is written when None.
+    append : bool
+        Add rows without clearing the season first, e.g. for later chunks of
+        a streamed load (default: False).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    rows : int
+        Number of rows written.
+    """
+    if data is None:
+        return 0
+    data = apply_dtypes(data)
+    if season is not None and "season" not in data.columns:
+        data = data.assign(season=pd.Series(season, index=data.index, dtype="Int16"))
+    query = q.build_insert_query(table, list(data.columns))
+
+    start = time.perf_counter()
+    connection = connect_db(db_path)
+    try:
+        data = encode_columns(connection, table, data)
+        ensure_table_schema(connection, table, data)
+        connection.execute("BEGIN")
+        if not append:
+            if season is not None:
+                connection.execute(
+                    q.DELETE_SEASON_QUERY_STRUCTURE.format(table=table), (season,)
+                )
+            else:
+                connection.execute(q.DELETE_ALL_QUERY_STRUCTURE.format(table=table))
+        for batch in iter_sql_rows(data):
+            connection.executemany(query, batch)
+        connection.execute("COMMIT")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - start
+    logging.info(
+        c.WRITE_RATE_MESSAGE,
+        len(data),
+        table,
+        season,
+        elapsed,
+        len(data) / elapsed if elapsed else float("inf"),
     )
-    return filtered_data
+    return len(data)
+
+
+def create_key_indexes(
+    db_path: Optional[str] = None, tables: Optional[List[str]] = None
+) -> None:
+    """Function to build natural key and secondary indexes once tables are loaded.
+
+    Indexes are built after bulk loads rather than maintained during them.
+    A table whose loaded rows repeat a natural key gets a non-unique index
+    and a warning instead. Secondary indexes from c.NFLV_TABLE_INDEX_DICT are
+    built for every table that has their columns.
+
+    Parameters
+    ----------
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+    tables : Optional[List[str]]
+        Tables to index (default: every table in c.NFLV_TABLE_KEY_DICT).
+
+    Returns
+    -------
+    None.
+    """
+    connection = connect_db(db_path)
+    try:
+        for table in tables or c.NFLV_TABLE_KEY_DICT.keys():
+            key_columns = c.NFLV_TABLE_KEY_DICT[table]
+            existing = {
+                row[1]
+                for row in connection.execute(
+                    q.TABLE_COLUMNS_QUERY_STRUCTURE.format(table=table)
+                )
+            }
+            if not existing:
+                continue
+            if set(key_columns) <= existing:
+                try:
+                    connection.execute(q.build_key_index_query(table, key_columns))
+                except sqlite3.IntegrityError:
+                    logging.warning(c.DUPLICATE_KEY_MESSAGE, table, key_columns)
+                    connection.execute(
+                        q.build_key_index_query(table, key_columns, unique=False)
+                    )
+            for name, columns in c.NFLV_TABLE_INDEX_DICT.get(table, {}).items():
+                if set(columns) <= existing:
+                    connection.execute(q.build_index_query(table, name, columns))
+        connection.execute(q.ANALYZE_QUERY)
+    finally:
+        connection.close()
+
+
+def drop_key_indexes(
+    db_path: Optional[str] = None, tables: Optional[List[str]] = None
+) -> None:
+    """Function to drop natural key and secondary indexes ahead of a full bulk load.
+
+    Parameters
+    ----------
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+    tables : Optional[List[str]]
+        Tables whose indexes to drop (default: every table in
+        c.NFLV_TABLE_KEY_DICT).
+
+    Returns
+    -------
+    None.
+    """
+    connection = connect_db(db_path)
+    try:
+        for table in tables or c.NFLV_TABLE_KEY_DICT.keys():
+            indexes = [q.KEY_INDEX_NAME_STRUCTURE.format(table=table)] + [
+                q.INDEX_NAME_STRUCTURE.format(table=table, name=name)
+                for name in c.NFLV_TABLE_INDEX_DICT.get(table, {})
+            ]
+            for index in indexes:
+                connection.execute(q.DROP_INDEX_QUERY_STRUCTURE.format(index=index))
+    finally:
+        connection.close()
+
+
+def check_query_plans(
+    db_path: Optional[str] = None, queries: Optional[Dict[str, str]] = None
+) -> Dict[str, List[str]]:
+    """Function to check that projection lookups stay index-driven.
 
+    Every query is run through EXPLAIN QUERY PLAN and any step that scans a
+    table without an index is reported. Queries against tables or columns
+    that have not been loaded are skipped.
 
-def write_table(table: str, season: Optional[int] = None) -> None:
-    return table, season
+    Parameters
+    ----------
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+    queries : Optional[Dict[str, str]]
+        Queries to check by name (default: q.PROJECTION_QUERY_DICT).
+
+    Returns
+    -------
+    scans : Dict[str, List[str]]
+        Full table scan steps of each offending query, by query name. Empty
+        when every query resolves through an index.
+    """
+    scans = {}
+    connection = connect_db(db_path)
+    try:
+        for name, query in (queries or q.PROJECTION_QUERY_DICT).items():
+            try:
+                plan = connection.execute(
+                    q.EXPLAIN_QUERY_PLAN_STRUCTURE.format(query=query.strip()),
+                    [None] * query.count("?"),
+                ).fetchall()
+            except sqlite3.OperationalError:
+                continue
+            details = [
+                row[-1]
+                for row in plan
+                if row[-1].startswith("SCAN ") and "INDEX" not in row[-1]
+            ]
+            if details:
+                logging.warning(c.QUERY_PLAN_SCAN_MESSAGE, name, "; ".join(details))
+                scans[name] = details
+    finally:
+        connection.close()
+    return scans
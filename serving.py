@@ -0,0 +1,243 @@
+"""
+serving.py
+This file contains the read-only serving layer for the projection API,
+exporting finished tables to uncompressed Arrow IPC (Feather v2) files that
+worker processes memory-map and slice by player without copying, so every
+worker shares one page-cached copy of the data
+"""
+
+import logging
+import os
+
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from encoding import decode_columns
+from script import apply_dtypes, connect_db
+import constants as c
+import queries as q
+
+
+def serving_path(
+    table: str,
+    serve_dir: Optional[str] = None,
+    structure: str = c.SERVING_FILE_STRUCTURE,
+) -> str:
+    """Helper function to locate a serving file of a table.
+
+    Parameters
+    ----------
+    table : str
+        Name of the table.
+    serve_dir : Optional[str]
+        Directory holding the serving files (default: c.SERVING_DIR).
+    structure : str
+        File name structure (default: c.SERVING_FILE_STRUCTURE).
+
+    Returns
+    -------
+    path : str
+        Path of the serving file.
+    """
+    return os.path.join(
+        os.path.expanduser(serve_dir or c.SERVING_DIR), structure.format(table=table)
+    )
+
+
+def player_row_ranges(player_ids: np.ndarray) -> pd.DataFrame:
+    """Helper function to find the row range of every player in a sorted column.
+
+    Parameters
+    ----------
+    player_ids : np.ndarray
+        c.SERVING_KEY_COLUMN values, sorted so each player's rows are adjacent.
+
+    Returns
+    -------
+    ranges : pd.DataFrame
+        One row per player with the player_id, start and stop row numbers.
+    """
+    changes = np.ones(len(player_ids), dtype=bool)
+    changes[1:] = player_ids[1:] != player_ids[:-1]
+    starts = np.flatnonzero(changes)
+    stops = np.append(starts[1:], len(player_ids))
+    return pd.DataFrame(
+        {
+            c.SERVING_KEY_COLUMN: player_ids[starts],
+            "start": starts.astype(np.int64),
+            "stop": stops.astype(np.int64),
+        }
+    )
+
+
+def write_arrow(arrow_table: pa.Table, path: str) -> None:
+    """Helper function to write an uncompressed Arrow IPC file atomically.
+
+    Workers holding the previous file keep reading it through their mapping
+    until they reopen it.
+    """
+    temp_path = path + c.SERVING_TEMP_SUFFIX
+    feather.write_feather(arrow_table, temp_path, compression="uncompressed")
+    os.replace(temp_path, path)
+
+
+def export_serving_tables(
+    tables: Optional[List[str]] = None,
+    serve_dir: Optional[str] = None,
+    db_path: Optional[str] = None,
+) -> Dict[str, int]:
+    """Function to export finished tables to memory-mappable serving files.
+
+    Every table is read in natural key order, so each player's rows are one
+    contiguous range, and written to an uncompressed Arrow IPC file next to
+    a small index file holding the row range of every player.
+
+    Parameters
+    ----------
+    tables : Optional[List[str]]
+        Tables to export (default: c.SERVING_TABLES).
+    serve_dir : Optional[str]
+        Directory the serving files are written to (default: c.SERVING_DIR).
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    rows : Dict[str, int]
+        Number of rows exported per table.
+    """
+    os.makedirs(os.path.expanduser(serve_dir or c.SERVING_DIR), exist_ok=True)
+    rows = {}
+    connection = connect_db(db_path)
+    try:
+        for table in tables or c.SERVING_TABLES:
+            table_data = apply_dtypes(
+                decode_columns(
+                    connection,
+                    table,
+                    pd.read_sql_query(q.build_serving_query(table), connection),
+                )
+            )
+            object_columns = [
+                column
+                for column in table_data.columns
+                if table_data[column].dtype == object
+            ]
+            table_data = table_data.astype(
+                {column: c.STRING_DTYPE for column in object_columns}
+            )
+            ranges = player_row_ranges(
+                table_data[c.SERVING_KEY_COLUMN].to_numpy(dtype=object, na_value=None)
+            )
+            write_arrow(
+                pa.Table.from_pandas(table_data, preserve_index=False),
+                serving_path(table, serve_dir),
+            )
+            write_arrow(
+                pa.Table.from_pandas(ranges, preserve_index=False),
+                serving_path(table, serve_dir, c.SERVING_INDEX_STRUCTURE),
+            )
+            rows[table] = len(table_data)
+            logging.info(
+                c.SERVING_EXPORT_MESSAGE,
+                len(table_data),
+                table,
+                len(ranges),
+                serving_path(table, serve_dir),
+            )
+    finally:
+        connection.close()
+    return rows
+
+
+class ServingTable:
+    """Memory-mapped, read-only serving copy of one table.
+
+    Column buffers point straight into the mapped file, so opening a table
+    costs no reads and the pages are shared with every other process
+    mapping the same file. Only the player index is held in memory.
+
+    Parameters
+    ----------
+    table : str
+        Name of the table.
+    serve_dir : Optional[str]
+        Directory holding the serving files (default: c.SERVING_DIR).
+    """
+
+    def __init__(self, table: str, serve_dir: Optional[str] = None) -> None:
+        path = serving_path(table, serve_dir)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                c.MISSING_SERVING_TABLE_MESSAGE.format(
+                    table=table, serve_dir=os.path.dirname(path)
+                )
+            )
+        self.table = table
+        self.data = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        ranges = feather.read_table(
+            serving_path(table, serve_dir, c.SERVING_INDEX_STRUCTURE)
+        ).to_pydict()
+        self.index: Dict[str, Tuple[int, int]] = dict(
+            zip(ranges[c.SERVING_KEY_COLUMN], zip(ranges["start"], ranges["stop"]))
+        )
+
+    def __len__(self) -> int:
+        return self.data.num_rows
+
+    def rows(self, player_id: str, columns: Optional[List[str]] = None) -> pa.Table:
+        """Return the rows of one player without copying.
+
+        Parameters
+        ----------
+        player_id : str
+            Player to look up.
+        columns : Optional[List[str]]
+            Columns to return (default: all columns).
+
+        Returns
+        -------
+        rows : pa.Table
+            Zero-copy slice of the mapped table, empty for unknown players.
+        """
+        start, stop = self.index.get(player_id, (0, 0))
+        data = self.data if columns is None else self.data.select(columns)
+        return data.slice(start, stop - start)
+
+    def frame(
+        self, player_id: str, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Return the rows of one player as a DataFrame."""
+        return self.rows(player_id, columns).to_pandas()
+
+
+class ServingStore:
+    """Serving tables of a directory, each opened on first use.
+
+    Parameters
+    ----------
+    serve_dir : Optional[str]
+        Directory holding the serving files (default: c.SERVING_DIR).
+    """
+
+    def __init__(self, serve_dir: Optional[str] = None) -> None:
+        self.serve_dir = serve_dir
+        self._tables: Dict[str, ServingTable] = {}
+
+    def table(self, table: str) -> ServingTable:
+        """Return the serving table, mapping its file on first use."""
+        if table not in self._tables:
+            self._tables[table] = ServingTable(table, self.serve_dir)
+        return self._tables[table]
+
+    def player(
+        self, table: str, player_id: str, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Return the rows of one player in a serving table as a DataFrame."""
+        return self.table(table).frame(player_id, columns)
+
+    def reload(self) -> None:
+        """Drop the open mappings so the next lookups map re-exported files."""
+        self._tables.clear()
@@ -0,0 +1,428 @@
+"""
+simulate.py
+This file contains the Monte Carlo season simulator, drawing correlated
+per-game fantasy outcomes for every player on a process pool and reducing
+them into projection distributions without keeping the samples
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+import numpy as np
+import pandas as pd
+from script import connect_db
+import constants as c
+import queries as q
+
+
+@dataclass(frozen=True)
+class SimulationInputs:
+    """Per-player and schedule arrays shared by every simulation shard.
+
+    Attributes
+    ----------
+    means : np.ndarray
+        Expected fantasy points per game of every player.
+    sigmas : np.ndarray
+        Log-scale standard deviation of fantasy points per game of every
+        player.
+    teams : np.ndarray
+        Team index of every player.
+    games : np.ndarray
+        (weeks, teams) matrix of the game index each team plays in every
+        week, -1 on byes.
+    histogram_width : np.ndarray
+        Width of the season total histogram bins of every player.
+    """
+
+    means: np.ndarray
+    sigmas: np.ndarray
+    teams: np.ndarray
+    games: np.ndarray
+    histogram_width: np.ndarray
+
+
+@dataclass
+class SimulationTotals:
+    """Running reduction of simulated seasons, added up shard by shard."""
+
+    seasons: int
+    total: np.ndarray
+    total_squared: np.ndarray
+    histogram: np.ndarray
+    played: np.ndarray
+    booms: np.ndarray
+    busts: np.ndarray
+
+    @classmethod
+    def empty(cls, players: int) -> "SimulationTotals":
+        return cls(
+            seasons=0,
+            total=np.zeros(players),
+            total_squared=np.zeros(players),
+            histogram=np.zeros((players, c.SIMULATION_HISTOGRAM_BINS), dtype=np.int64),
+            played=np.zeros(players, dtype=np.int64),
+            booms=np.zeros(players, dtype=np.int64),
+            busts=np.zeros(players, dtype=np.int64),
+        )
+
+    def add(self, other: "SimulationTotals") -> None:
+        self.seasons += other.seasons
+        self.total += other.total
+        self.total_squared += other.total_squared
+        self.histogram += other.histogram
+        self.played += other.played
+        self.booms += other.booms
+        self.busts += other.busts
+
+
+def load_schedule(season: int, db_path: Optional[str] = None) -> pd.DataFrame:
+    """Function to read the regular season schedule of a season from the game table.
+
+    Parameters
+    ----------
+    season : int
+        Season of the schedule.
+    db_path : Optional[str]
+        Location of the SQLite database (default: c.DB_PATH).
+
+    Returns
+    -------
+    schedule : pd.DataFrame
+        One row per game with week, home_team and away_team columns.
+    """
+    connection = connect_db(db_path)
+    try:
+        return pd.read_sql_query(
+            q.SCHEDULE_QUERY, connection, params=(season, c.FEATURE_SEASON_TYPE)
+        )
+    finally:
+        connection.close()
+
+
+def weekly_spread(player_ids: pd.Series, player_stats: pd.DataFrame) -> np.ndarray:
+    """Helper function to estimate the coefficient of variation of weekly points.
+
+    Players with fewer than c.SIMULATION_MIN_GAMES history games, or none at
+    all, get the league coefficient of variation.
+
+    Parameters
+    ----------
+    player_ids : pd.Series
+        Players to estimate.
+    player_stats : pd.DataFrame
+        Player-week history with player_id and fantasy_points_ppr columns.
+
+    Returns
+    -------
+    spread : np.ndarray
+        Coefficient of variation of every player's weekly points.
+    """
+    points = pd.to_numeric(player_stats["fantasy_points_ppr"]).fillna(0).to_numpy()
+    codes = pd.Index(player_ids).get_indexer(player_stats["player_id"])
+    known = codes >= 0
+    players = len(player_ids)
+    games = np.bincount(codes[known], minlength=players)
+    total = np.bincount(codes[known], weights=points[known], minlength=players)
+    squares = np.bincount(codes[known], weights=points[known] ** 2, minlength=players)
+    means = total / np.maximum(games, 1)
+    stds = np.sqrt(np.maximum(squares / np.maximum(games, 1) - means**2, 0))
+    league_spread = points.std() / max(points.mean(), 1e-9)
+    return np.where(
+        (games >= c.SIMULATION_MIN_GAMES) & (means > 0),
+        stds / np.maximum(means, 1e-9),
+        league_spread,
+    )
+
+
+def build_simulation_inputs(
+    projections: pd.DataFrame,
+    player_stats: pd.DataFrame,
+    schedule: Optional[pd.DataFrame] = None,
+) -> SimulationInputs:
+    """Function to turn season projections into simulation inputs.
+
+    Parameters
+    ----------
+    projections : pd.DataFrame
+        Season projections, e.g. from projections.project_players.
+    player_stats : pd.DataFrame
+        Player-week history used to estimate weekly spread.
+    schedule : Optional[pd.DataFrame]
+        Schedule of the simulated season, e.g. from load_schedule
+        (default: c.PROJECTION_GAMES weeks in which every team plays alone).
+
+    Returns
+    -------
+    inputs : SimulationInputs
+        Arrays for simulate_season_totals.
+    """
+    teams, team_names = pd.factorize(
+        projections["recent_team"].astype(object), use_na_sentinel=False
+    )
+    team_index = {team: index for index, team in enumerate(team_names)}
+    if schedule is None or schedule.empty:
+        games = np.tile(np.arange(len(team_names)), (c.PROJECTION_GAMES, 1))
+    else:
+        weeks, week_numbers = pd.factorize(schedule["week"], sort=True)
+        games = np.full((len(week_numbers), len(team_names)), -1)
+        game_numbers = np.arange(len(schedule))
+        for side in ("home_team", "away_team"):
+            sides = schedule[side].map(team_index).to_numpy(dtype=float)
+            known = ~np.isnan(sides)
+            games[weeks[known], sides[known].astype(int)] = game_numbers[known]
+    played = (games[:, teams] >= 0).sum(axis=0)
+    projected_games = projections["games"].to_numpy(dtype=float)
+    means = projections["fantasy_points_ppr"].to_numpy(dtype=float) / projected_games
+    spread = weekly_spread(projections["player_id"], player_stats)
+    season_span = c.SIMULATION_HISTOGRAM_SPAN * np.maximum(
+        means * (played + 3 * spread * np.sqrt(played)), 1.0
+    )
+    return SimulationInputs(
+        means=means,
+        sigmas=np.sqrt(np.log1p(spread**2)),
+        teams=teams,
+        games=games,
+        histogram_width=season_span / c.SIMULATION_HISTOGRAM_BINS,
+    )
+
+
+def sample_weeks(
+    inputs: SimulationInputs, seasons: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Helper function to draw correlated weekly points for a batch of seasons.
+
+    Each player's weekly deviation mixes a game factor, a team factor and an
+    individual factor, so teammates and opponents move together. Points are
+    lognormal around the player's expected points per game, which keeps them
+    non-negative without shifting their mean.
+
+    Parameters
+    ----------
+    inputs : SimulationInputs
+        Simulation inputs.
+    seasons : int
+        Number of seasons to draw.
+    rng : np.random.Generator
+        Random generator of the shard.
+
+    Returns
+    -------
+    points : np.ndarray
+        (seasons, weeks, players) array of fantasy points, NaN on byes.
+    """
+    weeks, team_count = inputs.games.shape
+    players = len(inputs.means)
+    game_count = max(int(inputs.games.max()) + 1, 1)
+    player_games = inputs.games[:, inputs.teams]
+    game_factor = rng.standard_normal((seasons, weeks, game_count), np.float32)
+    team_factor = rng.standard_normal((seasons, weeks, team_count), np.float32)
+    deviation = rng.standard_normal((seasons, weeks, players), np.float32)
+    deviation *= np.sqrt(
+        1 - c.SIMULATION_GAME_CORRELATION - c.SIMULATION_TEAM_CORRELATION
+    )
+    deviation += np.sqrt(c.SIMULATION_GAME_CORRELATION) * np.take_along_axis(
+        game_factor, np.maximum(player_games, 0)[None, :, :], axis=2
+    )
+    deviation += (
+        np.sqrt(c.SIMULATION_TEAM_CORRELATION) * team_factor[:, :, inputs.teams]
+    )
+    sigmas = inputs.sigmas.astype(np.float32)
+    deviation *= sigmas
+    deviation -= sigmas**2 / 2
+    points = inputs.means.astype(np.float32) * np.exp(deviation)
+    return np.where(player_games[None, :, :] >= 0, points, np.nan)
+
+
+def simulate_shard(
+    inputs: SimulationInputs, seasons: int, seed: np.random.SeedSequence
+) -> SimulationTotals:
+    """Function to simulate one shard of seasons and reduce it to totals.
+
+    Seasons are drawn in batches of c.SIMULATION_BATCH_SEASONS so only one
+    batch of samples is held in memory at a time.
+
+    Parameters
+    ----------
+    inputs : SimulationInputs
+        Simulation inputs.
+    seasons : int
+        Number of seasons in the shard.
+    seed : np.random.SeedSequence
+        Seed of the shard.
+
+    Returns
+    -------
+    totals : SimulationTotals
+        Reduction of the shard's seasons.
+    """
+    rng = np.random.default_rng(seed)
+    players = len(inputs.means)
+    totals = SimulationTotals.empty(players)
+    player_offsets = np.arange(players) * c.SIMULATION_HISTOGRAM_BINS
+    for start in range(0, seasons, c.SIMULATION_BATCH_SEASONS):
+        batch = min(c.SIMULATION_BATCH_SEASONS, seasons - start)
+        points = sample_weeks(inputs, batch, rng)
+        played = ~np.isnan(points)
+        season_points = np.nansum(points, axis=1)
+        bins = np.clip(
+            (season_points / inputs.histogram_width).astype(int),
+            0,
+            c.SIMULATION_HISTOGRAM_BINS - 1,
+        )
+        totals.add(
+            SimulationTotals(
+                seasons=batch,
+                total=season_points.sum(axis=0),
+                total_squared=(season_points**2).sum(axis=0),
+                histogram=np.bincount(
+                    (bins + player_offsets).ravel(),
+                    minlength=players * c.SIMULATION_HISTOGRAM_BINS,
+                ).reshape(players, c.SIMULATION_HISTOGRAM_BINS),
+                played=played.sum(axis=(0, 1)),
+                booms=(points >= c.BOOM_MULTIPLIER * inputs.means).sum(axis=(0, 1)),
+                busts=(points <= c.BUST_MULTIPLIER * inputs.means).sum(axis=(0, 1)),
+            )
+        )
+    return totals
+
+
+def histogram_percentiles(
+    histogram: np.ndarray, width: np.ndarray, percentiles: np.ndarray
+) -> np.ndarray:
+    """Helper function to read percentiles off per-player histograms.
+
+    Parameters
+    ----------
+    histogram : np.ndarray
+        (players, bins) counts of simulated season totals.
+    width : np.ndarray
+        Bin width of every player.
+    percentiles : np.ndarray
+        Percentiles to read, in [0, 100].
+
+    Returns
+    -------
+    values : np.ndarray
+        (players, percentiles) matrix, interpolated linearly within bins.
+    """
+    cumulative = histogram.cumsum(axis=1)
+    targets = cumulative[:, -1:] * percentiles[None, :] / 100
+    bins = (cumulative[:, None, :] < targets[:, :, None]).sum(axis=2)
+    bins = np.minimum(bins, histogram.shape[1] - 1)
+    before = np.take_along_axis(cumulative, bins, axis=1) - np.take_along_axis(
+        histogram, bins, axis=1
+    )
+    inside = np.take_along_axis(histogram, bins, axis=1)
+    fraction = np.where(inside > 0, (targets - before) / np.maximum(inside, 1), 0)
+    return (bins + fraction) * width[:, None]
+
+
+def iter_shards(
+    inputs: SimulationInputs, seasons: int, seed: int, workers: int
+) -> Iterator[SimulationTotals]:
+    """Helper function to run simulation shards, in-process or on a pool."""
+    shard_sizes = [
+        min(c.SIMULATION_SHARD_SEASONS, seasons - start)
+        for start in range(0, seasons, c.SIMULATION_SHARD_SEASONS)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(shard_sizes))
+    if workers <= 1:
+        for size, shard_seed in zip(shard_sizes, seeds):
+            yield simulate_shard(inputs, size, shard_seed)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            simulate_shard, [inputs] * len(shard_sizes), shard_sizes, seeds
+        )
+
+
+def simulate_season_totals(
+    inputs: SimulationInputs,
+    seasons: int = c.SIMULATION_SEASONS,
+    seed: int = c.SIMULATION_SEED,
+    workers: int = 1,
+) -> SimulationTotals:
+    """Function to simulate seasons across shards and reduce them as they finish.
+
+    Parameters
+    ----------
+    inputs : SimulationInputs
+        Simulation inputs, e.g. from build_simulation_inputs.
+    seasons : int
+        Number of seasons to simulate (default: c.SIMULATION_SEASONS).
+    seed : int
+        Root seed; shard seeds are spawned from it (default: c.SIMULATION_SEED).
+    workers : int
+        Worker processes; 1 runs every shard in-process (default: 1).
+
+    Returns
+    -------
+    totals : SimulationTotals
+        Reduction of every simulated season.
+    """
+    totals = SimulationTotals.empty(len(inputs.means))
+    for shard_totals in iter_shards(inputs, seasons, seed, workers):
+        totals.add(shard_totals)
+    return totals
+
+
+def simulate_players(
+    projections: pd.DataFrame,
+    player_stats: pd.DataFrame,
+    schedule: Optional[pd.DataFrame] = None,
+    seasons: int = c.SIMULATION_SEASONS,
+    seed: int = c.SIMULATION_SEED,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """Function to simulate season distributions of projected players.
+
+    Parameters
+    ----------
+    projections : pd.DataFrame
+        Season projections, e.g. from projections.project_players.
+    player_stats : pd.DataFrame
+        Player-week history used to estimate weekly spread.
+    schedule : Optional[pd.DataFrame]
+        Schedule of the simulated season, e.g. from load_schedule.
+    seasons : int
+        Number of seasons to simulate (default: c.SIMULATION_SEASONS).
+    seed : int
+        Root seed (default: c.SIMULATION_SEED).
+    workers : int
+        Worker processes (default: 1).
+
+    Returns
+    -------
+    distributions : pd.DataFrame
+        One row per player with c.SIMULATION_TBL_COLUMNS columns: mean and
+        standard deviation of season points, season point percentiles, and
+        the share of played weeks that boom (c.BOOM_MULTIPLIER times the
+        expected points or more) or bust (c.BUST_MULTIPLIER times or less).
+    """
+    inputs = build_simulation_inputs(projections, player_stats, schedule=schedule)
+    totals = simulate_season_totals(inputs, seasons=seasons, seed=seed, workers=workers)
+    mean = totals.total / totals.seasons
+    std = np.sqrt(np.maximum(totals.total_squared / totals.seasons - mean**2, 0))
+    percentiles = histogram_percentiles(
+        totals.histogram,
+        inputs.histogram_width,
+        np.array(c.SIMULATION_PERCENTILES, dtype=float),
+    )
+    played = np.maximum(totals.played, 1)
+    columns: Dict[str, np.ndarray] = {
+        f"p{percentile}": percentiles[:, position]
+        for position, percentile in enumerate(c.SIMULATION_PERCENTILES)
+    }
+    return pd.DataFrame(
+        {
+            "player_id": projections["player_id"].to_numpy(dtype=object),
+            "player_name": projections["player_name"].to_numpy(dtype=object),
+            "recent_team": projections["recent_team"].to_numpy(dtype=object),
+            "mean": mean,
+            "std": std,
+            **columns,
+            "boom_rate": totals.booms / played,
+            "bust_rate": totals.busts / played,
+        }
+    )
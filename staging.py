@@ -0,0 +1,146 @@
+"""
+staging.py
+This file contains the Parquet staging layer that keeps every parsed
+nflverse season on disk, partitioned by table and season, so derived
+tables can be rebuilt with column projection instead of re-parsing csvs
+"""
+
+import os
+
+from typing import List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import constants as c
+
+
+def staged_path(
+    table: str, season: Optional[int] = None, staging_dir: Optional[str] = None
+) -> str:
+    """Helper function to locate the staged Parquet file of a table/season.
+
+    Parameters
+    ----------
+    table : str
+        Name of the nflverse source table (e.g. 'pbp').
+    season : Optional[int]
+        Season of the data, None for non-seasonal tables.
+    staging_dir : Optional[str]
+        Root of the staging area (default: c.STAGING_DIR).
+
+    Returns
+    -------
+    path : str
+        Path of the Parquet file for the partition.
+    """
+    return os.path.join(
+        os.path.expanduser(staging_dir or c.STAGING_DIR),
+        c.STAGING_PARTITION_STRUCTURE.format(
+            table=table,
+            season=c.STAGING_ALL_SEASONS if season is None else season,
+        ),
+    )
+
+
+def stage_table(
+    data: pd.DataFrame,
+    table: str,
+    season: Optional[int] = None,
+    staging_dir: Optional[str] = None,
+) -> str:
+    """Helper function to write a parsed season to the staging area.
+
+    Object columns are written as strings so that columns mixing numbers and
+    text across seasons always stage to the same Arrow type.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Parsed nflverse data.
+    table : str
+        Name of the nflverse source table.
+    season : Optional[int]
+        Season of the data, None for non-seasonal tables.
+    staging_dir : Optional[str]
+        Root of the staging area (default: c.STAGING_DIR).
+
+    Returns
+    -------
+    path : str
+        Path of the written Parquet file.
+    """
+    path = staged_path(table=table, season=season, staging_dir=staging_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    object_columns = [column for column in data.columns if data[column].dtype == object]
+    staged = data.astype({column: "string" for column in object_columns})
+    arrow_table = pa.Table.from_pandas(staged, preserve_index=False)
+    temp_path = path + c.STAGING_TEMP_SUFFIX
+    pq.write_table(arrow_table, temp_path, compression=c.STAGING_COMPRESSION)
+    os.replace(temp_path, path)
+    return path
+
+
+def is_staged(
+    table: str, season: Optional[int] = None, staging_dir: Optional[str] = None
+) -> bool:
+    """Whether a table/season partition exists in the staging area."""
+    return os.path.exists(
+        staged_path(table=table, season=season, staging_dir=staging_dir)
+    )
+
+
+def read_staged_schema(
+    table: str, season: Optional[int] = None, staging_dir: Optional[str] = None
+) -> pd.DataFrame:
+    """Helper function to read only the schema of a staged partition.
+
+    Parameters
+    ----------
+    table : str
+        Name of the nflverse source table.
+    season : Optional[int]
+        Season of the data, None for non-seasonal tables.
+    staging_dir : Optional[str]
+        Root of the staging area (default: c.STAGING_DIR).
+
+    Returns
+    -------
+    empty_data : pd.DataFrame
+        Zero-row DataFrame carrying the staged columns and dtypes.
+    """
+    schema = pq.read_schema(
+        staged_path(table=table, season=season, staging_dir=staging_dir)
+    )
+    return schema.empty_table().to_pandas()
+
+
+def read_staged_table(
+    table: str,
+    season: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+    staging_dir: Optional[str] = None,
+) -> pd.DataFrame:
+    """Helper function to read a staged partition with column projection.
+
+    Parameters
+    ----------
+    table : str
+        Name of the nflverse source table.
+    season : Optional[int]
+        Season of the data, None for non-seasonal tables.
+    columns : Optional[List[str]]
+        Columns to read. Columns missing from the partition are ignored, the
+        same way DataFrame.filter ignores them (default: all columns).
+    staging_dir : Optional[str]
+        Root of the staging area (default: c.STAGING_DIR).
+
+    Returns
+    -------
+    data : pd.DataFrame
+        Staged nflverse data.
+    """
+    path = staged_path(table=table, season=season, staging_dir=staging_dir)
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [column for column in columns if column in available]
+    return pd.read_parquet(path, columns=columns)
@@ -0,0 +1,1231 @@
+"""
+test_script.py
+Tests for the nflverse ingestion helpers
+"""
+
+import datetime
+import gzip
+import hashlib
+import http.server
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+import encoding
+import features
+import identity
+import instrument
+import pipeline
+import projections
+import scoring
+import serving
+import simulate
+import script
+import constants as c
+import queries as q
+from cache import CacheMissError, DownloadCache
+from fetch import AsyncFetcher
+from incremental import LoadManifest
+from planner import build_job_manifest
+from instrument import BuildMetrics
+from staging import read_staged_table, stage_table
+from scheduler import IngestJob, IngestScheduler
+
+
+def _write_release_file(base_dir, addendum, frame, compression=None, mtime=0):
+    """Write a frame into a local directory laid out like the release server."""
+    extension = ".csv.gz" if compression else ".csv"
+    path = base_dir / f"{addendum}{extension}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame.to_csv(
+        path,
+        index=False,
+        compression={"method": compression, "mtime": mtime} if compression else None,
+    )
+    return path
+
+
+class _ReleaseHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that answers conditional requests via ETag."""
+
+    requests = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        path = self.translate_path(self.path)
+        try:
+            with open(path, "rb") as release_file:
+                body = release_file.read()
+        except OSError:
+            self.send_error(404)
+            return
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        self.requests.append(self.path)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(name="release_server")
+def fixture_release_server(tmp_path):
+    """Serve tmp_path over HTTP as a stand-in for the nflverse release server."""
+    handler = type("Handler", (_ReleaseHandler,), {"requests": []})
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        lambda *args: handler(*args, directory=str(tmp_path)),
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = "http://127.0.0.1:%i/" % server.server_address[1]
+    server.handler = handler
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _read(files):
+    """Read and close a downloaded file, or every file of a list."""
+    if isinstance(files, list):
+        return [_read(file) for file in files]
+    with files:
+        return files.read()
+
+
+def test_build_db_reads_local_release_dir(tmp_path):
+    combine = pd.DataFrame({"season": [2020, 2021], "player_name": ["a", "b"]})
+    pbp = pd.DataFrame({"play_id": [1, 2, 3], "game_id": ["g1", "g1", "g2"]})
+    _write_release_file(tmp_path, "combine/combine", combine)
+    _write_release_file(tmp_path, "pbp/play_by_play_2020", pbp, compression="gzip")
+
+    timings = script.build_db(
+        base_url=f"{tmp_path}/",
+        tables=["combine", "pbp"],
+        db_path=str(tmp_path / "nflverse.db"),
+    )
+    by_job = {(timing.table, timing.season): timing for timing in timings}
+
+    assert by_job[("combine", None)].ok
+    assert by_job[("combine", None)].rows == 2
+    assert by_job[("pbp", 2020)].ok
+    assert by_job[("pbp", 2020)].rows == 3
+    assert not by_job[("pbp", 2019)].ok
+
+
+def test_job_manifest_expands_stat_types(tmp_path):
+    manifest = build_job_manifest(f"{tmp_path}/")
+    pfr = script.plan_ingest_jobs(base_url=f"{tmp_path}/", tables=["pfr_advstats"])
+    ngs = script.plan_ingest_jobs(base_url=f"{tmp_path}/", tables=["ngs_passing"])
+    by_key = {(job.table, job.season): job for job in manifest}
+
+    assert build_job_manifest(f"{tmp_path}/") is manifest
+    assert {job.table for job in pfr} == set(
+        c.NFLV_STAT_TYPE_DICT["pfr_advstats"].values()
+    )
+    assert {job.stat_type for job in ngs} == {"passing"}
+    assert by_key[("ngs_passing", 2020)].url.endswith(
+        "nextgen_stats/ngs_2020_passing.csv.gz"
+    )
+    assert by_key[("pfr_rushing", 2020)].url.endswith(
+        "pfr_advstats/advstats_week_rush_2020.csv"
+    )
+    with pytest.raises(ValueError):
+        script.construct_table_url(table="pfr_advstats", year=2020)
+
+    rush = pd.DataFrame(
+        {"game_id": ["g1", "g2"], "pfr_player_id": ["p1", "p1"], "carries": [3, 5]}
+    )
+    passing = pd.DataFrame(
+        {"game_id": ["g1"], "pfr_player_id": ["p2"], "pass_attempts": [30]}
+    )
+    _write_release_file(tmp_path, "pfr_advstats/advstats_week_rush_2020", rush)
+    _write_release_file(tmp_path, "pfr_advstats/advstats_week_pass_2020", passing)
+    db_path = str(tmp_path / "nflverse.db")
+    timings = script.build_db(
+        base_url=f"{tmp_path}/", tables=["pfr_advstats"], db_path=db_path
+    )
+    connection = sqlite3.connect(db_path)
+    try:
+        rushing = connection.execute("SELECT SUM(carries) FROM rushing").fetchone()
+        passers = connection.execute("SELECT pfr_player_id FROM pfr_passing").fetchall()
+    finally:
+        connection.close()
+
+    assert {(t.table, t.season) for t in timings if t.ok} == {
+        ("pfr_rushing", 2020),
+        ("pfr_passing", 2020),
+    }
+    assert rushing == (8,)
+    assert passers == [("p2",)]
+
+
+def test_cli_plans_without_importing_pandas(tmp_path):
+    probe = (
+        "import sys; from click.testing import CliRunner; import cli; "
+        "result = CliRunner().invoke(cli.cli, sys.argv[1:]); "
+        "print(result.output); print(sorted({'numpy', 'pandas'} & set(sys.modules)))"
+    )
+    args = ["--profile-startup", "plan", "--table", "pfr_advstats"]
+    args += ["--base-url", f"{tmp_path}/"]
+    output = subprocess.run(
+        [sys.executable, "-c", probe, *args],
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+
+    assert (
+        f"pfr_passing\t2020\t{tmp_path}/pfr_advstats/advstats_week_pass_2020.csv"
+        in output
+    )
+    assert "Imported planner lazily" in output
+    assert output.rstrip().endswith("[]")
+
+
+@pytest.mark.parametrize("chunksize", [None, 2])
+def test_build_metrics_cover_every_stage(tmp_path, chunksize):
+    pbp = _feature_pbp_frame()
+    _write_release_file(tmp_path, "pbp/play_by_play_2020", pbp, compression="gzip")
+    events_path = tmp_path / "events.jsonl"
+    prometheus_path = tmp_path / "metrics.prom"
+
+    with BuildMetrics(str(events_path), str(prometheus_path)) as metrics:
+        script.build_db(
+            base_url=f"{tmp_path}/",
+            tables=["pbp"],
+            chunksize=chunksize,
+            metrics=metrics,
+            db_path=str(tmp_path / "nflverse.db"),
+        )
+    totals = metrics.totals()
+    events = [json.loads(line) for line in events_path.read_text().splitlines()]
+    prometheus = prometheus_path.read_text()
+
+    assert {stage for table, season, stage in totals if season == 2020} == set(
+        c.METRICS_STAGES
+    )
+    assert (
+        totals[("pbp", 2020, "decompress")].bytes
+        > totals[("pbp", 2020, "fetch")].bytes
+        > 0
+    )
+    assert totals[("pbp", 2020, "parse")].rows == len(pbp)
+    assert totals[("pbp_player", 2020, "write")].rows == 10
+    assert all(total.peak_rss_bytes > 0 for total in totals.values())
+    assert len(events) == len(metrics.records)
+    assert (
+        'ff_projections_stage_rows_total{table="pbp",season="2020",stage="parse"} 6'
+        in prometheus
+    )
+    assert "# TYPE ff_projections_stage_peak_rss_bytes gauge" in prometheus
+
+
+def test_build_metrics_keep_decompress_of_failed_writes(tmp_path, monkeypatch):
+    _write_release_file(
+        tmp_path, "pbp/play_by_play_2020", _feature_pbp_frame(), compression="gzip"
+    )
+
+    def fail(chunks, **_):
+        next(iter(chunks))
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(script, "stream_derived_tables", fail)
+    with BuildMetrics() as metrics:
+        timings = script.build_db(
+            base_url=f"{tmp_path}/",
+            tables=["pbp"],
+            seasons=[2020],
+            chunksize=2,
+            metrics=metrics,
+            db_path=str(tmp_path / "nflverse.db"),
+        )
+
+    assert [timing.error for timing in timings] == [
+        "OperationalError: database is locked"
+    ]
+    assert metrics.totals()[("pbp", 2020, "decompress")].bytes > 0
+
+
+def test_metered_reader_samples_rss_every_few_megabytes(monkeypatch):
+    samples = []
+    monkeypatch.setattr(
+        instrument, "current_rss", lambda: samples.append(None) or 1 << 20
+    )
+    raw = gzip.compress(b"0123456789abcdef" * (1 << 21), mtime=0)
+    reader = instrument.MeteredReader(raw, compression="gzip")
+    while reader.read(1 << 12):
+        pass
+
+    assert reader.bytes == 1 << 25
+    assert reader.peak_rss_bytes == 1 << 20
+    assert 1 < len(samples) <= 3
+
+
+def test_scheduler_respects_stage_limits():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def write(*_):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+
+    scheduler = IngestScheduler(
+        download=lambda job: job.season,
+        parse=lambda raw, job: [raw],
+        write=write,
+        max_workers=8,
+        write_limit=2,
+    )
+    jobs = [IngestJob("pbp", season, "", None) for season in range(16)]
+    timings = scheduler.run(jobs)
+
+    assert [timing.season for timing in timings] == list(range(16))
+    assert all(timing.ok for timing in timings)
+    assert peak[0] <= 2
+
+
+def test_download_cache_serves_repeat_and_offline_reads(tmp_path, release_server):
+    frame = pd.DataFrame({"play_id": [1, 2], "game_id": ["g1", "g2"]})
+    _write_release_file(tmp_path, "pbp/play_by_play_2020", frame, compression="gzip")
+    url = release_server.base_url + "pbp/play_by_play_2020.csv.gz"
+    cache = DownloadCache(cache_dir=str(tmp_path / "cache"))
+    index_path = tmp_path / "cache" / c.CACHE_INDEX_FILE
+
+    first = _read(cache.fetch(url))
+    stored = index_path.read_text()
+    second = _read(cache.fetch(url))
+    assert index_path.read_text() == stored
+    cache.close()
+    assert index_path.read_text() != stored
+    offline = DownloadCache(cache_dir=str(tmp_path / "cache"), offline=True)
+
+    assert first == second == _read(offline.fetch(url))
+    assert len(release_server.handler.requests) == 1
+    with pytest.raises(CacheMissError):
+        offline.fetch(release_server.base_url + "pbp/play_by_play_2021.csv.gz")
+
+    object_path = (
+        tmp_path / "cache" / c.CACHE_OBJECTS_DIR / hashlib.sha256(first).hexdigest()
+    )
+    object_path.write_bytes(b"damaged")
+    with pytest.raises(CacheMissError):
+        offline.fetch(url)
+    assert _read(cache.fetch(url)) == first
+    assert len(release_server.handler.requests) == 2
+
+
+@pytest.mark.parametrize("pooled", [False, True])
+def test_download_cache_revalidates_and_evicts(tmp_path, release_server, pooled):
+    for season in (2020, 2021):
+        frame = pd.DataFrame({"play_id": range(200), "season": season})
+        _write_release_file(tmp_path, f"pbp/play_by_play_{season}", frame)
+    urls = [release_server.base_url + f"pbp/play_by_play_{s}.csv" for s in (2020, 2021)]
+    cache = DownloadCache(cache_dir=str(tmp_path / "cache"), max_age=0)
+    fetcher = AsyncFetcher(download_dir=str(tmp_path / "downloads")) if pooled else None
+
+    try:
+        first = _read(cache.fetch(urls[0], fetcher=fetcher))
+        assert _read(cache.fetch(urls[0], fetcher=fetcher)) == first
+        assert len(release_server.handler.requests) == 2
+
+        cache.max_bytes = len(first) + 1
+        assert _read(cache.fetch(urls[1], fetcher=fetcher))
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+    offline = DownloadCache(cache_dir=str(tmp_path / "cache"), offline=True)
+    assert cache.total_bytes() <= len(first) + 1
+    assert _read(offline.fetch(urls[1]))
+    with pytest.raises(CacheMissError):
+        offline.fetch(urls[0])
+
+
+class _FlakyRangeHandler(http.server.BaseHTTPRequestHandler):
+    """Handler that fails every path once before serving it with Range support.
+
+    The first request for a ``.gz`` path drops the connection halfway through
+    the body, and the first request for any other path answers 503. When
+    ``next_body`` is set, the file is replaced by it after the dropped
+    request, so a resumed Range with a stale If-Range gets the new file.
+    """
+
+    body = b""
+    next_body = None
+    seen = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.seen.append((self.path, self.headers.get("Range")))
+        first = [path for path, _ in self.seen].count(self.path) == 1
+        if first and not self.path.endswith(".gz"):
+            self.send_error(503)
+            return
+        etag = '"%s"' % hashlib.md5(self.body).hexdigest()
+        offset = int(self.headers.get("Range", "bytes=0-")[6:-1])
+        if self.headers.get("If-Range", etag) != etag:
+            offset = 0
+        self.send_response(206 if offset else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.body) - offset))
+        self.end_headers()
+        if first:
+            self.wfile.write(self.body[: len(self.body) // 2])
+            self.close_connection = True
+            if self.next_body is not None:
+                type(self).body = self.next_body
+            return
+        self.wfile.write(self.body[offset:])
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve_flaky(body, next_body=None):
+    handler = type(
+        "Handler",
+        (_FlakyRangeHandler,),
+        {"body": body, "next_body": next_body, "seen": []},
+    )
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.base_url = "http://127.0.0.1:%i/" % server.server_address[1]
+    server.handler = handler
+    return server
+
+
+def test_async_fetcher_retries_and_resumes(tmp_path):
+    body = bytes(range(256)) * 1024
+    server = _serve_flaky(body)
+    base_url = server.base_url
+    try:
+        with AsyncFetcher(download_dir=str(tmp_path), backoff=0.01) as fetcher:
+            resumed = _read(
+                script.fetch_table_data(base_url + "a.csv.gz", fetcher=fetcher)
+            )
+            retried = _read(fetcher.fetch_all([base_url + "b.csv", base_url + "c.csv"]))
+            concurrent = _read(fetcher.fetch_all([base_url + "d.csv.gz"] * 2))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert resumed == body
+    assert retried == [body, body]
+    assert concurrent == [body, body]
+    assert ("/a.csv.gz", "bytes=%i-" % (len(body) // 2)) in server.handler.seen
+    assert ("/d.csv.gz", "bytes=%i-" % (len(body) // 2)) in server.handler.seen
+    assert len(server.handler.seen) == 9
+    assert not list(tmp_path.iterdir())
+
+
+def test_async_fetcher_never_joins_two_file_versions(tmp_path):
+    old, new = b"a" * 4096, b"b" * 8192
+    server = _serve_flaky(old, next_body=new)
+    url = server.base_url + "a.csv.gz"
+    try:
+        with AsyncFetcher(download_dir=str(tmp_path), backoff=0.01) as fetcher:
+            raw = _read(fetcher.fetch(url))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert raw == new
+    assert server.handler.seen == [
+        ("/a.csv.gz", None),
+        ("/a.csv.gz", "bytes=%i-" % (len(old) // 2)),
+    ]
+    assert not list(tmp_path.iterdir())
+
+
+def test_current_year_is_the_season_in_progress(tmp_path, monkeypatch):
+    manifest = LoadManifest(str(tmp_path / "manifest.json"))
+    for season in (2025, 2026):
+        job = IngestJob("player_stats", season, "url", None)
+        manifest.is_current(b"", job)
+        manifest.record(job, rows=0)
+    cases = {(2026, 10, 18): 2026, (2027, 2, 1): 2026, (2026, 7, 31): 2025}
+    try:
+        for pinned, season in cases.items():
+
+            class PinnedDatetime(datetime.datetime):
+                @classmethod
+                def today(cls, pinned=pinned):  # pylint: disable=arguments-differ
+                    return cls(*pinned)
+
+            monkeypatch.setattr(datetime, "datetime", PinnedDatetime)
+            importlib.reload(c)
+            assert c.CURRENT_YEAR == season
+            needs = {
+                year: manifest.needs_download(
+                    IngestJob("player_stats", year, "url", None)
+                )
+                for year in (2025, 2026)
+            }
+            assert needs == {2025: season == 2025, 2026: True}
+    finally:
+        monkeypatch.undo()
+        importlib.reload(c)
+
+
+def test_incremental_build_skips_unchanged_files(tmp_path):
+    current = c.CURRENT_YEAR
+    frame = pd.DataFrame({"play_id": [1, 2], "game_id": ["g1", "g2"]})
+    for season in (current - 1, current):
+        _write_release_file(
+            tmp_path,
+            f"pbp/play_by_play_{season}",
+            frame.assign(game_id=frame["game_id"] + f"_{season}"),
+            compression="gzip",
+        )
+    frame = frame.assign(game_id=frame["game_id"] + f"_{current}")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    def build():
+        timings = script.build_db(
+            base_url=f"{tmp_path}/",
+            tables=["pbp"],
+            manifest=LoadManifest(manifest_path),
+            db_path=str(tmp_path / "nflverse.db"),
+        )
+        return {t.season: t for t in timings if t.season in (current - 1, current)}
+
+    first = build()
+    assert not any(timing.skipped for timing in first.values())
+    assert LoadManifest(manifest_path).get("pbp", current)["rows"] == 2
+
+    second = build()
+    assert current - 1 not in second
+    assert second[current].skipped
+
+    _write_release_file(
+        tmp_path, f"pbp/play_by_play_{current}", frame.head(1), compression="gzip"
+    )
+    third = build()
+    assert not third[current].skipped
+    assert LoadManifest(manifest_path).get("pbp", current)["rows"] == 1
+
+
+def _pbp_frame():
+    return pd.DataFrame(
+        {
+            "play_id": [1, 2, 2, 3],
+            "game_id": ["g1", "g1", "g1", "g2"],
+            "season": [2020] * 4,
+            "week": [1, 1, 1, 2],
+            "home_team": ["KC", "KC", "KC", "BUF"],
+            "passer_player_id": ["00-1", None, None, "00-2"],
+            "passer_player_name": ["A", None, None, "B"],
+            "epa": [0.5, -0.1, -0.1, 1.2],
+        }
+    )
+
+
+def test_staged_tables_match_in_memory_build(tmp_path):
+    pbp = _pbp_frame()
+    stage_table(pbp, table="pbp", season=2020, staging_dir=str(tmp_path))
+
+    projected = read_staged_table(
+        "pbp", 2020, columns=["game_id", "missing"], staging_dir=str(tmp_path)
+    )
+    assert list(projected.columns) == ["game_id"]
+    for table_name in ("game", "pbp_player"):
+        staged = script.build_staged_table(table_name, 2020, staging_dir=str(tmp_path))
+        expected = script.build_table(pbp, table_name)
+        pd.testing.assert_frame_equal(
+            staged, expected, check_dtype=False, check_column_type=False
+        )
+
+
+def test_build_tables_fans_out_one_frame():
+    pbp = _pbp_frame().assign(desc=["a", "b", "b", "c"])
+    tables = script.build_tables(
+        pbp, ["game", "pbp", "pbp_player", "pbp_probabilities"]
+    )
+
+    assert list(tables["game"]["game_id"]) == ["g1", "g2"]
+    assert list(tables["pbp"]["play_desc"]) == ["a", "b", "c"]
+    assert list(tables["pbp_player"].columns) == c.PBP_PLAYER_TBL_COLUMNS
+    assert list(tables["pbp_player"]["player_id"]) == ["00-1", "00-2"]
+    assert len(tables["pbp_probabilities"]) == 3
+    pd.testing.assert_frame_equal(tables["game"], script.build_table(pbp, "game"))
+
+
+def test_build_tables_keeps_first_row_per_natural_key(caplog):
+    pbp = _pbp_frame()
+    pbp = pd.concat([pbp, pbp.iloc[[1]].assign(desc="replayed")], ignore_index=True)
+    caplog.set_level(logging.INFO)
+    tables = script.build_tables(pbp, ["pbp", "pbp_player"])
+
+    assert len(tables["pbp"]) == 3
+    assert "replayed" not in set(tables["pbp"]["play_desc"])
+    assert len(tables["pbp_player"]) == 2
+    assert c.DEDUP_MESSAGE % (2, "pbp", ["game_id", "play_id"]) in caplog.text
+    assert script.dedup_columns("pbp", ["game_id", "desc"]) == ["game_id", "desc"]
+
+
+def test_dtype_registry_covers_every_table_column():
+    for columns in c.NFLV_TABLE_DICT.values():
+        assert all(script.column_dtype(column) for column in columns)
+
+
+def test_parse_table_data_applies_registered_dtypes():
+    csv = (
+        "game_id,play_id,posteam,down,wp,receiver_player_id,unused\n"
+        "g1,1,KC,1,0.5,00-1,x\n"
+        "g1,2,KC,,0.25,,y\n"
+    ).encode()
+    data = script.parse_table_data(csv, table="pbp")
+
+    assert "unused" not in data.columns
+    assert str(data["posteam"].dtype) == "category"
+    assert str(data["down"].dtype) == "Int8"
+    assert str(data["wp"].dtype) == "float32"
+    assert str(data["receiver_player_id"].dtype) == "string"
+
+    fractional = script.parse_table_data(b"down,week\n1.5,1\n2,300\n")
+    assert str(fractional["down"].dtype) == "float32"
+    assert str(fractional["week"].dtype) == "Int64"
+
+
+def test_streamed_build_matches_whole_file_build(tmp_path, monkeypatch):
+    pbp = pd.concat([_pbp_frame()] * 3, ignore_index=True)
+    pbp["play_id"] = range(len(pbp))
+    _write_release_file(tmp_path, "pbp/play_by_play_2020", pbp, compression="gzip")
+    written = {}
+
+    def record(table, data=None, append=False, **_):
+        frames = written.setdefault(table, [])
+        if not append:
+            frames.clear()
+        frames.append(data)
+
+    monkeypatch.setattr(script, "write_table", record)
+    db_path = str(tmp_path / "nflverse.db")
+    streamed = script.build_db(
+        base_url=f"{tmp_path}/", tables=["pbp"], chunksize=5, db_path=db_path
+    )
+    streamed_tables = {t: pd.concat(f, ignore_index=True) for t, f in written.items()}
+    script.build_db(base_url=f"{tmp_path}/", tables=["pbp"], db_path=db_path)
+
+    assert [t.rows for t in streamed if t.season == 2020] == [len(pbp)]
+    for table_name, frames in written.items():
+        pd.testing.assert_frame_equal(
+            streamed_tables[table_name], frames[0], check_dtype=False
+        )
+    assert len(streamed_tables["game"]) == 2
+
+
+def test_write_table_replaces_whole_seasons(tmp_path):
+    db_path = str(tmp_path / "nflverse.db")
+    stats = pd.DataFrame(
+        {
+            "player_id": ["00-1", "00-2"],
+            "week": [1, 1],
+            "season_type": ["REG", "REG"],
+            "targets": [5, 7],
+            "to": [1, 2],
+        }
+    )
+    assert script.write_table("player_stats", 2020, stats, db_path=db_path) == 2
+    script.write_table("player_stats", 2020, stats, db_path=db_path)
+    script.write_table("player_stats", 2021, stats.head(1), db_path=db_path)
+    script.create_key_indexes(db_path=db_path, tables=["player_stats"])
+
+    update = stats.assign(targets=[6, 7])
+    script.write_table("player_stats", 2021, update, db_path=db_path)
+    script.write_table("player_stats", 2022, stats, db_path=db_path)
+    script.write_table("player_stats", 2022, stats.tail(1), db_path=db_path)
+
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute(
+            "SELECT season, value, targets FROM player_stats "
+            "JOIN dictionary_player ON code = player_id ORDER BY 1, 2"
+        ).fetchall()
+        types = {
+            row[1]: row[2]
+            for row in connection.execute("PRAGMA table_info(player_stats)")
+        }
+    assert rows == [
+        (2020, "00-1", 5),
+        (2020, "00-2", 7),
+        (2021, "00-1", 6),
+        (2021, "00-2", 7),
+        (2022, "00-2", 7),
+    ]
+    assert types["targets"] == "INTEGER"
+    assert types["player_id"] == "INTEGER"
+    assert types["player_name"] == "TEXT"
+
+
+def test_write_table_season_replace_keeps_rows_with_null_keys_once(tmp_path):
+    db_path = str(tmp_path / "nflverse.db")
+    rosters = pd.DataFrame(
+        {
+            "gsis_id": ["00-1", None, "00-3"],
+            "full_name": ["A", "B", "C"],
+            "team": ["KC", "KC", "BUF"],
+            "week": [1, 1, 1],
+        }
+    )
+    script.write_table("weekly_rosters", 2020, rosters, db_path=db_path)
+    script.create_key_indexes(db_path=db_path, tables=["weekly_rosters"])
+    for _ in range(3):
+        script.write_table("weekly_rosters", 2020, rosters.head(2), db_path=db_path)
+
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute(
+            "SELECT gsis_id, full_name FROM weekly_rosters ORDER BY full_name"
+        ).fetchall()
+    assert rows == [("00-1", "A"), (None, "B")]
+
+
+def test_encoded_columns_share_dictionaries_and_decode(tmp_path):
+    db_path = str(tmp_path / "nflverse.db")
+    stats = pd.DataFrame(
+        {
+            "player_id": ["00-2", "00-1", None],
+            "position": ["RB", "WR", "WR"],
+            "recent_team": ["KC", "BUF", "KC"],
+            "week": [1, 1, 1],
+            "season_type": ["REG"] * 3,
+        }
+    )
+    plays = pd.DataFrame(
+        {"game_id": ["g1", "g1"], "play_id": [1, 2], "posteam": ["BUF", "NYJ"]}
+    )
+    script.write_table("player_stats", 2020, stats, db_path=db_path)
+    script.write_table("pbp", 2020, plays, db_path=db_path)
+
+    with sqlite3.connect(db_path) as connection:
+        teams = dict(connection.execute("SELECT value, code FROM dictionary_team"))
+        recent_teams = [
+            row[0]
+            for row in connection.execute(
+                "SELECT recent_team FROM player_stats ORDER BY rowid"
+            )
+        ]
+        posteams = [row[0] for row in connection.execute("SELECT posteam FROM pbp")]
+        raw = pd.read_sql_query("SELECT * FROM player_stats ORDER BY rowid", connection)
+        decoded = encoding.decode_columns(connection, "player_stats", raw)
+    assert set(teams) == {"BUF", "KC", "NYJ"}
+    assert recent_teams == [teams["KC"], teams["BUF"], teams["KC"]]
+    assert posteams == [teams["BUF"], teams["NYJ"]]
+    assert isinstance(decoded["player_id"].dtype, pd.CategoricalDtype)
+    assert decoded["player_id"].tolist()[:2] == ["00-2", "00-1"]
+    assert pd.isna(decoded["player_id"].iloc[2])
+
+    history = projections.load_projection_history(2021, db_path=db_path)
+    assert sorted(history["position"]) == ["RB", "WR", "WR"]
+
+
+def test_every_schema_table_compiles_in_sqlite():
+    connection = sqlite3.connect(":memory:")
+    for table, query in q.CREATE_TABLE_QUERY_DICT.items():
+        connection.execute(query)
+        columns = {
+            row[1]: row[2]
+            for row in connection.execute(f'PRAGMA table_info("{table}")')
+        }
+        assert set(q.schema_columns(table)) <= set(columns)
+        assert set(columns.values()) <= {"INTEGER", "REAL", "TEXT"}
+        assert set(c.NFLV_TABLE_KEY_DICT[table]) <= set(columns)
+    tables = {
+        row[0]: row[1]
+        for row in connection.execute("SELECT name, sql FROM sqlite_master")
+    }
+    assert set(tables) == set(c.NFLV_SCHEMA_DICT)
+    for table in c.WITHOUT_ROWID_TABLES:
+        assert tables[table].endswith("WITHOUT ROWID")
+
+
+def test_projection_queries_are_index_driven(tmp_path):
+    db_path = str(tmp_path / "nflverse.db")
+    stats = pd.DataFrame(
+        {
+            "player_id": [f"00-{i}" for i in range(200)],
+            "recent_team": ["KC", "BUF"] * 100,
+            "week": [1 + i % 17 for i in range(200)],
+            "season_type": ["REG"] * 200,
+            "fantasy_points": [float(i % 30) for i in range(200)],
+            "fantasy_points_ppr": [float(i % 35) for i in range(200)],
+        }
+    )
+    plays = pd.DataFrame(
+        {
+            "play_id": list(range(500)),
+            "game_id": [f"g{i % 10}" for i in range(500)],
+            "posteam": ["KC", "BUF"] * 250,
+        }
+    )
+    script.write_table("player_stats", 2020, stats, db_path=db_path)
+    script.write_table("pbp", 2020, plays, db_path=db_path)
+
+    unindexed = script.check_query_plans(db_path=db_path)
+    assert {"player_week", "week_points", "team_players"} <= set(unindexed)
+
+    script.create_key_indexes(db_path=db_path, tables=["player_stats", "pbp"])
+    assert script.check_query_plans(db_path=db_path) == {}
+
+    script.drop_key_indexes(db_path=db_path, tables=["player_stats"])
+    assert "player_week" in script.check_query_plans(db_path=db_path)
+
+
+def test_pbp_player_melts_into_one_row_per_participant():
+    pbp = pd.DataFrame(
+        {
+            "game_id": ["g1", "g1"],
+            "play_id": [1, 2],
+            "posteam": ["KC", "BUF"],
+            "defteam": ["BUF", "KC"],
+            "passer_player_id": ["00-1", None],
+            "passer_player_name": ["A", None],
+            "solo_tackle_2_player_id": ["00-3", "00-1"],
+            "solo_tackle_2_team": ["BUF", None],
+            "forced_fumble_player_1_player_id": [None, "00-4"],
+            "forced_fumble_player_1_team": [None, "KC"],
+            "kicker_player_id": [None, None],
+        }
+    )
+    players = script.build_table(pbp, "pbp_player").astype(object)
+    players = players.where(players.notna(), None)
+
+    assert list(players.itertuples(index=False, name=None)) == [
+        ("g1", 1, "passer", 1, "00-1", "KC"),
+        ("g1", 1, "solo_tackle", 2, "00-3", "BUF"),
+        ("g1", 2, "solo_tackle", 2, "00-1", None),
+        ("g1", 2, "forced_fumble", 1, "00-4", "KC"),
+    ]
+
+
+def _feature_pbp_frame(season_weeks=2):
+    rows = []
+    for week in range(1, season_weeks + 1):
+        for play_id, (yardline, passer, receiver, rusher) in enumerate(
+            [
+                (75, "00-1", "00-2", None),
+                (8, None, None, "00-3"),
+                (15, "00-1", "00-3", None),
+            ]
+        ):
+            rows.append(
+                {
+                    "play_id": play_id,
+                    "game_id": f"2020_{week:02d}_KC_BUF",
+                    "season": 2020,
+                    "week": week,
+                    "season_type": "REG",
+                    "posteam": "KC",
+                    "defteam": "BUF",
+                    "yardline_100": yardline,
+                    "air_yards": 10 if receiver else None,
+                    "complete_pass": 1 if receiver and yardline < 50 else 0,
+                    "epa": 0.5 * week,
+                    "passer_player_id": passer,
+                    "receiver_player_id": receiver,
+                    "rusher_player_id": rusher,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def test_feature_store_refreshes_only_changed_weeks(tmp_path):
+    db_path = str(tmp_path / "nflverse.db")
+    pbp = _feature_pbp_frame()
+
+    def build(frame):
+        _write_release_file(
+            tmp_path, "pbp/play_by_play_2020", frame, compression="gzip"
+        )
+        script.build_db(base_url=f"{tmp_path}/", tables=["pbp"], db_path=db_path)
+
+    build(pbp)
+    assert features.refresh_features(db_path=db_path) == [(2020, 1), (2020, 2)]
+    week_features = features.load_week_features(2020, weeks=[2], db_path=db_path)
+    by_player = week_features.set_index("player_id")
+    assert by_player.loc["00-3", "carries_inside_10"] == 1
+    assert by_player.loc["00-3", "red_zone_looks"] == 2
+    assert by_player.loc["00-2", "targets"] == 1
+    assert by_player.loc["00-2", "receiving_air_yards"] == 10
+    assert by_player.loc["00-1", "passing_epa"] == pytest.approx(2.0)
+
+    season = features.load_season_features(2020, db_path=db_path).set_index("player_id")
+    assert season.loc["00-3", "games"] == 2
+    assert season.loc["00-3", "receptions"] == 2
+
+    assert features.refresh_features(db_path=db_path) == []
+    build(pbp)
+    assert features.refresh_features(db_path=db_path) == []
+
+    pbp.loc[pbp["week"] == 2, "rusher_player_id"] = pbp["rusher_player_id"].where(
+        pbp["rusher_player_id"].isna(), "00-4"
+    )
+    build(pbp)
+    assert features.refresh_features(db_path=db_path) == [(2020, 2)]
+    week_features = features.load_week_features(2020, db_path=db_path)
+    assert set(week_features.loc[week_features["week"] == 2, "player_id"]) == {
+        "00-1",
+        "00-2",
+        "00-3",
+        "00-4",
+    }
+    assert script.check_query_plans(db_path=db_path) == {}
+
+
+def test_player_identity_resolves_ids_to_stable_keys(tmp_path, caplog):
+    db_path = str(tmp_path / "nflverse.db")
+    with pytest.raises(ValueError):
+        identity.refresh_player_identity(db_path=db_path)
+    players = pd.DataFrame(
+        {
+            "gsis_id": ["00-1", "00-2"],
+            "display_name": ["A", "B"],
+            "pfr_id": ["AaaA00", None],
+            "espn_id": [None, "7"],
+            "otc_id": ["o1", None],
+        }
+    )
+    rosters = pd.DataFrame(
+        {
+            "week": [1, 2, 2, 2],
+            "gsis_id": ["00-1", "00-1", "00-3", "00-4"],
+            "pfr_id": ["AaaA00", None, "CccC00", "CccC00"],
+            "espn_id": ["1", "2", "3", None],
+            "full_name": ["A", "A", "C", "D"],
+        }
+    )
+    _write_release_file(tmp_path, "players/players", players)
+    _write_release_file(tmp_path, "weekly_rosters/roster_weekly_2020", rosters)
+    script.build_db(
+        base_url=f"{tmp_path}/", tables=["players", "weekly_rosters"], db_path=db_path
+    )
+
+    player_identity = identity.refresh_player_identity(db_path=db_path)
+    assert list(player_identity.crosswalk["gsis_id"]) == [
+        "00-1",
+        "00-2",
+        "00-3",
+        "00-4",
+    ]
+    assert player_identity.ids(1)["espn_id"] == "2"
+    assert player_identity.ids(2)["espn_id"] == "7"
+    assert player_identity.ids(1)["otc_id"] == "o1"
+    # a pfr_id shared by two players resolves to neither
+    pfr_keys = player_identity.player_keys(["AaaA00", "CccC00", None], "pfr_id")
+    assert pfr_keys.tolist() == [1, pd.NA, pd.NA]
+
+    _write_release_file(
+        tmp_path,
+        "weekly_rosters/roster_weekly_2021",
+        pd.DataFrame({"week": [1], "gsis_id": ["00-0"], "full_name": ["Z"]}),
+    )
+    script.build_db(base_url=f"{tmp_path}/", tables=["weekly_rosters"], db_path=db_path)
+    identity.refresh_player_identity(db_path=db_path)
+    player_identity = identity.load_player_identity(db_path=db_path)
+    assert player_identity.resolve("00-3") == 3
+    assert player_identity.resolve("00-0") == 5
+    keyed = player_identity.attach_player_keys(rosters, "weekly_rosters")
+    assert keyed["player_key"].tolist() == [1, 1, 3, 4]
+
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("DROP TABLE players")
+    with caplog.at_level(logging.WARNING):
+        identity.refresh_player_identity(db_path=db_path)
+    assert "players is not loaded" in caplog.text
+
+
+def test_pipeline_builds_target_subgraph_and_skips_unchanged(tmp_path):
+    assert pipeline.pipeline_dependencies(["player_week_features"]) == {
+        "features": ["pbp"],
+        "pbp": [],
+    }
+    assert set(pipeline.pipeline_dependencies(["player_identity"])) == {
+        "player_identity",
+        "players",
+        "weekly_rosters",
+    }
+    assert set(pipeline.pipeline_dependencies(["serving"])) == {
+        "serving",
+        "features",
+        "pbp",
+        "player_stats",
+    }
+    with pytest.raises(ValueError):
+        pipeline.pipeline_dependencies(["nope"])
+    assert pipeline.pipeline_order({"b": ["a"], "a": []}) == ["a", "b"]
+    with pytest.raises(ValueError):
+        pipeline.pipeline_order({"a": ["b"], "b": ["a"]})
+
+    db_path = str(tmp_path / "nflverse.db")
+    pbp = _feature_pbp_frame()
+
+    def run(frame, mtime=0):
+        _write_release_file(
+            tmp_path, "pbp/play_by_play_2020", frame, compression="gzip", mtime=mtime
+        )
+        results = pipeline.run_pipeline(
+            targets=["player_week_features"],
+            base_url=f"{tmp_path}/",
+            manifest=LoadManifest(
+                str(tmp_path / "manifest.json"), refresh_completed_seasons=True
+            ),
+            state_path=str(tmp_path / "state.json"),
+            db_path=db_path,
+        )
+        assert [result.node for result in results] == ["pbp", "features"]
+        assert all(result.ok for result in results)
+        return results[-1].skipped
+
+    assert not run(pbp)
+    assert features.load_week_features(2020, db_path=db_path)["targets"].sum() > 0
+    assert run(pbp)
+    assert run(pbp, mtime=1)
+    pbp.loc[pbp["week"] == 2, "air_yards"] = 1
+    assert not run(pbp)
+
+
+def test_pipeline_loads_sources_in_one_build(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "nflverse.db")
+    combine = pd.DataFrame({"season": [2020], "player_name": ["a"], "pfr_id": ["A1"]})
+    rosters = pd.DataFrame(
+        {"gsis_id": ["00-1", "00-2"], "team": ["KC", "BUF"], "week": [1, 1]}
+    )
+    _write_release_file(tmp_path, "combine/combine", combine)
+    _write_release_file(tmp_path, "weekly_rosters/roster_weekly_2020", rosters)
+    builds = []
+
+    def record(**kwargs):
+        builds.append(kwargs["tables"])
+        return script.build_db(**kwargs)
+
+    monkeypatch.setattr(pipeline, "build_db", record)
+    results = pipeline.run_pipeline(
+        targets=["combine", "weekly_rosters"],
+        base_url=f"{tmp_path}/",
+        state_path=str(tmp_path / "state.json"),
+        db_path=db_path,
+    )
+
+    assert builds == [["combine", "weekly_rosters"]]
+    assert {result.node for result in results} == {"combine", "weekly_rosters"}
+    assert all(result.ok for result in results)
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM combine").fetchone() == (1,)
+        assert connection.execute("SELECT COUNT(*) FROM weekly_rosters").fetchone() == (
+            2,
+        )
+
+
+def test_projection_engine_projects_rate_times_opportunity(tmp_path):
+    db_path = str(tmp_path / "nflverse.db")
+    stats = pd.DataFrame(
+        {
+            "player_id": ["00-1", "00-1", "00-2", "00-2"],
+            "player_name": ["A", "A", "B", "B"],
+            "recent_team": ["KC", "BUF", "KC", "KC"],
+            "week": [1, 2, 1, 2],
+            "season_type": ["REG"] * 4,
+            "targets": [10, 6, 0, 0],
+            "receptions": [8, 4, 0, 0],
+            "receiving_yards": [100, 60, 0, 0],
+            "carries": [0, 0, 20, 10],
+            "rushing_yards": [0, 0, 100, 50],
+        }
+    )
+    script.write_table("player_stats", 2020, stats, db_path=db_path)
+    script.write_table("player_stats", 2021, stats, db_path=db_path)
+    script.create_key_indexes(db_path=db_path, tables=["player_stats"])
+
+    history = projections.load_projection_history(2022, db_path=db_path)
+    assert len(history) == 8
+    projected = projections.project_players(history, games=10).set_index("player_id")
+
+    assert list(projected.index) == ["00-1", "00-2"]
+    assert projected.loc["00-1", "recent_team"] == "BUF"
+    assert projected.loc["00-1", "targets"] == pytest.approx(80)
+    assert projected.loc["00-2", "carries"] == pytest.approx(150)
+    # the two players are the whole league, so shrinkage leaves rates unchanged
+    assert projected.loc["00-1", "receptions"] == pytest.approx(80 * 0.75)
+    assert projected.loc["00-2", "rushing_yards"] == pytest.approx(150 * 5)
+    assert projected.loc["00-2", "receptions"] == 0
+    assert projected.loc["00-2", "fantasy_points_ppr"] == pytest.approx(75)
+
+
+def test_serving_tables_slice_players_from_mapped_files(tmp_path):
+    db_path = str(tmp_path / "nflverse.db")
+    stats = pd.DataFrame(
+        {
+            "player_id": ["00-2", "00-1", "00-2", "00-1"],
+            "player_name": ["B", "A", "B", "A"],
+            "week": [1, 1, 2, 2],
+            "season_type": ["REG"] * 4,
+            "targets": [0, 10, 1, 6],
+        }
+    )
+    script.write_table("player_stats", 2020, stats, db_path=db_path)
+    serve_dir = str(tmp_path / "serving")
+
+    rows = serving.export_serving_tables(
+        tables=["player_stats"], serve_dir=serve_dir, db_path=db_path
+    )
+    assert rows == {"player_stats": 4}
+    store = serving.ServingStore(serve_dir)
+    player_stats = store.table("player_stats")
+    assert player_stats.index == {"00-1": (0, 2), "00-2": (2, 4)}
+    assert player_stats.rows("00-1", ["week", "targets"]).to_pydict() == {
+        "week": [1, 2],
+        "targets": [10, 6],
+    }
+    assert list(store.player("player_stats", "00-2")["player_name"]) == ["B", "B"]
+    assert len(player_stats.rows("00-9")) == 0
+    with pytest.raises(FileNotFoundError):
+        store.table("player_week_features")
+
+
+def test_simulator_is_deterministic_and_correlated(monkeypatch):
+    monkeypatch.setattr(c, "SIMULATION_SHARD_SEASONS", 100)
+    projected = pd.DataFrame(
+        {
+            "player_id": ["00-1", "00-2", "00-3"],
+            "player_name": ["A", "B", "C"],
+            "recent_team": ["KC", "KC", "BUF"],
+            "games": [2.0] * 3,
+            "fantasy_points_ppr": [40.0, 20.0, 30.0],
+        }
+    )
+    history = pd.DataFrame(
+        {
+            "player_id": ["00-1"] * 4 + ["00-2"] * 4,
+            "fantasy_points_ppr": [10, 30, 20, 20, 5, 15, 10, 10],
+        }
+    )
+    schedule = pd.DataFrame(
+        {
+            "week": [1, 2, 3],
+            "home_team": ["KC", "KC", "BUF"],
+            "away_team": ["BUF", None, "LV"],
+        }
+    )
+
+    single = simulate.simulate_players(
+        projected, history, schedule, seasons=400, seed=7, workers=1
+    )
+    pooled = simulate.simulate_players(
+        projected, history, schedule, seasons=400, seed=7, workers=2
+    )
+    pd.testing.assert_frame_equal(single, pooled)
+
+    by_player = single.set_index("player_id")
+    assert by_player.loc["00-1", "mean"] == pytest.approx(40, rel=0.05)
+    assert by_player.loc["00-3", "mean"] == pytest.approx(30, rel=0.05)
+    percentiles = by_player[[f"p{p}" for p in c.SIMULATION_PERCENTILES]]
+    assert (percentiles.diff(axis=1).iloc[:, 1:] > 0).all().all()
+    assert (by_player[["boom_rate", "bust_rate"]].stack().between(0, 1)).all()
+
+    inputs = simulate.build_simulation_inputs(projected, history, schedule)
+    weeks = simulate.sample_weeks(inputs, 2000, np.random.default_rng(0))
+    assert np.isnan(weeks[:, 1, 2]).all()
+    teammates = np.corrcoef(weeks[:, 0, 0], weeks[:, 0, 1])[0, 1]
+    assert teammates > 0.2
+
+
+def test_scoring_engine_compiles_league_configs():
+    stats = pd.DataFrame(
+        {
+            "player_id": ["00-1", "00-2", "00-1"],
+            "position": ["TE", "RB", "TE"],
+            "season": [2020, 2020, 2021],
+            "week": [1, 1, 1],
+            "receptions": [5, 2, 1],
+            "receiving_yards": [50, 10, 0],
+            "rushing_yards": [0, 120, 0],
+            "rushing_tds": [0, 1, 0],
+        }
+    )
+    engine = scoring.ScoringEngine(stats)
+    league = {
+        c.SCORING_POINTS_KEY: {**c.SCORING_STANDARD_POINTS, "receptions": 0.5},
+        c.SCORING_POSITION_POINTS_KEY: {"TE": {"receptions": 0.5}},
+        c.SCORING_BONUSES_KEY: [
+            {"stat": "rushing_yards", "threshold": 100, "points": 3}
+        ],
+    }
+
+    assert list(engine.score("ppr", 2020)) == pytest.approx([10, 21])
+    assert list(engine.score(league, 2020)) == pytest.approx([10, 23])
+    assert engine.score(dict(reversed(league.items())), 2020) is engine.score(
+        league, 2020
+    )
+    frame = engine.score_frame("half_ppr")
+    assert list(frame["fantasy_points"]) == pytest.approx([7.5, 20, 0.5])
+    with pytest.raises(KeyError):
+        scoring.compile_rules({c.SCORING_POINTS_KEY: {"player_name": 1}})
+
+
+def test_benchmark_reports_stages_and_flags_regressions(tmp_path, monkeypatch):
+    monkeypatch.setattr(c, "BENCHMARK_WEEKS", 2)
+    rng = np.random.default_rng(0)
+    pbp = benchmark.synthetic_pbp(2020, rng, games=2, plays=10, players=20)
+    monkeypatch.setitem(
+        benchmark.SYNTHETIC_TABLE_DICT,
+        "pbp",
+        lambda season, rng: benchmark.synthetic_pbp(season, rng, 2, 10, 20),
+    )
+    monkeypatch.setitem(
+        benchmark.SYNTHETIC_TABLE_DICT,
+        "player_stats",
+        lambda season, rng: benchmark.synthetic_player_stats(season, rng, 20),
+    )
+    monkeypatch.setitem(
+        benchmark.SYNTHETIC_TABLE_DICT,
+        "weekly_rosters",
+        lambda season, rng: benchmark.synthetic_weekly_rosters(season, rng, 2),
+    )
+    results = benchmark.run_benchmark(2, work_dir=str(tmp_path), first_season=2020)
+    by_key = {result.key: result for result in results}
+    baseline_path = str(tmp_path / "baseline.json")
+    benchmark.save_baseline(results, baseline_path, calibration=1.0)
+    baseline = benchmark.load_baseline(baseline_path)
+
+    assert set(benchmark.pbp_source_columns()) <= set(pbp.columns)
+    assert by_key["pbp/parse"].rows == 2 * 2 * 2 * 10
+    assert by_key["pbp/write"].rows > by_key["pbp/parse"].rows
+    assert by_key["player_stats/query"].rows == 2 * 2 * 20
+    assert by_key["pbp/query"].rows > 2 * 2 * 10
+    assert by_key["all/build_db"].rows == sum(
+        by_key[f"{table}/parse"].rows for table in benchmark.SYNTHETIC_TABLE_DICT
+    )
+    assert all(result.peak_rss_bytes > 0 for result in results)
+    assert baseline[c.BENCHMARK_MACHINE_KEY]["calibration_seconds"] == 1.0
+    assert benchmark.compare_to_baseline(results, baseline, calibration=1.0) == []
+    assert benchmark.calibrate(rows=100, repeats=1) > 0
+
+    for stored in baseline["2"].values():
+        stored["rows_per_calibration"] *= 10
+        stored["relative_seconds"] = 1.0
+        stored["peak_rss_bytes"] //= 10
+    regressions = benchmark.compare_to_baseline(results, baseline, calibration=1.0)
+    assert len(regressions) == 2 * sum(result.rows > 0 for result in results) + 1
+    # a machine ten times slower is expected to reach a tenth of the rows/sec
+    slower = benchmark.compare_to_baseline(results, baseline, calibration=10.0)
+    assert len(slower) == len(results)